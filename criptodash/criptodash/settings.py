@@ -209,4 +209,50 @@ if DEBUG:
     STATICFILES_DIRS = [
         os.path.join(BASE_DIR, 'static'),
         os.path.join(BASE_DIR, 'dashboard/static'),
-    ]
\ No newline at end of file
+    ]
+# Cache de resultados de indicadores (dashboard/cache_indicadores.py)
+# MAX_BYTES: presupuesto de la LRU en memoria; DIR: carpeta del nivel en disco (None = sin disco)
+INDICATOR_CACHE = {
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'DIR': None,
+}
+# Cliente del exchange (dashboard/cliente_exchange.py)
+# MARKETS_CACHE_DIR: carpeta del cache de mercados (None = pedirlos siempre al exchange);
+# MARKETS_TTL: segundos que se usa el archivo antes de volver a pedirlos;
+# DOWNLOAD_CONCURRENCY: ventanas de velas historicas que se bajan en paralelo;
+# BACKEND: 'ccxt' (exchange real) o 'replay' (velas locales, dashboard/exchange_replay.py)
+# REPLAY: DIR con velas grabadas (CSV/Parquet; None = sinteticas con SEED desde START),
+# LATENCY/JITTER en segundos por pedido, PAGE_SIZE velas por pedido, RATE_LIMIT en ms,
+# CLOCK: ms fijos para "ahora" (None = hora real)
+EXCHANGE_CLIENT = {
+    'MARKETS_CACHE_DIR': os.path.join(BASE_DIR, 'cache'),
+    'MARKETS_TTL': 24 * 60 * 60,
+    'DOWNLOAD_CONCURRENCY': 4,
+    'BACKEND': 'ccxt',
+    'REPLAY': {
+        'DIR': None,
+        'SEED': 42,
+        'START': '2024-01-01',
+        'LATENCY': 0.05,
+        'JITTER': 0.0,
+        'PAGE_SIZE': 1000,
+        'RATE_LIMIT': 0,
+        'CLOCK': None,
+    },
+}
+# Ingesta programada (manage.py ingest, dashboard/ingesta.py)
+# TIMEFRAMES: timeframes que se sincronizan al cierre de cada vela; WORKERS: pool de threads;
+# RATE_LIMITS: por exchange, sincronizaciones a la vez y arranques por segundo;
+# DELAY_SECONDS: espera despues del cierre; BACKFILL_DAYS: inicio de un par sin datos;
+# STATS_FILE: donde el proceso publica lag y throughput (lo lee /api/ingest-stats/)
+# ENABLED: True cuando manage.py ingest esta corriendo; run_bot (y las vistas que lo usan)
+# leen las velas de OHLCVData en vez de pedirlas al exchange
+INGEST = {
+    'ENABLED': False,
+    'TIMEFRAMES': ['1m'],
+    'WORKERS': 4,
+    'RATE_LIMITS': {'binance': {'concurrentes': 2, 'por_segundo': 5}},
+    'DELAY_SECONDS': 2,
+    'BACKFILL_DAYS': 1,
+    'STATS_FILE': os.path.join(BASE_DIR, 'cache', 'ingest_stats.json'),
+}
@@ -0,0 +1,97 @@
+# Arbitraje de señales
+# Cada estrategia emite su señal como arrays: una direccion int8 (1 compra, -1 venta,
+# 0 sin señal) y una fuerza por vela, mas el tipo de señal (ej. 'BB_BOUNCE').
+# arbitrar() combina las señales de varias estrategias en una sola con una regla:
+# - 'prioridad': en cada vela gana la primera estrategia (en el orden dado) que da señal,
+#   que es lo que hacen las funciones de indicadores.py al escribir solo en filas libres
+# - 'votos': se suma direccion * fuerza de todas; gana el signo de la suma, la fuerza es
+#   su valor absoluto y el tipo es el de la estrategia mas fuerte del lado ganador
+# colapsar_duplicados() borra las señales repetidas en velas consecutivas comparando el
+# array contra si mismo desplazado una vela, sin recorrer fila por fila.
+
+import numpy as np
+
+NINGUNA, COMPRA, VENTA = 0, 1, -1
+ETIQUETAS = {COMPRA: 'buy', VENTA: 'sell'}
+REGLAS = ('prioridad', 'votos')
+
+
+class Señal:
+    """
+    Señal de una estrategia.
+
+    - tipo: nombre de la señal (va a signal_type)
+    - direccion: array int8 con 1 compra, -1 venta, 0 sin señal
+    - fuerza: array (o escalar) con la fuerza de la señal en cada vela
+    """
+
+    def __init__(self, tipo, direccion, fuerza=1):
+        self.tipo = tipo
+        self.direccion = np.asarray(direccion, dtype=np.int8)
+        self.fuerza = np.broadcast_to(np.asarray(fuerza), self.direccion.shape)
+
+
+def desde_condiciones(compra, venta):
+    """Direccion int8 a partir de mascaras de compra/venta (si se cumplen las dos, gana la compra)"""
+    compra = np.asarray(compra, dtype=bool)
+    venta = np.asarray(venta, dtype=bool)
+    return np.where(compra, COMPRA, np.where(venta, VENTA, NINGUNA)).astype(np.int8)
+
+
+def arbitrar(señales, regla='prioridad', libre=None):
+    """
+    Combina las señales de varias estrategias.
+
+    Parameters:
+    - señales: lista de Señal, en orden de prioridad
+    - regla: 'prioridad' o 'votos'
+    - libre: mascara opcional de velas donde se puede poner señal (el resto queda en 0)
+
+    Returns:
+    - (direccion int8, tipo como array de objetos con '' donde no hay señal, fuerza)
+    """
+    if regla not in REGLAS:
+        raise ValueError(f"Regla de arbitraje desconocida: {regla}")
+    direcciones = np.stack([señal.direccion for señal in señales])
+    fuerzas = np.stack([señal.fuerza for señal in señales])
+    tipos = np.array([señal.tipo for señal in señales] + [''], dtype=object)
+    columnas = np.arange(direcciones.shape[1])
+    if libre is not None:
+        direcciones = np.where(libre, direcciones, NINGUNA)
+
+    if regla == 'prioridad':
+        activas = direcciones != NINGUNA
+        hay = activas.any(axis=0)
+        ganadora = activas.argmax(axis=0)
+        direccion = direcciones[ganadora, columnas]
+        fuerza = np.where(hay, fuerzas[ganadora, columnas], 0)
+    else:
+        total = (direcciones * fuerzas).sum(axis=0)
+        direccion = np.sign(total).astype(np.int8)
+        hay = direccion != NINGUNA
+        # estrategia mas fuerte entre las que votaron lo mismo que el resultado
+        a_favor = np.where(direcciones == direccion, fuerzas, -np.inf)
+        ganadora = a_favor.argmax(axis=0)
+        fuerza = np.abs(total)
+
+    tipo = tipos[np.where(hay, ganadora, len(señales))]
+    return direccion, tipo, fuerza
+
+
+def colapsar_duplicados(valores, vacio=NINGUNA):
+    """
+    Deja solo la primera de cada racha de señales iguales en velas consecutivas.
+
+    Sirve para direcciones int8 (vacio=0) y para columnas de texto (vacio='').
+    """
+    valores = np.asarray(valores)
+    repetidas = np.zeros(len(valores), dtype=bool)
+    repetidas[1:] = (valores[1:] == valores[:-1]) & (valores[1:] != vacio)
+    return np.where(repetidas, np.array(vacio, dtype=valores.dtype), valores)
+
+
+def etiquetas(direccion, vacio=''):
+    """Direccion int8 como texto 'buy' / 'sell' / `vacio`"""
+    return np.where(direccion == COMPRA, ETIQUETAS[COMPRA],
+                    np.where(direccion == VENTA, ETIQUETAS[VENTA], vacio)).astype(object)
+
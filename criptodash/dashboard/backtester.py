@@ -6,6 +6,8 @@ from datetime import datetime
 from .models import BacktestResult, TradingPair, TradeSignal, OHLCVData
 from .data_service import DataManager
 from .indicadores import *
+from .indicadores_registro import aplicar as aplicar_indicadores
+from .cache_indicadores import cache_indicadores
 from .ccxttest1 import signals as generate_signals_from_ccxt
 import plotly.graph_objs as go
 
@@ -38,15 +40,27 @@ class SignalBasedStrategy(TradingStrategy):
 
 class SupertrendStrategy(TradingStrategy):
     """Estrategia basada en Supertrend"""
+    # Indicadores del registro; parameters['indicadores'] = {nombre: {parametro: valor}}
+    indicadores = ('supertrend', 'macd', 'bollinger', 'ichimoku')
+
     def __init__(self, parameters=None):
         super().__init__("Supertrend", parameters)
 
     def generate_signals(self, df):
-        # Aplicar indicadores
-        df = supertrend(df)
-        df = macd(df)
-        df = enhanced_bollinger_bands(df, window=20, num_std=2, strategy='all')
-        df = ichimoku_cloud(df)
+        # El resultado depende solo de las velas y de los parametros: se reusa del cache
+        return cache_indicadores().obtener_o_calcular(
+            df, self._generate_signals, indicadores=(self.name,) + self.indicadores,
+            parametros=self.parameters.get('indicadores', {}))
+
+    def _generate_signals(self, df):
+        # Aplicar indicadores (las primitivas compartidas se calculan una sola vez)
+        parametros = self.parameters.get('indicadores', {})
+        df = aplicar_indicadores(df, self.indicadores, parametros)
+
+        # Señales de Bollinger (todas las estrategias) e Ichimoku
+        df = generate_bb_signals(df, parametros.get('bollinger', {}).get('window', 20), list(BB_ESTRATEGIAS))
+        df = clean_duplicate_signals(df)
+        df = generar_señales_ichimoku(df, parametros.get('ichimoku', {}).get('kijun', 26))
 
         # Generar señales
         df = generate_signals_from_ccxt(df)
@@ -2,6 +2,8 @@ import pandas as pd
 from datetime import datetime, timedelta
 import time
 
+from .indicadores_registro import CLOSE, HIGH, LOW, desviacion, maximo, media, minimo, planificar, registrar
+
 def run_bot():
     print(f"Fetching new bars for {datetime.now().isoformat()}") 
     # Opción 1: Datos en tiempo real (comenta/descomenta según necesites)
@@ -21,59 +23,61 @@ def calcular_indicadores(df):
     """
     Calcula todos los indicadores técnicos para el DataFrame
     """
-    # Ichimoku Cloud
-    df = calcular_ichimoku(df)
-     # Supertrend
-    df = calcular_supertrend(df)
-    # Bollinger Bands
-    df = calcular_bollinger_bands(df)
+    # Ichimoku Cloud, Supertrend y Bollinger Bands en un solo plan
+    valores = planificar(['ichimoku', 'supertrend_rango', 'bollinger_simple']).ejecutar(df)
+    columnas = COLUMNAS_ICHIMOKU + ('upperband', 'lowerband', 'sma_20', 'std_20', 'UpperBollBand', 'LowerBollBand')
+    df = _asignar(df, valores, columnas)
     # Señales de compra/venta
     df = generar_señales(df)
     return df
 
-def calcular_ichimoku(df):
-    # Tenkan-sen (Conversion Line)
-    high_9 = df['high'].rolling(window=9).max()
-    low_9 = df['low'].rolling(window=9).min()
-    df['tenkan'] = (high_9 + low_9) / 2
-    
-    # Kijun-sen (Base Line)
-    high_26 = df['high'].rolling(window=26).max()
-    low_26 = df['low'].rolling(window=26).min()
-    df['kijun'] = (high_26 + low_26) / 2
-    
-    # Senkou Span A (Leading Span A)
-    df['senkou_a'] = ((df['tenkan'] + df['kijun']) / 2).shift(26)
-    
-    # Senkou Span B (Leading Span B)
-    high_52 = df['high'].rolling(window=52).max()
-    low_52 = df['low'].rolling(window=52).min()
-    df['senkou_b'] = ((high_52 + low_52) / 2).shift(26)
-    
-    # Chikou Span (Lagging Span)
-    df['chikou'] = df['close'].shift(-26)
-    
+# Indicadores propios del bot registrados en el planificador: comparten las primitivas
+# (extremos moviles, media y desviacion del cierre) con los indicadores del registro
+
+@registrar('supertrend_rango',
+           lambda period, multiplier: {'high': HIGH, 'low': LOW,
+                                       'max': maximo(HIGH, period), 'min': minimo(LOW, period)},
+           period=10, multiplier=3)
+def _supertrend_rango(valores, period, multiplier):
+    # Implementación básica de Supertrend (el rango maximo-minimo hace de atr)
+    hl2 = (valores['high'] + valores['low']) / 2
+    atr = valores['max'] - valores['min']
+    return {'upperband': hl2 + (multiplier * atr), 'lowerband': hl2 - (multiplier * atr)}
+
+
+@registrar('bollinger_simple',
+           lambda period: {'media': media(CLOSE, period), 'desviacion': desviacion(CLOSE, period)},
+           period=20)
+def _bollinger_simple(valores, period):
+    return {
+        'sma_20': valores['media'],
+        'std_20': valores['desviacion'],
+        'UpperBollBand': valores['media'] + (valores['desviacion'] * 2),
+        'LowerBollBand': valores['media'] - (valores['desviacion'] * 2),
+    }
+
+
+# Columnas que agrega cada calculo (el ichimoku del registro tambien trae senkou_c)
+COLUMNAS_ICHIMOKU = ('tenkan', 'kijun', 'senkou_a', 'senkou_b', 'chikou')
+
+
+def _asignar(df, valores, columnas=None):
+    for columna in columnas or valores:
+        df[columna] = valores[columna]
     return df
 
+
+def calcular_ichimoku(df):
+    # Tenkan (9), Kijun (26), Senkou A/B (desplazadas 26) y Chikou
+    return _asignar(df, planificar(['ichimoku']).ejecutar(df), COLUMNAS_ICHIMOKU)
+
 def calcular_supertrend(df, period=10, multiplier=3):
-    # Implementación básica de Supertrend
-    hl2 = (df['high'] + df['low']) / 2
-    atr = df['high'].rolling(period).max() - df['low'].rolling(period).min()
-    
-    df['upperband'] = hl2 + (multiplier * atr)
-    df['lowerband'] = hl2 - (multiplier * atr)
-    
-    return df
+    plan = planificar(['supertrend_rango'], {'supertrend_rango': {'period': period, 'multiplier': multiplier}})
+    return _asignar(df, plan.ejecutar(df))
 
 def calcular_bollinger_bands(df, period=20):
-    # Bollinger Bands
-    df['sma_20'] = df['close'].rolling(window=period).mean()
-    df['std_20'] = df['close'].rolling(window=period).std()
-    
-    df['UpperBollBand'] = df['sma_20'] + (df['std_20'] * 2)
-    df['LowerBollBand'] = df['sma_20'] - (df['std_20'] * 2)
-    
-    return df
+    plan = planificar(['bollinger_simple'], {'bollinger_simple': {'period': period}})
+    return _asignar(df, plan.ejecutar(df))
 
 def generar_señales(df):
     # Señales basadas en cruce de Tenkan y Kijun
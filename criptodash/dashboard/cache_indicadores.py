@@ -0,0 +1,206 @@
+# Cache de resultados de indicadores
+# run_bot, run_bot_api, SupertrendStrategy y el dashboard recalculan los mismos
+# indicadores para el mismo par y rango una y otra vez. Este cache guarda el DataFrame
+# resultante con una clave formada por par, timeframe, rango de tiempo, indicadores con
+# sus parametros y una huella (hash) de los datos OHLCV de entrada: si cambia una sola
+# vela cambia la clave, asi que nunca se devuelve un resultado viejo.
+#
+# Memoria: LRU con un presupuesto en bytes. Disco (opcional): un pickle por clave en
+# INDICATOR_CACHE['DIR'], que sobrevive a reinicios. stats() devuelve los contadores de
+# aciertos/fallos para dimensionarlo. Un error del disco (lleno, sin permisos) se loguea y
+# se sigue solo con memoria: una falla del cache nunca hace fallar a run_bot.
+
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+COLUMNAS_HUELLA = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+
+
+def huella(df, columnas=COLUMNAS_HUELLA):
+    """Hash de los arrays OHLCV (cambia si cambia cualquier vela)"""
+    resumen = hashlib.blake2b(digest_size=16)
+    resumen.update(str(len(df)).encode())
+    for columna in columnas:
+        if columna in df.columns:
+            valores = df[columna].to_numpy()
+            if valores.dtype == object:
+                # timestamps con zona horaria, Decimal de la base, ...
+                valores = pd.util.hash_pandas_object(df[columna], index=False).to_numpy()
+            resumen.update(columna.encode())
+            resumen.update(np.ascontiguousarray(valores).view(np.uint8))
+    return resumen.hexdigest()
+
+
+def _rango(df):
+    if 'timestamp' not in df.columns or df.empty:
+        return None, None
+    return str(df['timestamp'].iloc[0]), str(df['timestamp'].iloc[-1])
+
+
+def clave(df, indicadores=(), parametros=None, pair=None, timeframe=None):
+    """Clave del cache: par, timeframe, rango, indicadores y parametros, y huella de los datos"""
+    desde, hasta = _rango(df)
+    descripcion = json.dumps({
+        'pair': pair,
+        'timeframe': timeframe,
+        'columnas': [str(c) for c in df.columns],
+        'desde': desde,
+        'hasta': hasta,
+        'indicadores': list(indicadores),
+        'parametros': parametros or {},
+    }, sort_keys=True, default=str)
+    return hashlib.blake2b(f'{descripcion}|{huella(df)}'.encode(), digest_size=20).hexdigest()
+
+
+def _tamaño(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+class CacheIndicadores:
+    """
+    LRU en memoria con presupuesto en bytes y segundo nivel opcional en disco.
+
+    Los DataFrames se copian al guardar y al devolver, asi quien los recibe puede
+    modificarlos sin tocar el cache.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, directorio=None):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._contadores = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0, 'disk_errors': 0}
+        if directorio:
+            try:
+                os.makedirs(directorio, exist_ok=True)
+            except OSError:
+                logger.exception("cache de indicadores: no se puede usar %s, queda solo en memoria", directorio)
+                self.directorio = None
+
+    def obtener(self, clave):
+        """DataFrame guardado con `clave` o None"""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None:
+                self._entradas.move_to_end(clave)
+                self._contadores['hits'] += 1
+                return entrada[0].copy()
+
+        df = self._leer_disco(clave)
+        with self._lock:
+            if df is None:
+                self._contadores['misses'] += 1
+                return None
+            self._contadores['disk_hits'] += 1
+            self._guardar_memoria(clave, df)
+        return df.copy()
+
+    def guardar(self, clave, df):
+        df = df.copy()
+        with self._lock:
+            self._guardar_memoria(clave, df)
+        self._escribir_disco(clave, df)
+
+    def obtener_o_calcular(self, df, calcular, indicadores=(), parametros=None, pair=None, timeframe=None):
+        """
+        Devuelve el resultado de `calcular(df)` desde el cache si ya se calculo para
+        los mismos datos y parametros; si no, lo calcula y lo guarda.
+        """
+        k = clave(df, indicadores, parametros, pair, timeframe)
+        resultado = self.obtener(k)
+        if resultado is None:
+            resultado = calcular(df)
+            self.guardar(k, resultado)
+        return resultado
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            consultas = self._contadores['hits'] + self._contadores['disk_hits'] + self._contadores['misses']
+            return {
+                **self._contadores,
+                'hit_rate': (consultas - self._contadores['misses']) / consultas if consultas else 0.0,
+                'entries': len(self._entradas),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
+
+    def _guardar_memoria(self, clave, df):
+        # cada entrada es (DataFrame, tamaño en bytes)
+        tamaño = _tamaño(df)
+        if clave in self._entradas:
+            self._bytes -= self._entradas.pop(clave)[1]
+        if tamaño > self.max_bytes:
+            # no entra en memoria: queda solo en disco (si hay)
+            return
+        self._entradas[clave] = (df, tamaño)
+        self._bytes += tamaño
+        while self._bytes > self.max_bytes:
+            _, (_, tamaño_viejo) = self._entradas.popitem(last=False)
+            self._bytes -= tamaño_viejo
+            self._contadores['evictions'] += 1
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f'{clave}.pkl')
+
+    def _leer_disco(self, clave):
+        if not self.directorio:
+            return None
+        try:
+            return pd.read_pickle(self._ruta(clave))
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+
+    def _escribir_disco(self, clave, df):
+        if not self.directorio:
+            return
+        # se escribe a un temporal y se renombra para no dejar archivos a medias
+        temporal = f'{self._ruta(clave)}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            df.to_pickle(temporal)
+            os.replace(temporal, self._ruta(clave))
+        except (OSError, pickle.PicklingError):
+            # la entrada queda solo en memoria
+            logger.exception("cache de indicadores: no se pudo escribir %s en disco", clave)
+            with self._lock:
+                self._contadores['disk_errors'] += 1
+            try:
+                os.remove(temporal)
+            except OSError:
+                pass
+
+
+_cache = None
+_lock_cache = threading.Lock()
+
+
+def cache_indicadores():
+    """Cache compartido del proceso, configurado con settings.INDICATOR_CACHE"""
+    global _cache
+    if _cache is None:
+        # un solo cache (y un solo presupuesto de bytes) aunque lo pidan varios threads a la vez
+        with _lock_cache:
+            if _cache is None:
+                from django.conf import settings
+
+                config = getattr(settings, 'INDICATOR_CACHE', {})
+                _cache = CacheIndicadores(
+                    max_bytes=config.get('MAX_BYTES', 256 * 1024 * 1024),
+                    directorio=config.get('DIR'),
+                )
+    return _cache
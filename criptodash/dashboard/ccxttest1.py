@@ -2,14 +2,18 @@
 
 
 '''
-import ccxt
 import json
 import math
 
 # mis libs
-from . import config
 from . import estilos
+from .cliente_exchange import cliente, configuracion_exchange
+from .descarga_ohlcv import CONCURRENCIA, LIMITE, descargar_ohlcv, timeframe_ms
 from .indicadores import *
+from .arbitraje_señales import NINGUNA, etiquetas
+from .indicadores_lote import calcular_lote
+from .ingesta import ingesta_activa
+from .cache_indicadores import cache_indicadores
 
 #fin mis libs
 import mysql.connector
@@ -29,26 +33,10 @@ import time
 from .plot import plotear
 from dashboard.models import Pair
 
-binance = ccxt.binance()
-exchange = binance
-binance.load_markets()
-print("Markets loaded:", len(binance.markets))
-# For historical data, we don't need API keys
-# binance.apiKey=config.BINANCE_APIKEY
-binance.apiKey=config.BINANCE_APIKEY
-binance.secret=config.BINANCE_SECRET
-# binance.secret=config.BINANCE_SECRET
-print(binance.check_required_credentials())
-balance =binance.fetch_balance()
-#print(type(balance))
-
-#for x,y in balance['free'].items():
-#    if y!=0:
-#        print(x,y)
-#print(json.dumps(balance['used']))
-
-#print(binance.balance())
-#print(json.dumps(binance.watch_balance()))
+# El cliente de binance se crea en el primer uso (cliente_exchange.cliente()) y los
+# mercados salen del cache en disco; al importar no se hacen llamadas de red.
+# Las credenciales salen de config.BINANCE_APIKEY / BINANCE_SECRET y el balance se pide
+# con cliente_exchange.balance().
 
 def crear_orden():
     symbol = 'ETH/BTC'
@@ -62,12 +50,12 @@ def crear_orden():
     'test': True,  # test if it's valid, but don't actually place it
     }
 
-    order = binance.create_order(symbol, type, side, amount, price, params)
+    order = cliente().create_order(symbol, type, side, amount, price, params)
 
     print(order)
 
 def cancelar_orden():
-    cancelResponse = exchange.cancel_order(newOrder1['id'])
+    cancelResponse = cliente().cancel_order(newOrder1['id'])
     print(cancelResponse)
 
 def dump(*args):
@@ -76,6 +64,7 @@ def dump(*args):
 # imprime los exchanges soportados
 
 def print_exchanges():
+   import ccxt
    dump('Supported exchanges:', ', '.join(ccxt.exchanges))
 
 in_position = False
@@ -112,36 +101,30 @@ def signals(df):
     if 'signal_strenght' not in df.columns:
         df['signal_strenght'] = 0
 
-    for current in range(1, len(df.index)):
-        previous = current - 1
-        current_strength = df['signal_strenght'].iloc[current]
-        if not df['in_uptrend'][previous] and df['in_uptrend'][current]:
-            df['signal_buy_sell'][current]='buy'
-            df['signal_strenght'][current]=current_strength+1
-        if df['in_uptrend'][previous] and not df['in_uptrend'][current]:
-            df['signal_buy_sell'][current]='sell'
-            df['signal_strenght'][current]=current_strength+1
+    # cambios de tendencia del supertrend
+    señal = señal_supertrend(df)
+    df['signal_buy_sell'] = etiquetas(señal.direccion, vacio='none')
+    df['signal_strenght'] = df['signal_strenght'] + (señal.direccion != NINGUNA)
 
     # Señales RSI
     df = generate_rsi_signals(df)
 
-    # Ichimoku Analisis de tendencias
-    df['tendencia_ichi'] = np.nan
-    for current in range(1, len(df.index)):
-        previous = current -1
-        if df['senkou_a'][current] < df['senkou_b'][current] and df['senkou_a'][previous] > df['senkou_b'][previous]:
-            df['tendencia_ichi'][current] = 'uptrend'
-        if df['senkou_a'][current] > df['senkou_b'][current] and df['senkou_a'][previous] < df['senkou_b'][previous]:
-            df['tendencia_ichi'][current] = 'downtrend'
+    # Ichimoku Analisis de tendencias (cruces de senkou a y senkou b)
+    senkou_a = df['senkou_a'].to_numpy(dtype=float)
+    senkou_b = df['senkou_b'].to_numpy(dtype=float)
+    tendencia = np.full(len(df), np.nan, dtype=object)
+    tendencia[1:][(senkou_a[1:] < senkou_b[1:]) & (senkou_a[:-1] > senkou_b[:-1])] = 'uptrend'
+    tendencia[1:][(senkou_a[1:] > senkou_b[1:]) & (senkou_a[:-1] < senkou_b[:-1])] = 'downtrend'
+    df['tendencia_ichi'] = tendencia
 
     # ichicmoku cruce se tenkan-sen kijun-sen
     print("analisis de cruces de tenkan y kinjun")
-    for current in range(1, len(df.index)):
-            previous = current - 1
-            if (not math.isnan(df['tenkan'][previous]))  and (not math.isnan(df['kijun'][previous])) and (not math.isnan(df['tenkan'][current])) and (not math.isnan(df['kijun'][current])):
-                if ((df['kijun'][previous] > df['tenkan'][previous]) and (df['tenkan'][current] > df['kijun'][current])):
-                    print("Timestamp",df['timestamp'][current]," Kijun",df['kijun'][current], "   Tenkan", df['tenkan'][current])                #if ((df['kijun'][previous] < df['tenkan'][previous]) and (df['tenkan'][current] < df['kijun'][current])):
-                    #print(df['tenkan'])
+    tenkan = df['tenkan'].to_numpy(dtype=float)
+    kijun = df['kijun'].to_numpy(dtype=float)
+    # las comparaciones con NaN dan False, asi que las velas sin datos no cruzan
+    cruces = np.flatnonzero((kijun[:-1] > tenkan[:-1]) & (tenkan[1:] > kijun[1:])) + 1
+    for current in cruces:
+        print("Timestamp",df['timestamp'].iloc[current]," Kijun",kijun[current], "   Tenkan", tenkan[current])
 
     return(df)
 def table(df):
@@ -173,29 +156,36 @@ def table_insert(df):
    cursor.close()
    cnx.close()
 
-def historical_fetch_ohlcv(pair,date_from,timeframe):
-    from_ts = binance.parse8601(date_from)
-    ohlcv_list = []
-    ohlcv = binance.fetch_ohlcv(pair, timeframe, since=from_ts, limit=1000)
-    ohlcv_list.append(ohlcv)
-    while True:
-        from_ts = ohlcv[-1][0]
-        new_ohlcv = binance.fetch_ohlcv(pair, timeframe, since=from_ts, limit=1000)
-        ohlcv.extend(new_ohlcv)
-        if len(new_ohlcv)!=1000:
-            break
-    return(ohlcv)
-
-
-def run_bot(pair,date_from,timeframe):
-    print(f"Fetching new bars for {datetime.now().isoformat()}")
-    #bars = binance.fetch_ohlcv('ETH/USDT', timeframe='1m', limit=100)
-    #bars = historical_fetch_ohlcv('ETH/USDT', '2025-10-26 18:15:00','1m')
-    bars = historical_fetch_ohlcv(pair, date_from,timeframe)
-    print(f"Received {len(bars)} bars")
-    df = pd.DataFrame(bars[:-1], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']) # toma los valores de mercado de el par
-    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms') # convierte los valores de tiempo del df a valores de tipo datetime
-
+def historical_fetch_ohlcv(pair, date_from=None, timeframe='1m', since=None, limit=None, concurrencia=None):
+    """
+    Velas de `pair` desde `date_from` (o `since`) hasta ahora, bajadas en ventanas
+    paralelas (ver descarga_ohlcv).
+
+    - date_from / since: fecha en texto ('2025-10-26 18:15:00'), datetime o timestamp en ms;
+      si no se pasa ninguno se bajan las ultimas `limit` velas
+    - limit: cantidad maxima de velas a partir de `since`
+    """
+    binance = cliente()
+    desde = date_from if date_from is not None else since
+    duracion = timeframe_ms(timeframe)
+    ahora = binance.milliseconds()
+    if desde is None:
+        from_ts = ahora - ahora % duracion - ((limit or LIMITE) - 1) * duracion
+    elif isinstance(desde, (int, np.integer)):
+        from_ts = int(desde)
+    elif isinstance(desde, str):
+        from_ts = binance.parse8601(desde)
+    else:
+        # datetime / Timestamp (naive se toma como UTC)
+        from_ts = int(pd.Timestamp(desde).timestamp() * 1000)
+    hasta = min(from_ts + (limit - 1) * duracion, ahora) if limit else ahora
+    if concurrencia is None:
+        concurrencia = configuracion_exchange().get('DOWNLOAD_CONCURRENCY', CONCURRENCIA)
+    return descargar_ohlcv(binance, pair, timeframe, from_ts, hasta, concurrencia=concurrencia)
+
+
+def calcular_indicadores_run_bot(df):
+    """Indicadores y señales de run_bot sobre un DataFrame OHLCV"""
     supertrend_data = supertrend(df)
     print("generando macd")
     macd_data = macd(supertrend_data)
@@ -205,7 +195,63 @@ def run_bot(pair,date_from,timeframe):
     print("generando ichimoku")
     ichi= ichimoku_cloud(boll)
     print("generando senales")
-    sig=signals(ichi)
+    return signals(ichi)
+
+def velas_cerradas(bars):
+    """DataFrame OHLCV a partir de la lista de ccxt, sin la ultima vela (todavia abierta)"""
+    df = pd.DataFrame(bars[:-1], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume']) # toma los valores de mercado de el par
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms') # convierte los valores de tiempo del df a valores de tipo datetime
+    return df
+
+def velas_run_bot(pair, date_from, timeframe):
+    """
+    Velas cerradas de `pair` desde `date_from` para run_bot. Con la ingesta programada
+    activa (INGEST['ENABLED']) se leen de OHLCVData, que mantiene manage.py ingest, asi
+    las vistas no hablan con el exchange; si no, se bajan con historical_fetch_ohlcv.
+    """
+    if not ingesta_activa():
+        bars = historical_fetch_ohlcv(pair, date_from, timeframe)
+        print(f"Received {len(bars)} bars")
+        return velas_cerradas(bars)
+
+    from .data_service import DataManager
+    from .models import TradingPair
+
+    pair_obj = TradingPair.objects.filter(symbol=pair).first()
+    if pair_obj is None:
+        return pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    if date_from is None:
+        start = None
+    elif isinstance(date_from, (int, np.integer)):
+        start = pd.Timestamp(int(date_from), unit='ms', tz='UTC')
+    else:
+        # texto o datetime; naive se toma como UTC (igual que historical_fetch_ohlcv)
+        start = pd.Timestamp(date_from)
+        start = start.tz_localize('UTC') if start.tzinfo is None else start.tz_convert('UTC')
+    df = DataManager.get_ohlcv_from_db(pair_obj, timeframe, start=start)
+    print(f"Read {len(df)} bars from the database")
+    if df.empty:
+        return df
+    # mismos tipos que velas_cerradas: float y timestamp UTC sin zona
+    df[['open', 'high', 'low', 'close', 'volume']] = df[['open', 'high', 'low', 'close', 'volume']].astype(float)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True).dt.tz_localize(None)
+    return df
+
+def run_bot(pair,date_from,timeframe,since=None,warmup=None):
+    if since is not None:
+        return run_bot_incremental(pair, since, timeframe, warmup or WARMUP_INCREMENTAL)
+
+    print(f"Fetching new bars for {datetime.now().isoformat()}")
+    #bars = binance.fetch_ohlcv('ETH/USDT', timeframe='1m', limit=100)
+    #bars = historical_fetch_ohlcv('ETH/USDT', '2025-10-26 18:15:00','1m')
+    df = velas_run_bot(pair, date_from, timeframe)
+    if df.empty:
+        # sin velas (por ejemplo un par que la ingesta todavia no bajo): nada que calcular
+        return df
+
+    # si ya se calcularon los indicadores para estas mismas velas se reusan del cache
+    sig = cache_indicadores().obtener_o_calcular(
+        df, calcular_indicadores_run_bot, indicadores=('run_bot',), pair=pair, timeframe=timeframe)
     print("ploteando")
     #plotear(sig)
     #print(df.columns.tolist())
@@ -224,16 +270,83 @@ def run_bot(pair,date_from,timeframe):
 
     return(sig)
 
-def save_signals_to_db(df, pair_symbol):
-    """Save trading signals to database"""
-    from dashboard.models import TradeSignal, TradingPair, Exchange
-    from django.utils import timezone
-
-    try:
-        # Get or create exchange
+# Modo incremental de run_bot
+# El cursor lo lleva el cliente: manda `since`, el timestamp de la ultima vela que ya
+# tiene, y recibe solo las velas cerradas posteriores. Los indicadores se calculan sobre
+# las `warmup` velas anteriores a `since` mas las nuevas, con el cache de indicadores
+# compartido, asi que el costo depende del warm-up y de las velas nuevas y no de la
+# historia, y dos clientes (o dos workers) con el mismo `since` reciben lo mismo.
+# Las señales pueden diferir de las de una corrida completa desde date_from: el cuantil
+# P² del squeeze solo ve el warm-up y el supertrend depende del camino recorrido.
+WARMUP_INCREMENTAL = 500
+
+def run_bot_incremental(pair, since, timeframe, warmup=WARMUP_INCREMENTAL):
+    """
+    run_bot solo para las velas cerradas posteriores a `since` (ms, texto o datetime;
+    naive se toma como UTC). Devuelve esas filas (vacio si no hay) y guarda sus señales.
+    """
+    if isinstance(since, (int, np.integer)):
+        desde = pd.Timestamp(int(since), unit='ms')
+    else:
+        desde = pd.Timestamp(since)
+        if desde.tzinfo is not None:
+            desde = desde.tz_convert('UTC').tz_localize(None)
+    inicio_ms = int(desde.value // 10**6) - warmup * timeframe_ms(timeframe)
+    print(f"Fetching bars after {desde} for {pair} (warm-up {warmup})")
+    df = velas_run_bot(pair, inicio_ms, timeframe)
+    if df.empty or not (df['timestamp'] > desde).any():
+        return df.iloc[:0].copy()
+
+    sig = cache_indicadores().obtener_o_calcular(
+        df, calcular_indicadores_run_bot, indicadores=('run_bot',), pair=pair, timeframe=timeframe)
+    nuevas = sig[sig['timestamp'] > desde].reset_index(drop=True)
+    print(f"Received {len(nuevas)} new bars")
+
+    # solo las señales de las velas nuevas van a la base
+    save_signals_to_db(nuevas, pair)
+    return nuevas
+
+def run_bot_lote(pairs, date_from, timeframe):
+    """
+    Igual que run_bot para una lista de pares: los indicadores de todos los pares se
+    calculan juntos (indicadores_lote) y despues se generan y guardan las señales de cada uno
+    """
+    frames = {}
+    for pair in pairs:
+        # de la base con la ingesta programada activa, si no del exchange (ver velas_run_bot)
+        df = velas_run_bot(pair, date_from, timeframe)
+        if not df.empty:
+            frames[pair] = df
+
+    print("generando indicadores del lote")
+    calculados = calcular_lote(frames, ('supertrend', 'macd', 'bollinger', 'ichimoku'))
+
+    resultados = {}
+    for pair, df in calculados.items():
+        df = generate_bb_signals(df, 20, list(BB_ESTRATEGIAS))
+        df = clean_duplicate_signals(df)
+        df = generar_señales_ichimoku(df)
+        sig = signals(df)
+        save_signals_to_db(sig, pair)
+        resultados[pair] = sig
+
+    return resultados
+
+# Guardado de señales
+# Las filas de señal se arman por columnas y se escriben con escritura_bd.upsert (INSERT
+# de muchas filas por lote, una transaccion) sobre el indice unico (pair, timestamp,
+# signal_type), en vez de un get_or_create (dos consultas) por señal. Los ids del par
+# (TradingPair y Pair) se resuelven una vez por proceso.
+COLUMNAS_INDICADORES = ('rsi', 'in_uptrend', 'macd', 'macd_signal')
+_pares_señales = {}
+
+def _ids_par_señales(pair_symbol):
+    """(id de TradingPair, id de Pair o None) del simbolo; se crean si no existen"""
+    from dashboard.models import TradingPair, Exchange
+
+    ids = _pares_señales.get(pair_symbol)
+    if ids is None:
         exchange, _ = Exchange.objects.get_or_create(name='Binance')
-
-        # Get or create trading pair (legacy model)
         pair, _ = TradingPair.objects.get_or_create(
             symbol=pair_symbol,
             exchange=exchange,
@@ -242,55 +355,78 @@ def save_signals_to_db(df, pair_symbol):
                 'quote_asset': pair_symbol.split('/')[1] if '/' in pair_symbol else ''
             }
         )
-
         # Ensure canonical Pair model exists and use it to link new signals
         try:
-            canonical_pair = ensure_pair(pair_symbol, pair_type='spot', exchange=exchange.name)
+            canonical_id = ensure_pair(pair_symbol, pair_type='spot', exchange=exchange.name).pk
         except Exception:
-            canonical_pair = None
-
-        signals_created = 0
-        for idx, row in df.iterrows():
-            if row.get('signal_buy_sell') in ['buy', 'sell']:
-                # Prepare indicators data
-                indicators = {}
-                if 'rsi' in row and not pd.isna(row['rsi']):
-                    indicators['rsi'] = float(row['rsi'])
-                if 'in_uptrend' in row and not pd.isna(row['in_uptrend']):
-                    indicators['in_uptrend'] = bool(row['in_uptrend'])
-                if 'macd' in row and not pd.isna(row['macd']):
-                    indicators['macd'] = float(row['macd'])
-                if 'macd_signal' in row and not pd.isna(row['macd_signal']):
-                    indicators['macd_signal'] = float(row['macd_signal'])
-
-                # Normalize signal type to match model choices
-                signal_type = row['signal_buy_sell'].upper()
-                # Determine strength (fall back to 1.0)
-                strength = float(row['signal_strenght']) if 'signal_strenght' in row and not pd.isna(row['signal_strenght']) else 1.0
-
-                # Create or get signal (linking both legacy pair and canonical pair)
-                defaults = {
-                    'price': float(row['close']),
-                    'strength': strength,
-                    # Use None instead of empty dict to avoid MySQL constraint error
-                    'indicators': indicators if indicators else None,
-                    'indicator': ','.join(list(indicators.keys())) if indicators else None,
-                }
-                if canonical_pair:
-                    defaults['pair_ref'] = canonical_pair
-
-                signal, created = TradeSignal.objects.get_or_create(
-                    pair=pair,
-                    timestamp=row['timestamp'],
-                    signal_type=signal_type,
-                    defaults=defaults
-                )
-                if created:
-                    signals_created += 1
-
-        print(f"Saved {signals_created} new signals to database for {pair_symbol}")
+            canonical_id = None
+        ids = _pares_señales[pair_symbol] = (pair.pk, canonical_id)
+    return ids
+
+def _indicadores_señales(df):
+    """Por fila: dict de indicadores (sin los NaN) o None si no queda ninguno"""
+    columnas = [c for c in COLUMNAS_INDICADORES if c in df.columns]
+    valores = []
+    for columna in columnas:
+        datos = df[columna].to_numpy()
+        convertir = bool if columna == 'in_uptrend' else float
+        validos = ~pd.isna(datos)
+        if convertir is float:
+            # inf no es JSON valido (el CHECK de la columna rechaza el lote entero)
+            validos &= np.isfinite(pd.to_numeric(datos, errors='coerce'))
+        valores.append([convertir(v) if ok else None for v, ok in zip(datos.tolist(), validos)])
+    indicadores = []
+    for fila in zip(*valores) if valores else [()] * len(df):
+        # Use None instead of empty dict to avoid MySQL constraint error
+        datos = {c: v for c, v in zip(columnas, fila) if v is not None}
+        indicadores.append(datos or None)
+    return indicadores
+
+def save_signals_to_db(df, pair_symbol):
+    """Save trading signals to database"""
+    from dashboard.models import TradeSignal
+    from dashboard.escritura_bd import upsert
+    from django.db import connection
+
+    try:
+        if 'signal_buy_sell' not in df.columns:
+            print(f"Saved 0 new signals to database for {pair_symbol}")
+            return
+        df = df[df['signal_buy_sell'].isin(['buy', 'sell']).to_numpy()]
+        pair_id, canonical_id = _ids_par_señales(pair_symbol)
+
+        # Normalize signal type to match model choices
+        signal_type = df['signal_buy_sell'].str.upper().tolist()
+        price = np.round(df['close'].to_numpy(dtype=float), 8).tolist()
+        # Determine strength (fall back to 1.0)
+        if 'signal_strenght' in df.columns:
+            strength = pd.to_numeric(df['signal_strenght'], errors='coerce').fillna(1.0).to_numpy(dtype=float).tolist()
+        else:
+            strength = [1.0] * len(df)
+        adaptar = connection.ops.adapt_datetimefield_value
+        timestamp = [adaptar(ts.to_pydatetime()) for ts in pd.to_datetime(df['timestamp'], utc=True)]
+        campo_indicadores = TradeSignal._meta.get_field('indicators')
+        indicadores = _indicadores_señales(df)
+        indicator = [','.join(datos) if datos else None for datos in indicadores]
+        indicadores = [campo_indicadores.get_db_prep_value(datos, connection) if datos else None
+                       for datos in indicadores]
+
+        n = len(df)
+        filas = zip([pair_id] * n, [canonical_id] * n, timestamp, signal_type, price,
+                    strength, indicadores, indicator)
+        resultado = upsert(
+            TradeSignal,
+            ['pair_id', 'pair_ref_id', 'timestamp', 'signal_type', 'price', 'strength', 'indicators', 'indicator'],
+            filas,
+            claves=['pair_id', 'timestamp', 'signal_type'],
+            actualizar=['pair_ref_id', 'price', 'strength', 'indicators', 'indicator'],
+        )
+        print(f"Saved {resultado['inserted']} new signals to database for {pair_symbol}")
+        return resultado
 
     except Exception as e:
+        # los ids guardados pueden ser de filas que ya no existen
+        _pares_señales.pop(pair_symbol, None)
         print(f"Error saving signals to database: {e}")
         import traceback
         traceback.print_exc()
@@ -0,0 +1,110 @@
+# Cliente del exchange (ccxt) creado a demanda
+# Antes, importar ccxttest1 creaba el cliente de binance, cargaba los mercados y pedia el
+# balance: cada proceso de Django (web, manage.py, tests) hacia esas llamadas de red al
+# arrancar, o fallaba sin red. Ahora el cliente se crea en el primer uso y los mercados se
+# leen de un archivo local mientras no pase el TTL (EXCHANGE_CLIENT en settings); solo
+# cuando el archivo no existe o esta vencido se piden al exchange.
+# Con EXCHANGE_CLIENT['BACKEND'] = 'replay' el cliente es un ExchangeReplay que sirve
+# velas grabadas o sinteticas sin red (para benchmarks y pruebas de carga).
+
+import json
+import os
+import threading
+import time
+
+TTL_MERCADOS = 24 * 60 * 60
+
+_clientes = {}
+_lock = threading.Lock()
+
+
+def configuracion_exchange():
+    """settings.EXCHANGE_CLIENT"""
+    from django.conf import settings
+
+    return getattr(settings, 'EXCHANGE_CLIENT', {})
+
+
+def _credenciales():
+    """(apiKey, secret) de dashboard/config.py o de las variables de entorno"""
+    try:
+        from . import config
+    except ImportError:
+        return os.environ.get('BINANCE_APIKEY'), os.environ.get('BINANCE_SECRET')
+    return getattr(config, 'BINANCE_APIKEY', None), getattr(config, 'BINANCE_SECRET', None)
+
+
+def cliente(nombre='binance', mercados=True):
+    """
+    Cliente ccxt compartido por el proceso; se crea en la primera llamada.
+
+    Parameters:
+    - nombre: id del exchange en ccxt
+    - mercados: cargar los mercados (desde el cache en disco si esta vigente)
+    """
+    with _lock:
+        exchange = _clientes.get(nombre)
+        if exchange is None:
+            config = configuracion_exchange()
+            if config.get('BACKEND', 'ccxt') == 'replay':
+                # velas locales (grabadas o sinteticas), ver exchange_replay
+                from .exchange_replay import ExchangeReplay
+
+                exchange = ExchangeReplay.desde_config(nombre, config.get('REPLAY', {}))
+            else:
+                import ccxt
+
+                exchange = getattr(ccxt, nombre)()
+                apikey, secret = _credenciales()
+                if apikey:
+                    exchange.apiKey = apikey
+                    exchange.secret = secret
+            _clientes[nombre] = exchange
+        if mercados and not exchange.markets:
+            cargar_mercados(exchange)
+    return exchange
+
+
+def _ruta_mercados(exchange, directorio):
+    return os.path.join(directorio, f'{exchange.id}_markets.json')
+
+
+def cargar_mercados(exchange, directorio=None, ttl=None):
+    """
+    Carga los mercados de `exchange` desde el archivo de cache si tiene menos de `ttl`
+    segundos; si no, los pide al exchange y reescribe el archivo.
+    """
+    config = configuracion_exchange()
+    directorio = directorio or config.get('MARKETS_CACHE_DIR')
+    ttl = config.get('MARKETS_TTL', TTL_MERCADOS) if ttl is None else ttl
+    if not directorio:
+        return exchange.load_markets()
+
+    ruta = _ruta_mercados(exchange, directorio)
+    try:
+        if time.time() - os.path.getmtime(ruta) < ttl:
+            with open(ruta) as archivo:
+                guardado = json.load(archivo)
+            return exchange.set_markets(guardado['markets'], guardado.get('currencies'))
+    except (OSError, ValueError, KeyError):
+        pass
+
+    mercados = exchange.load_markets()
+    os.makedirs(directorio, exist_ok=True)
+    # se escribe a un temporal y se renombra para no dejar archivos a medias
+    temporal = f'{ruta}.{os.getpid()}.tmp'
+    with open(temporal, 'w') as archivo:
+        json.dump({'markets': exchange.markets, 'currencies': exchange.currencies}, archivo, default=str)
+    os.replace(temporal, ruta)
+    return mercados
+
+
+def balance(nombre='binance'):
+    """Balance de la cuenta (requiere credenciales); nunca se pide al importar"""
+    return cliente(nombre).fetch_balance()
+
+
+def reiniciar():
+    """Olvida los clientes creados (para tests o al cambiar credenciales)"""
+    with _lock:
+        _clientes.clear()
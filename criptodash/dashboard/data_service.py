@@ -1,11 +1,15 @@
-from decimal import Decimal
+import numpy as np
 import pandas as pd
 import logging
-from django.db import transaction
+from django.db import connection, transaction
 from plotly import graph_objs as go
 from django.utils import timezone
-from .models import OHLCVData, TradingPair, Exchange
+from django.db.models import Max
+from .models import OHLCVData, TradingPair, Exchange, IngestionState
 from .ccxttest1 import historical_fetch_ohlcv  # Tu función actual
+from .resampleo import DERIVADOS, duracion_ms, resamplear
+from .descarga_ohlcv import LIMITE, timeframe_ms
+from .escritura_bd import upsert
 
 logger = logging.getLogger(__name__)
 
@@ -35,29 +39,43 @@ class DataManager:
     def fetch_ohlcv_from_exchange(pair_symbol, timeframe='1m', since=None, limit=1000):
         """
         Llama historical_fetch_ohlcv y devuelve DataFrame con columnas:
-        ['timestamp','open','high','low','close','volume']
+        ['timestamp','open','high','low','close','volume'] (timestamp en UTC)
         """
         raw = historical_fetch_ohlcv(pair_symbol, timeframe=timeframe, since=since, limit=limit)
+        return DataManager._ohlcv_frame(raw)
+
+    @staticmethod
+    def _ohlcv_frame(raw):
+        """
+        Velas crudas de ccxt ([ts ms, open, high, low, close, volume]) a DataFrame por
+        columnas: timestamp UTC datetime64[ms] y OHLCV float, ordenado por timestamp.
+        Las filas con algun valor no numerico o vacio se descartan.
+        """
+        columnas = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
         if not raw:
-            return pd.DataFrame(columns=['timestamp','open','high','low','close','volume'])
-        # raw puede ser lista de listas: [ts, open, high, low, close, volume]
-        rows = []
-        for row in raw:
-            try:
-                ts = DataManager._normalize_ts(row[0])
-                rows.append({
-                    'timestamp': ts,
-                    'open': float(row[1]),
-                    'high': float(row[2]),
-                    'low': float(row[3]),
-                    'close': float(row[4]),
-                    'volume': float(row[5]) if len(row) > 5 else 0.0
-                })
-            except Exception:
-                continue
-        df = pd.DataFrame(rows)
-        if not df.empty:
-            df = df.sort_values('timestamp').reset_index(drop=True)
+            return pd.DataFrame(columns=columnas)
+        try:
+            datos = np.asarray(raw, dtype=float)
+        except (TypeError, ValueError):
+            # filas de distinto largo o con valores no numericos: se convierte por columna
+            crudo = pd.DataFrame(list(raw))
+            datos = np.column_stack([pd.to_numeric(crudo[c], errors='coerce').to_numpy(dtype=float)
+                                     for c in crudo.columns[:6]])
+            if datos.shape[1] == 6:
+                # las filas cortas no traen volumen
+                cortas = np.fromiter(map(len, raw), dtype=int, count=len(datos)) < 6
+                datos[cortas, 5] = 0.0
+        if datos.ndim != 2 or datos.shape[1] < 5:
+            return pd.DataFrame(columns=columnas)
+        if datos.shape[1] == 5:
+            # sin volumen
+            datos = np.column_stack([datos, np.zeros(len(datos))])
+        datos = datos[:, :6]
+        datos = datos[np.isfinite(datos).all(axis=1)]
+        datos = datos[np.argsort(datos[:, 0], kind='stable')]
+        df = pd.DataFrame(datos[:, 1:], columns=columnas[1:])
+        timestamps = datos[:, 0].astype(np.int64).astype('datetime64[ms]')
+        df.insert(0, 'timestamp', pd.DatetimeIndex(timestamps).tz_localize('UTC'))
         return df
 
     @staticmethod
@@ -80,49 +98,178 @@ class DataManager:
         return df
 
     @staticmethod
-    def save_ohlcv_rows(df, pair_obj, timeframe='1m', batch_size=500):
+    def save_ohlcv_rows(df, pair_obj, timeframe='1m', batch_size=5000):
+        """
+        Guarda las filas del DataFrame en OHLCVData (ver upsert_ohlcv_rows).
+        Devuelve la cantidad de velas nuevas insertadas.
+        """
+        return DataManager.upsert_ohlcv_rows(df, pair_obj, timeframe, batch_size)['inserted']
+
+    @staticmethod
+    def upsert_ohlcv_rows(df, pair_obj, timeframe='1m', batch_size=5000):
         """
-        Guarda (bulk_create) filas del DataFrame en OHLCVData.
-        Evita duplicados mediante ignore_conflicts cuando está disponible.
+        Inserta o actualiza las velas de `df` en OHLCVData con INSERT de muchas filas
+        (ON DUPLICATE KEY UPDATE / ON CONFLICT), armando los parametros directo de los
+        arrays, sin iterrows ni una instancia del modelo por fila.
+        Las filas con timestamp o precios invalidos se descartan.
+        Devuelve {'inserted': n, 'updated': m}.
         """
         if df is None or df.empty:
+            return {'inserted': 0, 'updated': 0}
+        timestamps = pd.to_datetime(df['timestamp'], utc=True, errors='coerce')
+        valores = {}
+        for columna in ('open', 'high', 'low', 'close', 'volume'):
+            if columna in df.columns:
+                numeros = pd.to_numeric(df[columna], errors='coerce').to_numpy(dtype=float)
+            else:
+                numeros = np.zeros(len(df))
+            # los campos son DecimalField(decimal_places=8)
+            valores[columna] = np.round(numeros, 8)
+        validas = timestamps.notna().to_numpy() & np.logical_and.reduce(
+            [np.isfinite(numeros) for numeros in valores.values()])
+        if not validas.all():
+            logger.debug("save_ohlcv_rows: %d filas invalidas descartadas", int((~validas).sum()))
+
+        adaptar = connection.ops.adapt_datetimefield_value
+        fechas = [adaptar(ts.to_pydatetime()) for ts in timestamps[validas]]
+        columnas = ['pair_id', 'timeframe', 'timestamp', 'open', 'high', 'low', 'close', 'volume']
+        n = len(fechas)
+        filas = zip([pair_obj.pk] * n, [timeframe] * n, fechas,
+                    *(valores[c][validas].tolist() for c in ('open', 'high', 'low', 'close', 'volume')))
+        return upsert(OHLCVData, columnas, filas, claves=['pair_id', 'timestamp', 'timeframe'],
+                      actualizar=['open', 'high', 'low', 'close', 'volume'], batch_size=batch_size)
+
+    @staticmethod
+    def resample_from_1m(pair_obj, timeframes=DERIVADOS, start=None, end=None, save=True):
+        """
+        Lee una sola vez las velas de 1m de la BD y arma todos los `timeframes`.
+        Solo se guardan en OHLCVData (save=True) los buckets cerrados que tienen todas
+        sus velas de 1m; los incompletos (huecos, datos que empiezan a mitad del bucket
+        o el ultimo todavia abierto) se devuelven pero no se guardan, asi get_or_fetch
+        los sigue viendo como hueco.
+        Devuelve dict {timeframe: DataFrame}.
+        """
+        start, end = DataManager._utc(start), DataManager._utc(end)
+        # desde el inicio del dia, asi el primer bucket de cada timeframe puede estar completo
+        df_1m = DataManager.get_ohlcv_from_db(
+            pair_obj, '1m', start=start.floor('1D') if start is not None else None, end=end)
+        resultados = resamplear(df_1m, timeframes, contar=True)
+        if save and not df_1m.empty:
+            for timeframe, df in resultados.items():
+                completos = df['velas'] == duracion_ms(timeframe) // duracion_ms('1m')
+                DataManager.save_ohlcv_rows(df[completos], pair_obj, timeframe=timeframe)
+        resultados = {tf: df.drop(columns='velas') for tf, df in resultados.items()}
+        if start is not None:
+            resultados = {tf: df[df['timestamp'] >= start].reset_index(drop=True) for tf, df in resultados.items()}
+        return resultados
+
+    @staticmethod
+    def _utc(ts):
+        """Timestamp con zona UTC (o None)"""
+        ts = DataManager._normalize_ts(ts)
+        if ts is None:
+            return None
+        ts = pd.Timestamp(ts)
+        return ts.tz_localize('UTC') if ts.tzinfo is None else ts.tz_convert('UTC')
+
+    @staticmethod
+    def get_pair(pair_symbol):
+        """TradingPair del simbolo; si no existe se crea en Binance (como save_signals_to_db)"""
+        pair_obj = TradingPair.objects.filter(symbol=pair_symbol).first()
+        if pair_obj is None:
+            exchange, _ = Exchange.objects.get_or_create(name='Binance')
+            pair_obj = TradingPair.objects.create(
+                symbol=pair_symbol,
+                exchange=exchange,
+                base_asset=pair_symbol.split('/')[0],
+                quote_asset=pair_symbol.split('/')[1] if '/' in pair_symbol else '',
+            )
+        return pair_obj
+
+    @staticmethod
+    def sync_ohlcv(pair_symbol, timeframe='1m', start=None, now=None):
+        """
+        Sincronizacion incremental: baja e inserta solo las velas posteriores a la marca de
+        agua (IngestionState) de (par, timeframe) y la avanza hasta la ultima vela cerrada.
+        Sin marca se retoma desde la ultima vela guardada (incluida: pudo quedar guardada
+        todavia abierta y el upsert la pisa con la cerrada) o, si no hay ninguna, desde `start`.
+        Velas insertadas y marca de agua se guardan en la misma transaccion, asi una caida
+        a mitad de camino no deja la marca adelante de los datos.
+        Devuelve la cantidad de velas guardadas.
+        """
+        pair_obj = DataManager.get_pair(pair_symbol)
+        state, _ = IngestionState.objects.get_or_create(pair=pair_obj, timeframe=timeframe)
+        duracion = pd.Timedelta(milliseconds=timeframe_ms(timeframe))
+        if state.last_timestamp is not None:
+            # la marca siempre es una vela cerrada
+            desde = DataManager._utc(state.last_timestamp) + duracion
+        else:
+            ultima = OHLCVData.objects.filter(pair=pair_obj, timeframe=timeframe).aggregate(
+                ultima=Max('timestamp'))['ultima']
+            if ultima is not None:
+                desde = DataManager._utc(ultima)
+            elif start is not None:
+                desde = DataManager._utc(start)
+            else:
+                raise ValueError(f"No hay datos ni marca de agua para {pair_symbol} {timeframe}: falta start")
+
+        now = DataManager._utc(now) if now is not None else pd.Timestamp.now(tz='UTC')
+        if desde + duracion > now:
+            # todavia no cerro ninguna vela nueva: no hace falta ir al exchange
             return 0
-        objs = []
-        for _, r in df.iterrows():
-            try:
-                objs.append(OHLCVData(
-                    pair=pair_obj,
-                    timestamp=r['timestamp'],
-                    open=Decimal(str(r['open'])),
-                    high=Decimal(str(r['high'])),
-                    low=Decimal(str(r['low'])),
-                    close=Decimal(str(r['close'])),
-                    volume=Decimal(str(r.get('volume', 0))),
-                    timeframe=timeframe
-                ))
-            except Exception as e:
-                logger.debug("skip row save_ohlcv_rows: %s", e)
-        created = 0
-        try:
-            with transaction.atomic():
-                OHLCVData.objects.bulk_create(objs, batch_size=batch_size, ignore_conflicts=True)
-                created = len(objs)
-        except TypeError:
-            # ignore_conflicts no disponible en versiones antiguas -> insert en loop
-            for o in objs:
-                try:
-                    o.save()
-                    created += 1
-                except Exception:
-                    continue
-        except Exception as e:
-            logger.exception("Error saving OHLCV rows: %s", e)
-        return created
+        df = DataManager.fetch_ohlcv_from_exchange(pair_symbol, timeframe, since=int(desde.timestamp() * 1000))
+        if df.empty:
+            return 0
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        # solo velas nuevas y cerradas (la ultima puede estar abierta todavia)
+        df = df[(df['timestamp'] >= desde) & (df['timestamp'] + duracion <= now)]
+        if df.empty:
+            return 0
+        with transaction.atomic():
+            guardadas = DataManager.save_ohlcv_rows(df, pair_obj, timeframe=timeframe)
+            # la marca es la ultima vela que realmente quedo en la BD (si el guardado
+            # fallo no avanza)
+            state.last_timestamp = OHLCVData.objects.filter(
+                pair=pair_obj, timeframe=timeframe, timestamp__lte=df['timestamp'].iloc[-1].to_pydatetime(),
+            ).aggregate(ultima=Max('timestamp'))['ultima']
+            state.save(update_fields=['last_timestamp', 'updated_at'])
+        return guardadas
+
+    @staticmethod
+    def find_gaps(timestamps, timeframe, start, end):
+        """
+        Rangos de velas faltantes en [start, end] segun el espaciado del timeframe.
+        Devuelve lista de (desde, hasta) en ms, ambos incluidos.
+        """
+        duracion = timeframe_ms(timeframe)
+        inicio = -(-int(start.timestamp() * 1000) // duracion) * duracion
+        fin = int(end.timestamp() * 1000) // duracion * duracion
+        if fin < inicio:
+            return []
+        ms = pd.DatetimeIndex(pd.to_datetime(pd.Series(timestamps, dtype=object), utc=True)).as_unit('ns').asi8 // 10**6
+        ms = np.unique(ms[(ms >= inicio) & (ms <= fin)])
+        bordes = np.concatenate(([inicio - duracion], ms, [fin + duracion]))
+        saltos = np.flatnonzero(np.diff(bordes) > duracion)
+        return [(int(bordes[i]) + duracion, int(bordes[i + 1]) - duracion) for i in saltos]
+
+    @staticmethod
+    def _group_gaps(gaps, timeframe, limit=LIMITE):
+        """Junta huecos cercanos para pedirlos en una sola pagina de `limit` velas"""
+        duracion = timeframe_ms(timeframe)
+        grupos = []
+        for desde, hasta in gaps:
+            if grupos and hasta - grupos[-1][0] < limit * duracion:
+                grupos[-1] = (grupos[-1][0], hasta)
+            else:
+                grupos.append((desde, hasta))
+        return grupos
 
     @staticmethod
     def get_or_fetch(pair_symbol, timeframe='1m', start=None, end=None, limit=1000):
         """
-        Intenta obtener datos de la BD; si insuficientes, consulta exchange y guarda.
+        Intenta obtener datos de la BD; los huecos del rango [start, end] (por defecto
+        hasta la ultima vela cerrada) se piden al exchange, se guardan y se devuelve
+        todo junto. Sin start solo se va al exchange si la BD no tiene nada.
         Devuelve DataFrame con ohlcv.
         """
         try:
@@ -131,14 +278,52 @@ class DataManager:
             # no existe el par en BD -> fetch pero no guardar
             return DataManager.fetch_ohlcv_from_exchange(pair_symbol, timeframe, since=start, limit=limit)
         df_db = DataManager.get_ohlcv_from_db(pair_obj, timeframe, start=start, end=end)
-        # Si no hay datos en DB o rango insuficiente, fetch desde exchange
-        if df_db.empty:
-            df_ext = DataManager.fetch_ohlcv_from_exchange(pair_symbol, timeframe, since=start, limit=limit)
+        if df_db.empty and timeframe in DERIVADOS:
+            # los timeframes mayores se arman con las velas de 1m ya guardadas; se relee de la
+            # BD para quedarse solo con los buckets completos (el resto queda como hueco)
+            DataManager.resample_from_1m(pair_obj, start=start, end=end)
+            df_db = DataManager.get_ohlcv_from_db(pair_obj, timeframe, start=start, end=end)
+        if start is None:
+            # Si no hay datos en DB, fetch desde exchange
+            if df_db.empty:
+                df_ext = DataManager.fetch_ohlcv_from_exchange(pair_symbol, timeframe, since=start, limit=limit)
+                if not df_ext.empty:
+                    # la ultima vela puede seguir abierta: solo se guardan las cerradas
+                    duracion = pd.Timedelta(milliseconds=timeframe_ms(timeframe))
+                    cerradas = df_ext['timestamp'] + duracion <= pd.Timestamp.now(tz='UTC')
+                    DataManager.save_ohlcv_rows(df_ext[cerradas], pair_obj, timeframe=timeframe)
+                return df_ext
+            return df_db
+
+        inicio = DataManager._utc(start)
+        duracion = pd.Timedelta(milliseconds=timeframe_ms(timeframe))
+        # hasta la ultima vela cerrada: las futuras o la abierta no cuentan como hueco
+        fin = pd.Timestamp.now(tz='UTC') - duracion
+        if end is not None:
+            fin = min(fin, DataManager._utc(end))
+        gaps = DataManager.find_gaps(df_db['timestamp'], timeframe, inicio, fin)
+        if not gaps:
+            return df_db
+
+        partes = [df_db]
+        for desde, hasta in DataManager._group_gaps(gaps, timeframe):
+            cantidad = (hasta - desde) // timeframe_ms(timeframe) + 1
+            df_ext = DataManager.fetch_ohlcv_from_exchange(pair_symbol, timeframe, since=desde, limit=cantidad)
             if not df_ext.empty:
                 DataManager.save_ohlcv_rows(df_ext, pair_obj, timeframe=timeframe)
-            return df_ext
-        return df_db
+                partes.append(df_ext)
+        partes = [df for df in partes if not df.empty]
+        if not partes:
+            return df_db
 
+        df = pd.concat(partes, ignore_index=True)
+        df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        for columna in ('open', 'high', 'low', 'close', 'volume'):
+            df[columna] = df[columna].astype(float)
+        # si una vela esta en la BD y tambien llego del exchange se queda la de la BD
+        df = df.drop_duplicates('timestamp', keep='first')
+        df = df[(df['timestamp'] >= inicio) & (df['timestamp'] <= fin)]
+        return df.sort_values('timestamp').reset_index(drop=True)
 
 def calcular_estadisticas_desde_señales(señales):
     """Calcula estadísticas desde las señales de trading"""
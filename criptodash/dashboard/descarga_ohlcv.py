@@ -0,0 +1,114 @@
+# Descarga concurrente de velas historicas
+# historical_fetch_ohlcv pedia de a 1000 velas y cada pedido esperaba al anterior (un año
+# de 1m son mas de 500 idas y vueltas en serie), y al usar since = ultimo timestamp la
+# vela del borde de cada pagina quedaba repetida.
+# Aca el rango pedido se parte en ventanas independientes de `limite` velas que se bajan
+# en paralelo con un pool de threads sobre el cliente ccxt. Un limitador comun espacia los
+# pedidos segun el rateLimit del exchange, una ventana que falla se reintenta con espera
+# exponencial y al final las paginas se unen en orden y sin timestamps repetidos.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+CONCURRENCIA = 4
+REINTENTOS = 3
+ESPERA_REINTENTO = 1.0
+LIMITE = 1000
+
+UNIDADES_MS = {'m': 60 * 1000, 'h': 60 * 60 * 1000, 'd': 24 * 60 * 60 * 1000, 'w': 7 * 24 * 60 * 60 * 1000}
+
+
+def timeframe_ms(timeframe):
+    """Duracion de una vela en ms ('1m' -> 60000, '4h' -> 14400000)"""
+    try:
+        return int(timeframe[:-1]) * UNIDADES_MS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Timeframe desconocido: {timeframe}") from None
+
+
+def ventanas(desde, hasta, timeframe, limite=LIMITE):
+    """
+    Parte [desde, hasta] (ms, ambos incluidos) en ventanas [inicio, fin) de `limite` velas.
+    """
+    ancho = limite * timeframe_ms(timeframe)
+    return [(inicio, min(inicio + ancho, hasta + 1)) for inicio in range(desde, hasta + 1, ancho)]
+
+
+class LimiteTasa:
+    """Espacia los pedidos de todos los threads al menos `intervalo` segundos entre si"""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self._proximo = 0.0
+        self._lock = threading.Lock()
+
+    def esperar(self):
+        with self._lock:
+            ahora = time.monotonic()
+            turno = max(ahora, self._proximo)
+            self._proximo = turno + self.intervalo
+        if turno > ahora:
+            time.sleep(turno - ahora)
+
+
+def _con_reintentos(funcion, reintentos, espera):
+    for intento in range(reintentos + 1):
+        try:
+            return funcion()
+        except Exception:
+            if intento == reintentos:
+                raise
+            time.sleep(espera * 2 ** intento)
+
+
+def _bajar_ventana(exchange, pair, timeframe, inicio, fin, limite, limitador, reintentos, espera):
+    """Velas de [inicio, fin); si el exchange devuelve paginas mas cortas se sigue pidiendo"""
+    duracion = timeframe_ms(timeframe)
+    velas = []
+    desde = inicio
+    while desde < fin:
+        def pedir(desde=desde):
+            limitador.esperar()
+            return exchange.fetch_ohlcv(pair, timeframe, since=desde, limit=limite)
+
+        pagina = [vela for vela in _con_reintentos(pedir, reintentos, espera) if vela[0] < fin]
+        if not pagina:
+            break
+        velas.extend(pagina)
+        # la proxima pagina arranca despues de la ultima vela (sin repetir el borde)
+        desde = pagina[-1][0] + duracion
+    return velas
+
+
+def descargar_ohlcv(exchange, pair, timeframe, desde, hasta=None, limite=LIMITE,
+                    concurrencia=CONCURRENCIA, reintentos=REINTENTOS, espera=ESPERA_REINTENTO):
+    """
+    Baja las velas de `pair` entre `desde` y `hasta` (ms, incluidos) en paralelo.
+
+    Parameters:
+    - exchange: cliente ccxt (o cualquier objeto con fetch_ohlcv y rateLimit)
+    - hasta: por defecto ahora
+    - concurrencia: ventanas que se bajan a la vez
+    - reintentos: reintentos por pedido antes de abortar la descarga
+
+    Returns:
+    - lista de velas [timestamp, open, high, low, close, volume] ordenada y sin repetidos
+    """
+    if hasta is None:
+        hasta = int(time.time() * 1000)
+    limitador = LimiteTasa(getattr(exchange, 'rateLimit', 0) / 1000)
+    partes = ventanas(desde, hasta, timeframe, limite)
+
+    def bajar(ventana):
+        return _bajar_ventana(exchange, pair, timeframe, *ventana, limite, limitador, reintentos, espera)
+
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrencia, len(partes)))) as pool:
+        paginas = list(pool.map(bajar, partes))
+
+    # las ventanas no se pisan, pero un exchange puede repetir una vela dentro de una pagina
+    velas = {}
+    for pagina in paginas:
+        for vela in pagina:
+            velas[vela[0]] = vela
+    return [velas[timestamp] for timestamp in sorted(velas)]
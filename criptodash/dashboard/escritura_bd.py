@@ -0,0 +1,90 @@
+# Escritura masiva en la BD
+# upsert() manda las filas como tuplas de parametros en INSERT de muchas filas:
+# - MySQL: INSERT ... ON DUPLICATE KEY UPDATE
+# - SQLite / PostgreSQL: INSERT ... ON CONFLICT (claves) DO UPDATE
+# sin crear una instancia del modelo por fila. Para informar cuantas filas se insertaron
+# y cuantas se actualizaron se cuentan las filas que pueden coincidir con las claves del
+# lote antes y despues de escribirlo: la diferencia son las insertadas (el rowcount de
+# MySQL no sirve: con CLIENT_FOUND_ROWS, que Django activa, una fila insertada y una
+# existente sin cambios cuentan igual).
+
+from django.db import connections, transaction
+
+LOTE = 5000
+# limite de parametros por sentencia cuando el backend no declara uno
+MAX_PARAMETROS = 65535
+
+
+def _tamaño_lote(connection, columnas, batch_size):
+    maximo = connection.features.max_query_params or MAX_PARAMETROS
+    return max(1, min(batch_size, maximo // len(columnas)))
+
+
+def _sql_upsert(connection, tabla, columnas, claves, actualizar, filas):
+    q = connection.ops.quote_name
+    marcadores = '(' + ', '.join(['%s'] * len(columnas)) + ')'
+    sql = (f"INSERT INTO {q(tabla)} ({', '.join(q(c) for c in columnas)}) "
+           f"VALUES {', '.join([marcadores] * filas)}")
+    if connection.vendor == 'mysql':
+        return sql + ' ON DUPLICATE KEY UPDATE ' + ', '.join(f'{q(c)} = VALUES({q(c)})' for c in actualizar)
+    return (sql + f" ON CONFLICT ({', '.join(q(c) for c in claves)}) DO UPDATE SET "
+            + ', '.join(f'{q(c)} = excluded.{q(c)}' for c in actualizar))
+
+
+def _sql_contar(connection, tabla, claves, lote, posiciones):
+    """
+    COUNT(*) de las filas de la tabla que pueden coincidir con las claves del lote:
+    igualdad en las claves que tienen un solo valor en el lote e IN en las demas, asi
+    la consulta usa el indice unico.
+    """
+    q = connection.ops.quote_name
+    condiciones, parametros = [], []
+    for clave, posicion in zip(claves, posiciones):
+        distintos = list(dict.fromkeys(fila[posicion] for fila in lote))
+        if len(distintos) == 1:
+            condiciones.append(f'{q(clave)} = %s')
+        else:
+            condiciones.append(f"{q(clave)} IN ({', '.join(['%s'] * len(distintos))})")
+        parametros.extend(distintos)
+    return f"SELECT COUNT(*) FROM {q(tabla)} WHERE {' AND '.join(condiciones)}", parametros
+
+
+def upsert(modelo, columnas, filas, claves, actualizar, batch_size=LOTE, using='default'):
+    """
+    Inserta o actualiza `filas` en la tabla de `modelo` en lotes, dentro de una transaccion.
+
+    Parameters:
+    - columnas: nombres de columna de la tabla (ej. 'pair_id')
+    - filas: iterable de tuplas con los valores ya adaptados para la BD, en el orden de `columnas`
+    - claves: columnas del indice unico que define si la fila ya existe
+    - actualizar: columnas que se pisan cuando la fila ya existe
+
+    Returns:
+    - dict {'inserted': n, 'updated': m}
+    """
+    connection = connections[using]
+    tabla = modelo._meta.db_table
+    posiciones = [columnas.index(c) for c in claves]
+    # una clave repetida en la entrada se queda con la ultima fila (como si se
+    # escribieran en orden)
+    unicas = {}
+    for fila in filas:
+        unicas[tuple(fila[p] for p in posiciones)] = tuple(fila)
+    filas = list(unicas.values())
+
+    tamaño = _tamaño_lote(connection, columnas, batch_size)
+    insertadas = actualizadas = 0
+    with transaction.atomic(using=using), connection.cursor() as cursor:
+        for inicio in range(0, len(filas), tamaño):
+            lote = filas[inicio:inicio + tamaño]
+            contar, parametros = _sql_contar(connection, tabla, claves, lote, posiciones)
+            cursor.execute(contar, parametros)
+            antes = cursor.fetchone()[0]
+            cursor.execute(_sql_upsert(connection, tabla, columnas, claves, actualizar, len(lote)),
+                           [v for fila in lote for v in fila])
+            # solo las filas insertadas cambian el conteo
+            cursor.execute(contar, parametros)
+            nuevas = cursor.fetchone()[0] - antes
+            insertadas += nuevas
+            actualizadas += len(lote) - nuevas
+    return {'inserted': insertadas, 'updated': actualizadas}
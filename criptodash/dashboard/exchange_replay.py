@@ -0,0 +1,230 @@
+# Exchange de reproduccion (replay)
+# Implementa la parte de la API de ccxt que usa el proyecto (fetch_ohlcv, load_markets,
+# set_markets, milliseconds, parse8601, rateLimit) sirviendo velas locales en vez de
+# pedirlas a Binance, para medir ingesta, bot y backtests sin red ni rate limits:
+# - grabadas: un archivo por par y timeframe en un directorio, CSV o Parquet, con
+#   timestamp (ms o fecha) y OHLCV ('ETH_USDT_1m.csv'); si falta un timeframe se arma
+#   resampleando el de 1m
+# - sinteticas: random walk con semilla, reproducible, generado a demanda desde `inicio`
+#   (mismas velas para la misma semilla, par y timeframe sin importar el orden de pedidos)
+# Cada pedido espera `latencia` segundos (+ jitter) y devuelve a lo sumo `pagina` velas,
+# como un exchange real. Se elige con EXCHANGE_CLIENT['BACKEND'] = 'replay' (settings).
+
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from .descarga_ohlcv import timeframe_ms
+from .resampleo import COLUMNAS_OHLCV, resamplear
+
+PAGINA = 1000
+SEMILLA = 42
+INICIO = '2024-01-01'
+SIMBOLOS = ('BTC/USDT', 'ETH/USDT')
+# velas por bloque del generador sintetico
+BLOQUE = 100_000
+
+
+class ExchangeReplay:
+    """
+    Exchange falso con la interfaz de ccxt para velas.
+
+    Parameters:
+    - directorio: carpeta con velas grabadas (None = sinteticas)
+    - latencia / jitter: segundos que tarda cada pedido (jitter: maximo extra aleatorio)
+    - pagina: maximo de velas por pedido
+    - rate_limit: ms entre pedidos que respeta descargar_ohlcv (rateLimit de ccxt)
+    - semilla, inicio, simbolos: del generador sintetico
+    - reloj: ms fijos para milliseconds() (None = hora real); sirve para reproducir
+      una grabacion como si fuera "ahora"
+    """
+
+    def __init__(self, id='binance', directorio=None, latencia=0.0, jitter=0.0, pagina=PAGINA,
+                 rate_limit=0, semilla=SEMILLA, inicio=INICIO, simbolos=SIMBOLOS, reloj=None):
+        self.id = id
+        self.directorio = directorio
+        self.latencia = latencia
+        self.jitter = jitter
+        self.pagina = pagina
+        self.rateLimit = rate_limit
+        self.semilla = semilla
+        self.inicio = int(pd.Timestamp(inicio, tz='UTC').timestamp() * 1000)
+        self.simbolos = tuple(simbolos)
+        self.reloj = reloj
+        self.markets = {}
+        self.currencies = {}
+        self.llamadas = 0
+        self._series = {}
+        self._lock = threading.Lock()
+        self.set_markets(self._mercados())
+
+    @classmethod
+    def desde_config(cls, id, config):
+        """Instancia a partir de EXCHANGE_CLIENT['REPLAY']"""
+        return cls(
+            id=id,
+            directorio=config.get('DIR'),
+            latencia=config.get('LATENCY', 0.0),
+            jitter=config.get('JITTER', 0.0),
+            pagina=config.get('PAGE_SIZE', PAGINA),
+            rate_limit=config.get('RATE_LIMIT', 0),
+            semilla=config.get('SEED', SEMILLA),
+            inicio=config.get('START', INICIO),
+            simbolos=config.get('SYMBOLS', SIMBOLOS),
+            reloj=config.get('CLOCK'),
+        )
+
+    # --- interfaz ccxt ---
+
+    def milliseconds(self):
+        return int(time.time() * 1000) if self.reloj is None else int(self.reloj)
+
+    def parse8601(self, texto):
+        try:
+            fecha = pd.Timestamp(texto)
+        except (TypeError, ValueError):
+            return None
+        fecha = fecha.tz_localize('UTC') if fecha.tzinfo is None else fecha.tz_convert('UTC')
+        return int(fecha.timestamp() * 1000)
+
+    def load_markets(self, reload=False, params={}):
+        if reload or not self.markets:
+            self.set_markets(self._mercados())
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = dict(markets)
+        if currencies is None:
+            monedas = {m.get('base') for m in self.markets.values()} | {m.get('quote') for m in self.markets.values()}
+            currencies = {moneda: {'id': moneda, 'code': moneda} for moneda in monedas if moneda}
+        self.currencies = currencies
+        return self.markets
+
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params={}):
+        """Velas [timestamp, open, high, low, close, volume] desde `since`, como ccxt"""
+        self._esperar()
+        limit = min(limit or self.pagina, self.pagina)
+        duracion = timeframe_ms(timeframe)
+        ahora = self.milliseconds()
+        if since is None:
+            since = ahora - ahora % duracion - (limit - 1) * duracion
+        ms, valores = self._serie(symbol, timeframe, min(since + limit * duracion, ahora + duracion))
+        # hasta la vela en curso (abierta) incluida
+        desde = np.searchsorted(ms, since, side='left')
+        hasta = min(desde + limit, np.searchsorted(ms, ahora, side='right'))
+        columnas = [ms[desde:hasta].tolist()] + [valores[c][desde:hasta].tolist() for c in COLUMNAS_OHLCV]
+        return [list(vela) for vela in zip(*columnas)]
+
+    def fetch_balance(self, params={}):
+        return {'info': {}, 'free': {}, 'used': {}, 'total': {}}
+
+    def create_order(self, *args, **kwargs):
+        raise NotImplementedError("ExchangeReplay no opera: solo sirve velas")
+
+    cancel_order = create_order
+
+    # --- datos ---
+
+    def _esperar(self):
+        with self._lock:
+            self.llamadas += 1
+        espera = self.latencia + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if espera > 0:
+            time.sleep(espera)
+
+    def _mercados(self):
+        simbolos = self._simbolos_grabados() if self.directorio else self.simbolos
+        mercados = {}
+        for simbolo in simbolos:
+            base, _, quote = simbolo.partition('/')
+            mercados[simbolo] = {
+                'id': simbolo.replace('/', ''), 'symbol': simbolo, 'base': base, 'quote': quote,
+                'type': 'spot', 'spot': True, 'active': True,
+                'precision': {'price': 1e-8, 'amount': 1e-8}, 'limits': {},
+            }
+        return mercados
+
+    def _simbolos_grabados(self):
+        simbolos = set()
+        for archivo in os.listdir(self.directorio):
+            nombre, extension = os.path.splitext(archivo)
+            if extension in ('.csv', '.parquet') and nombre.count('_') >= 2:
+                base, quote, _ = nombre.rsplit('_', 2)
+                simbolos.add(f'{base}/{quote}')
+        return sorted(simbolos)
+
+    def _serie(self, symbol, timeframe, hasta):
+        """(ms, {columna: array}) de (symbol, timeframe) que cubre al menos hasta `hasta`"""
+        with self._lock:
+            serie = self._series.get((symbol, timeframe))
+            if serie is None or (self.directorio is None and serie[0][-1] < hasta):
+                if self.directorio:
+                    serie = self._grabadas(symbol, timeframe)
+                else:
+                    serie = self._sinteticas(symbol, timeframe, hasta, serie)
+                self._series[(symbol, timeframe)] = serie
+        return serie
+
+    def _archivo(self, symbol, timeframe):
+        nombre = f"{symbol.replace('/', '_')}_{timeframe}"
+        for extension in ('.parquet', '.csv'):
+            ruta = os.path.join(self.directorio, nombre + extension)
+            if os.path.exists(ruta):
+                return ruta
+        return None
+
+    def _grabadas(self, symbol, timeframe):
+        ruta = self._archivo(symbol, timeframe)
+        if ruta is None:
+            origen = self._archivo(symbol, '1m')
+            if origen is None:
+                return np.array([], dtype=np.int64), {c: np.array([]) for c in COLUMNAS_OHLCV}
+            df = resamplear(self._leer(origen), [timeframe])[timeframe]
+        else:
+            df = self._leer(ruta)
+        ms = pd.DatetimeIndex(df['timestamp']).as_unit('ns').asi8 // 10**6
+        orden = np.argsort(ms, kind='stable')
+        return ms[orden], {c: df[c].to_numpy(dtype=float)[orden] for c in COLUMNAS_OHLCV}
+
+    @staticmethod
+    def _leer(ruta):
+        df = pd.read_parquet(ruta) if ruta.endswith('.parquet') else pd.read_csv(ruta)
+        if pd.api.types.is_numeric_dtype(df['timestamp']):
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms', utc=True)
+        else:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], utc=True)
+        return df
+
+    def _sinteticas(self, symbol, timeframe, hasta, serie):
+        """Extiende la serie sintetica de a bloques hasta cubrir `hasta`"""
+        duracion = timeframe_ms(timeframe)
+        if serie is None:
+            ms = np.array([], dtype=np.int64)
+            valores = {c: np.array([]) for c in COLUMNAS_OHLCV}
+        else:
+            ms, valores = serie
+        inicio = self.inicio - self.inicio % duracion
+        partes_ms, partes = [ms], {c: [valores[c]] for c in COLUMNAS_OHLCV}
+        bloque = len(ms) // BLOQUE
+        ultimo_close = valores['close'][-1] if len(ms) else 100.0
+        while (partes_ms[-1][-1] if len(partes_ms[-1]) else inicio - duracion) < hasta:
+            # cada bloque tiene su propia semilla: el resultado no depende de cuanto se pidio
+            rng = np.random.default_rng([self.semilla, zlib.crc32(symbol.encode()), duracion, bloque])
+            retornos = rng.normal(0, 0.001 * np.sqrt(duracion / 60000), BLOQUE)
+            close = ultimo_close * np.exp(np.cumsum(retornos))
+            open_ = np.concatenate(([ultimo_close], close[:-1]))
+            mecha = np.abs(rng.normal(0, 0.0005, (2, BLOQUE)))
+            partes_ms.append(inicio + (bloque * BLOQUE + np.arange(BLOQUE, dtype=np.int64)) * duracion)
+            partes['open'].append(open_)
+            partes['high'].append(np.maximum(open_, close) * (1 + mecha[0]))
+            partes['low'].append(np.minimum(open_, close) * (1 - mecha[1]))
+            partes['close'].append(close)
+            partes['volume'].append(rng.gamma(2.0, 50.0, BLOQUE))
+            ultimo_close = close[-1]
+            bloque += 1
+        return np.concatenate(partes_ms), {c: np.concatenate(v) for c, v in partes.items()}
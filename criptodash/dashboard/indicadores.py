@@ -13,6 +13,10 @@
 import pandas as pd
 import numpy as np
 
+from . import indicadores_puros as puros
+from .indicadores_puros import _njit
+from .arbitraje_señales import COMPRA, VENTA, NINGUNA, Señal, arbitrar, colapsar_duplicados, desde_condiciones
+
 # True range 
 # Esta funcion calcula el true range--> Es el maximo de 3 valores
 # 1 La diferencia entre high y Low
@@ -20,14 +24,9 @@ import numpy as np
 # 3 La diferencia entre low y el valor anterior de close
 
 def tr(data):
-    data['previous_close'] = data['close'].shift(1)
-    data['high_low'] = abs(data['high'] - data['low'])
-    data['high_pc'] = abs(data['high'] - data['previous_close'])
-    data['low_pc'] = abs(data['low'] - data['previous_close'])
-
-    tr = data[['high_low', 'high_pc', 'low_pc']].max(axis=1)
+    tr = puros.true_range(data['high'], data['low'], data['close'])
 
-    return tr
+    return pd.Series(tr, index=data.index)
 
 # Average true Range
 # Esta funcion calcula el average true range--> Es el promedio de los true range en el
@@ -35,10 +34,9 @@ def tr(data):
 # Este indicador sirve para medir volatilidad en el mercado
 
 def atr(data, period):
-    data['tr'] = tr(data)
-    atr = data['tr'].rolling(period).mean()
+    atr = puros.atr(data['high'], data['low'], data['close'], period)
 
-    return atr
+    return pd.Series(atr, index=data.index)
 
 
 # Indicador RSI  
@@ -66,20 +64,10 @@ def atr(data, period):
 # 
 #  
 def calculate_rsi(df, period=14):
-    # Calculate the differences between each consecutive closing price
-    differences = df['close'].diff()
-    
-    # Calculate the absolute value of the differences
-    absolute_differences = differences.abs()
-    
-    # Calculate the average gain and average loss
-    avg_gain = absolute_differences.rolling(window=period).mean()
-    avg_loss = -absolute_differences.rolling(window=period).mean()
+    # Diferencias absolutas entre cierres consecutivos, promedio movil de ganancia y perdida
+    rsi = puros.rsi(df['close'], period)
     
-    # Calculate the RSI value
-    rsi = 100 - (100 / (1 + (avg_gain / avg_loss)))
-    
-    return rsi
+    return pd.Series(rsi, index=df.index)
 
 # Es una funcion que calcula el indicador de tendencia "Supertrade" combina la deteccion de la tendencia y la volatilidad
 # Se usa para detectar cambios de tendencia y colocar stop loss.
@@ -90,28 +78,10 @@ def calculate_rsi(df, period=14):
 # 3 Si la banda superior es menor que la banda inferior
 
 def supertrend(df, period=7, atr_multiplier=3):
-    hl2 = (df['high'] + df['low']) / 2
-    df['atr'] = atr(df, period)
-    df['upperband'] = hl2 + (atr_multiplier * df['atr'])
-    df['lowerband'] = hl2 - (atr_multiplier * df['atr'])
-    df['in_uptrend'] = True
-
-    for current in range(1, len(df.index)):
-        previous = current - 1
-
-        if df['close'][current] > df['upperband'][previous]:
-            df['in_uptrend'][current] = True
-        elif df['close'][current] < df['lowerband'][previous]:
-            df['in_uptrend'][current] = False
-        else:
-            df['in_uptrend'][current] = df['in_uptrend'][previous]
-
-            if df['in_uptrend'][current] and df['lowerband'][current] < df['lowerband'][previous]:
-                df['lowerband'][current] = df['lowerband'][previous]
+    resultado = puros.supertrend(df['high'], df['low'], df['close'], period, atr_multiplier)
+    for columna, valores in resultado.items():
+        df[columna] = valores
 
-            if not df['in_uptrend'][current] and df['upperband'][current] > df['upperband'][previous]:
-                df['upperband'][current] = df['upperband'][previous]
-        
     return df
 
 # Funcion que calcula el indicador MACD (moving average convergence divergence) 
@@ -129,11 +99,9 @@ def supertrend(df, period=7, atr_multiplier=3):
 #               -- Cuando el histograma crece, crece el impulso u lo mismo para cuando decrece
 
 def macd(df, short_period=12, long_period=26, signal_period=9):
-    df['ema_short'] = df['close'].ewm(span=short_period, adjust=False).mean()
-    df['ema_long'] = df['close'].ewm(span=long_period, adjust=False).mean()
-    df['macd'] = df['ema_short'] - df['ema_long']
-    df['signal_macd'] = df['macd'].ewm(span=signal_period, adjust=False).mean()
-    df['macd_hist'] = df['macd'] - df['signal_macd']
+    resultado = puros.macd(df['close'], short_period, long_period, signal_period)
+    for columna, valores in resultado.items():
+        df[columna] = valores
     return df
 
 # ///Calculate the Bollinger Bands with a window size of 20 and standard deviation of 2 ////
@@ -165,29 +133,9 @@ def bollinger_bands(data, window=20, num_std=2, generate_signals=True):
     - DataFrame con Bollinger Bands y señales
     """
     
-    # Calcular componentes básicos
-    data['bb_middle'] = data['close'].rolling(window=window).mean()
-    data['bb_std'] = data['close'].rolling(window=window).std()
-    
-    # Bandas superior e inferior
-    data['bb_upper'] = data['bb_middle'] + (data['bb_std'] * num_std)
-    data['bb_lower'] = data['bb_middle'] - (data['bb_std'] * num_std)
-    
-    # Bandas adicionales (para más información)
-    data['bb_upper_1std'] = data['bb_middle'] + data['bb_std']  # 1 desviación
-    data['bb_lower_1std'] = data['bb_middle'] - data['bb_std']  # 1 desviación
-    
-    # Ancho de las bandas (indicador de volatilidad)
-    data['bb_width'] = (data['bb_upper'] - data['bb_lower']) / data['bb_middle']
-    
-    # Posición del precio relativa a las bandas
-    data['bb_position'] = (data['close'] - data['bb_lower']) / (data['bb_upper'] - data['bb_lower'])
-    
-    # %B indicator
-    data['bb_percent_b'] = (data['close'] - data['bb_lower']) / (data['bb_upper'] - data['bb_lower'])
-    
-    # Bandwidth (ancho normalizado)
-    data['bb_bandwidth'] = (data['bb_upper'] - data['bb_lower']) / data['bb_middle']
+    # Media, desviacion, bandas (2 y 1 desviaciones), ancho, posicion y %B
+    for columna, valores in puros.bollinger(data['close'], window, num_std).items():
+        data[columna] = valores
     
     # Generar señales si se solicita
     
@@ -196,172 +144,383 @@ def bollinger_bands(data, window=20, num_std=2, generate_signals=True):
     
     return data
 
-def generate_bb_signals(data, window):
+def generate_bb_signals(data, window, strategies=('bounce', 'squeeze', 'breakout', 'trend')):
     """
     Genera señales de compra/venta basadas en Bollinger Bands
+
+    Cada estrategia emite su señal y se arbitran por prioridad: solo se escribe
+    en las filas que siguen libres (la primera señal gana), en el orden de `strategies`.
     """
     # Inicializar columna de señales si no existe
     if 'signal_buy_sell' not in data.columns:
         data['signal_buy_sell'] = ' '
-    
-    # Estrategia 1: Rebote en bandas
-    data = bb_bounce_strategy(data, window)
-    
-    # Estrategia 2: Squeeze (compresión)
-    data = bb_squeeze_strategy(data)
-    
-    # Estrategia 3: Breakout con confirmación
-    data = bb_breakout_strategy(data, window)
-    
-    # Estrategia 4: Tendencia con bandas
-    data = bb_trend_strategy(data)
-    
+
+    return _escribir_señales(data, señales_bb(data, window, strategies))
+
+def señales_bb(data, window, strategies=('bounce', 'squeeze', 'breakout', 'trend')):
+    """Una Señal por estrategia de Bollinger, en el orden de `strategies`"""
+    señales = []
+    for nombre in strategies:
+        tipo, condiciones = BB_CONDICIONES[nombre]
+        señales.append(Señal(tipo, desde_condiciones(*condiciones(data, window))))
+    return señales
+
+# Utilidades para las estrategias vectorizadas
+
+def _valores(data, columna):
+    return data[columna].to_numpy(dtype=float)
+
+def _anterior(valores, periodos=1):
+    """Desplaza un array hacia adelante (equivalente a shift) rellenando con NaN"""
+    resultado = np.full(len(valores), np.nan)
+    if periodos < len(valores):
+        resultado[periodos:] = valores[:len(valores) - periodos]
+    return resultado
+
+def _desde(data, inicio):
+    """Mascara de filas a partir de la posicion `inicio`"""
+    return np.arange(len(data)) >= inicio
+
+def _aplicar_señales(data, compra, venta, signal_type):
+    """
+    Escribe las señales en las filas libres (signal_buy_sell == '').
+    Si una fila cumple compra y venta, gana la compra.
+    """
+    return _escribir_señales(data, [Señal(signal_type, desde_condiciones(compra, venta))])
+
+def _escribir_señales(data, señales, regla='prioridad'):
+    """Arbitra `señales` sobre las filas libres y escribe signal_buy_sell y signal_type"""
+    if not señales:
+        return data
+    libre = data['signal_buy_sell'].to_numpy() == ''
+    direccion, tipo, _ = arbitrar(señales, regla, libre)
+    hay = direccion != NINGUNA
+    if not hay.any():
+        return data
+
+    if 'signal_type' not in data.columns:
+        data['signal_type'] = pd.Series(np.nan, index=data.index, dtype=object)
+    data.loc[direccion == COMPRA, 'signal_buy_sell'] = 'buy'
+    data.loc[direccion == VENTA, 'signal_buy_sell'] = 'sell'
+    data.loc[hay, 'signal_type'] = tipo[hay]
     return data
+
+def _bb_bounce_condiciones(data, window):
+    close = _valores(data, 'close')
+    previous_close = _anterior(close)
+    bb_upper = _valores(data, 'bb_upper')
+    bb_lower = _valores(data, 'bb_lower')
+    # Minimo/maximo de las 3 velas anteriores
+    min_reciente = _anterior(puros.minimo_movil(_valores(data, 'low'), 3, min_periods=1))
+    max_reciente = _anterior(puros.maximo_movil(_valores(data, 'high'), 3, min_periods=1))
+
+    # Volumen creciente (si está disponible)
+    if 'volume' in data.columns:
+        volume = _valores(data, 'volume')
+        volumen_creciente = (volume > _anterior(volume)).astype(int)
+    else:
+        volumen_creciente = 1
+
+    # SEÑAL DE COMPRA: Rebote en banda inferior
+    buy_conditions = (
+        # Precio toca o cruza la banda inferior
+        ((close <= bb_lower) | (previous_close <= bb_lower)).astype(int)
+        # Y luego se recupera
+        + (close > previous_close)
+        # Confirmación: precio por encima del mínimo reciente
+        + (close > min_reciente)
+        + volumen_creciente
+    )
+
+    # SEÑAL DE VENTA: Rebote en banda superior
+    sell_conditions = (
+        # Precio toca o cruza la banda superior
+        ((close >= bb_upper) | (previous_close >= bb_upper)).astype(int)
+        # Y luego retrocede
+        + (close < previous_close)
+        # Confirmación: precio por debajo del máximo reciente
+        + (close < max_reciente)
+        + volumen_creciente
+    )
+
+    validas = _desde(data, window)
+    return validas & (buy_conditions >= 3), validas & (sell_conditions >= 3)
+
 def bb_bounce_strategy(data, window):
     """
     Señales cuando el precio rebota en las bandas
     """
-    #print(data.loc[:,['timestamp', 'close', 'signal_buy_sell']].head())
-    
-    for i in range(window, len(data)):
-        current_close = data['close'].iloc[i]
-        previous_close = data['close'].iloc[i-1]
-        bb_upper = data['bb_upper'].iloc[i]
-        bb_lower = data['bb_lower'].iloc[i]
-        bb_middle = data['bb_middle'].iloc[i]
-        
-        # SEÑAL DE COMPRA: Rebote en banda inferior
-        buy_conditions = [
-            # Precio toca o cruza la banda inferior
-            current_close <= bb_lower or previous_close <= bb_lower,
-            # Y luego se recupera
-            current_close > previous_close,
-            # Confirmación: precio por encima del mínimo reciente
-            current_close > data['low'].iloc[i-3:i].min(),
-            # Volumen creciente (si está disponible)
-            'volume' in data.columns and data['volume'].iloc[i] > data['volume'].iloc[i-1] if 'volume' in data.columns else True
-        ]
-        
-        # SEÑAL DE VENTA: Rebote en banda superior
-        sell_conditions = [
-            # Precio toca o cruza la banda superior
-            current_close >= bb_upper or previous_close >= bb_upper,
-            # Y luego retrocede
-            current_close < previous_close,
-            # Confirmación: precio por debajo del máximo reciente
-            current_close < data['high'].iloc[i-3:i].max(),
-            # Volumen creciente (si está disponible)
-            'volume' in data.columns and data['volume'].iloc[i] > data['volume'].iloc[i-1] if 'volume' in data.columns else True
-        ]
-        
-        # Asignar señales (priorizar señales fuertes)
-        if sum(buy_conditions) >= 3 and data['signal_buy_sell'].iloc[i] == '':
-            data.loc[data.index[i], 'signal_buy_sell'] = 'buy'
-            data.loc[data.index[i], 'signal_type'] = 'BB_BOUNCE'
-        
-        elif sum(sell_conditions) >= 3 and data['signal_buy_sell'].iloc[i] == '':
-            data.loc[data.index[i], 'signal_buy_sell'] = 'sell'
-            data.loc[data.index[i], 'signal_type'] = 'BB_BOUNCE'
-    #print(data['signal_buy_sell'])
-    return data
-def bb_squeeze_strategy(data):
+    compra, venta = _bb_bounce_condiciones(data, window)
+    return _aplicar_señales(data, compra, venta, 'BB_BOUNCE')
+# Cuantil online P² (Jain y Chlamtac): estima un cuantil con 5 marcadores, O(1) por dato
+# y sin guardar el historico. Se usa como umbral causal del squeeze: cada barra solo
+# ve el ancho de banda de las barras anteriores y de si misma.
+
+def _p2_recorrer(valores, p, q, pos, deseada, incremento, salida, count):
+    for k in range(len(valores)):
+        x = valores[k]
+        if x == x:
+            if count < 5:
+                # Las primeras 5 observaciones se guardan ordenadas
+                j = count
+                while j > 0 and q[j - 1] > x:
+                    q[j] = q[j - 1]
+                    j -= 1
+                q[j] = x
+                count += 1
+                if count == 5:
+                    for i in range(5):
+                        pos[i] = float(i)
+                    deseada[0] = 0.0
+                    deseada[1] = 2 * p
+                    deseada[2] = 4 * p
+                    deseada[3] = 2 + 2 * p
+                    deseada[4] = 4.0
+                    incremento[0] = 0.0
+                    incremento[1] = p / 2
+                    incremento[2] = p
+                    incremento[3] = (1 + p) / 2
+                    incremento[4] = 1.0
+            else:
+                if x < q[0]:
+                    q[0] = x
+                    celda = 0
+                elif x >= q[4]:
+                    q[4] = x
+                    celda = 3
+                else:
+                    celda = 0
+                    while x >= q[celda + 1]:
+                        celda += 1
+                for i in range(celda + 1, 5):
+                    pos[i] += 1
+                for i in range(5):
+                    deseada[i] += incremento[i]
+                # Ajustar los marcadores centrales (parabolico, o lineal si se sale de orden)
+                for i in range(1, 4):
+                    d = deseada[i] - pos[i]
+                    if (d >= 1 and pos[i + 1] - pos[i] > 1) or (d <= -1 and pos[i - 1] - pos[i] < -1):
+                        s = 1.0 if d > 0 else -1.0
+                        qp = q[i] + s / (pos[i + 1] - pos[i - 1]) * (
+                            (pos[i] - pos[i - 1] + s) * (q[i + 1] - q[i]) / (pos[i + 1] - pos[i])
+                            + (pos[i + 1] - pos[i] - s) * (q[i] - q[i - 1]) / (pos[i] - pos[i - 1])
+                        )
+                        if q[i - 1] < qp < q[i + 1]:
+                            q[i] = qp
+                        else:
+                            j = i + int(s)
+                            q[i] = q[i] + s * (q[j] - q[i]) / (pos[j] - pos[i])
+                        pos[i] += s
+                count += 1
+
+        # Estimacion actual (exacta mientras hay menos de 5 observaciones)
+        if count == 0:
+            salida[k] = np.nan
+        elif count < 5:
+            h = p * (count - 1)
+            lo = int(h)
+            if lo + 1 < count:
+                salida[k] = q[lo] + (h - lo) * (q[lo + 1] - q[lo])
+            else:
+                salida[k] = q[lo]
+        else:
+            salida[k] = q[2]
+    return count
+
+
+if _njit is not None:
+    _p2_recorrer_jit = _njit(cache=True)(_p2_recorrer)
+else:
+    _p2_recorrer_jit = None
+
+
+def cuantil_p2(valores, p):
+    """
+    Estimacion online del cuantil `p` despues de cada valor (los NaN se ignoran).
+
+    Returns:
+    - array con la estimacion en cada posicion (NaN hasta la primera observacion)
+    """
+    valores = np.asarray(valores, dtype=float)
+    if _p2_recorrer_jit is not None:
+        salida = np.empty(len(valores))
+        _p2_recorrer_jit(valores, float(p), np.zeros(5), np.zeros(5), np.zeros(5), np.zeros(5), salida, 0)
+        return salida
+    salida = [np.nan] * len(valores)
+    _p2_recorrer(valores.tolist(), float(p), [0.0] * 5, [0.0] * 5, [0.0] * 5, [0.0] * 5, salida, 0)
+    return np.array(salida, dtype=float)
+
+
+class P2Quantile:
+    """Estimador online de un cuantil (P²), O(1) en tiempo y memoria por dato"""
+
+    def __init__(self, p):
+        self.p = float(p)
+        self.count = 0
+        self.value = np.nan
+        self._q = [0.0] * 5
+        self._pos = [0.0] * 5
+        self._deseada = [0.0] * 5
+        self._incremento = [0.0] * 5
+
+    def update(self, x):
+        salida = [self.value]
+        self.count = _p2_recorrer([float(x)], self.p, self._q, self._pos, self._deseada,
+                                  self._incremento, salida, self.count)
+        self.value = salida[0]
+        return self.value
+
+
+def _bb_squeeze_condiciones(data, quantile=0.1, min_periods=50, max_espera=10):
+    bandwidth = _valores(data, 'bb_bandwidth')
+    n = len(bandwidth)
+
+    # Umbral causal: cuantil online del ancho de banda hasta cada barra
+    umbral = cuantil_p2(bandwidth, quantile)
+    umbral[np.cumsum(~np.isnan(bandwidth)) < min_periods] = np.nan
+
+    expansion = bandwidth > umbral * 2
+    # Condición de SQUEEZE: bandas muy estrechas
+    squeeze = _desde(data, 20) & (bandwidth < umbral) & ~expansion
+
+    # Siguiente barra de expansion (recorrido inverso): siguiente[k] = primera expansion >= k
+    indices = np.arange(n)
+    siguiente = np.minimum.accumulate(np.where(expansion, indices, n)[::-1])[::-1]
+    objetivo = np.full(n, n)
+    objetivo[:-1] = siguiente[1:]
+    # La expansion tiene que llegar dentro de las `max_espera` barras siguientes
+    validos = squeeze & (objetivo - indices < max_espera) & (objetivo < n)
+
+    señal = np.zeros(n, dtype=bool)
+    señal[objetivo[validos]] = True
+    alcista = _valores(data, 'close') > _valores(data, 'bb_middle')
+    return señal & alcista, señal & ~alcista
+
+def bb_squeeze_strategy(data, quantile=0.1, min_periods=50, max_espera=10):
     """
     Señales cuando las bandas se comprimen (baja volatilidad)
     seguido de expansión (posible breakout)
+
+    El umbral de squeeze es el cuantil `quantile` del ancho de banda estimado
+    online (P²) hasta cada barra, asi no usa datos futuros.
     """
-    # Umbral para considerar squeeze (bandas muy estrechas)
-    squeeze_threshold = data['bb_bandwidth'].quantile(0.1)  # 10% más estrecho
-    
-    for i in range(20, len(data)):
-        # Condición de SQUEEZE: bandas muy estrechas
-        is_squeeze = data['bb_bandwidth'].iloc[i] < squeeze_threshold
-        
-        # Buscar expansión después del squeeze
-        if is_squeeze:
-            # Mirar hacia adelante para detectar expansión
-            for j in range(i+1, min(i+10, len(data))):
-                expansion = data['bb_bandwidth'].iloc[j] > squeeze_threshold * 2
-                
-                if expansion:
-                    direction = 'buy' if data['close'].iloc[j] > data['bb_middle'].iloc[j] else 'sell'
-                    
-                    if data['signal_buy_sell'].iloc[j] == '':
-                        data.loc[data.index[j], 'signal_buy_sell'] = direction
-                        data.loc[data.index[j], 'signal_type'] = 'BB_SQUEEZE'
-                    break
-    
-    return data
+    compra, venta = _bb_squeeze_condiciones(data, quantile, min_periods, max_espera)
+    return _aplicar_señales(data, compra, venta, 'BB_SQUEEZE')
+
+
+class SqueezeDetector:
+    """
+    Version incremental de bb_squeeze_strategy: se le pasa una vela cerrada por vez
+    y devuelve 'buy', 'sell' o None. Da las mismas señales que la version por lotes.
+    """
+
+    def __init__(self, quantile=0.1, min_periods=50, max_espera=10, inicio=20):
+        self.min_periods = min_periods
+        self.max_espera = max_espera
+        self.inicio = inicio
+        self._cuantil = P2Quantile(quantile)
+        self._barras = 0
+        self._ultimo_squeeze = None
+
+    def update(self, bandwidth, close, bb_middle):
+        i = self._barras
+        self._barras += 1
+        umbral = self._cuantil.update(bandwidth)
+        if self._cuantil.count < self.min_periods:
+            umbral = np.nan
+
+        if bandwidth > umbral * 2:
+            señal = None
+            if self._ultimo_squeeze is not None and i - self._ultimo_squeeze < self.max_espera:
+                señal = 'buy' if close > bb_middle else 'sell'
+            # Todos los squeezes anteriores ya encontraron su expansion
+            self._ultimo_squeeze = None
+            return señal
+        if i >= self.inicio and bandwidth < umbral:
+            self._ultimo_squeeze = i
+        return None
+
+def _bb_breakout_condiciones(data, window):
+    close = _valores(data, 'close')
+    previous_close = _anterior(close)
+    high = _valores(data, 'high')
+    low = _valores(data, 'low')
+    bandwidth = _valores(data, 'bb_bandwidth')
+    # Expansión de las bandas
+    expansion = bandwidth > _anterior(bandwidth)
+    vela_alcista = close > _valores(data, 'open')
+    vela_bajista = close < _valores(data, 'open')
+
+    # BREAKOUT ALCISTA: Rompe banda superior con fuerza
+    bullish_breakout = (
+        (close > _valores(data, 'bb_upper')).astype(int)
+        + (close > previous_close)
+        + (high > _anterior(high))
+        + vela_alcista
+        + expansion
+    )
+
+    # BREAKOUT BAJISTA: Rompe banda inferior con fuerza
+    bearish_breakout = (
+        (close < _valores(data, 'bb_lower')).astype(int)
+        + (close < previous_close)
+        + (low < _anterior(low))
+        + vela_bajista
+        + expansion
+    )
+
+    validas = _desde(data, window)
+    return validas & (bullish_breakout >= 4), validas & (bearish_breakout >= 4)
 
 def bb_breakout_strategy(data, window):
     """
     Señales de breakout con confirmación
     """
-    for i in range(window, len(data)):
-        current_close = data['close'].iloc[i]
-        previous_close = data['close'].iloc[i-1]
-        bb_upper = data['bb_upper'].iloc[i]
-        bb_lower = data['bb_lower'].iloc[i]
-        
-        # BREAKOUT ALCISTA: Rompe banda superior con fuerza
-        bullish_breakout = [
-            current_close > bb_upper,
-            current_close > previous_close,
-            data['high'].iloc[i] > data['high'].iloc[i-1],
-            data['close'].iloc[i] > data['open'].iloc[i],  # Vela alcista
-            data['bb_bandwidth'].iloc[i] > data['bb_bandwidth'].iloc[i-1]  # Expansión
-        ]
-        
-        # BREAKOUT BAJISTA: Rompe banda inferior con fuerza
-        bearish_breakout = [
-            current_close < bb_lower,
-            current_close < previous_close,
-            data['low'].iloc[i] < data['low'].iloc[i-1],
-            data['close'].iloc[i] < data['open'].iloc[i],  # Vela bajista
-            data['bb_bandwidth'].iloc[i] > data['bb_bandwidth'].iloc[i-1]  # Expansión
-        ]
-        
-        if sum(bullish_breakout) >= 4 and data['signal_buy_sell'].iloc[i] == '':
-            data.loc[data.index[i], 'signal_buy_sell'] = 'buy'
-            data.loc[data.index[i], 'signal_type'] = 'BB_BREAKOUT'
-        
-        elif sum(bearish_breakout) >= 4 and data['signal_buy_sell'].iloc[i] == '':
-            data.loc[data.index[i], 'signal_buy_sell'] = 'sell'
-            data.loc[data.index[i], 'signal_type'] = 'BB_BREAKOUT'
-    
-    return data
+    compra, venta = _bb_breakout_condiciones(data, window)
+    return _aplicar_señales(data, compra, venta, 'BB_BREAKOUT')
+
+def _bb_trend_condiciones(data):
+    close = _valores(data, 'close')
+    previous_close = _anterior(close)
+    bb_middle = _valores(data, 'bb_middle')
+    percent_b = _valores(data, 'bb_percent_b')
+
+    # Tendencia alcista/bajista: precio sobre/bajo la media móvil
+    uptrend = close > bb_middle
+    downtrend = close < bb_middle
+    # Sobrecompra / sobrevendido: precio cerca de la banda superior / inferior
+    overbought = percent_b > 0.8
+    oversold = percent_b < 0.2
+
+    validas = _desde(data, 20)
+    # Compra en tendencia alcista con retroceso a sobrevendido, confirmada por recuperación
+    compra = validas & uptrend & oversold & (close > previous_close)
+    # Venta en tendencia bajista con rally a sobrecomprado, confirmada por caída
+    venta = validas & downtrend & overbought & (close < previous_close)
+    return compra, venta
 
 def bb_trend_strategy(data):
     """
     Señales basadas en la tendencia y posición en las bandas
     """
-    for i in range(20, len(data)):
-        # Tendencia alcista: precio sobre la media móvil
-        uptrend = data['close'].iloc[i] > data['bb_middle'].iloc[i]
-        
-        # Tendencia bajista: precio bajo la media móvil
-        downtrend = data['close'].iloc[i] < data['bb_middle'].iloc[i]
-        
-        # Sobrecompra: precio cerca de banda superior
-        overbought = data['bb_percent_b'].iloc[i] > 0.8
-        
-        # Sobrevendido: precio cerca de banda inferior
-        oversold = data['bb_percent_b'].iloc[i] < 0.2
-        
-        # SEÑAL: Compra en tendencia alcista con retroceso a sobrevendido
-        if uptrend and oversold and data['signal_buy_sell'].iloc[i] == '':
-            # Confirmación: precio comienza a recuperarse
-            if data['close'].iloc[i] > data['close'].iloc[i-1]:
-                data.loc[data.index[i], 'signal_buy_sell'] = 'buy'
-                data.loc[data.index[i], 'signal_type'] = 'BB_TREND'
-        
-        # SEÑAL: Venta en tendencia bajista con rally a sobrecomprado
-        elif downtrend and overbought and data['signal_buy_sell'].iloc[i] == '':
-            # Confirmación: precio comienza a caer
-            if data['close'].iloc[i] < data['close'].iloc[i-1]:
-                data.loc[data.index[i], 'signal_buy_sell'] = 'sell'
-                data.loc[data.index[i], 'signal_type'] = 'BB_TREND'
-    
-    return data
+    compra, venta = _bb_trend_condiciones(data)
+    return _aplicar_señales(data, compra, venta, 'BB_TREND')
+
+# Estrategias disponibles para generate_bb_signals, en orden de prioridad
+BB_ESTRATEGIAS = {
+    'bounce': bb_bounce_strategy,
+    'squeeze': lambda data, window: bb_squeeze_strategy(data),
+    'breakout': bb_breakout_strategy,
+    'trend': lambda data, window: bb_trend_strategy(data),
+}
+
+# Tipo de señal y condiciones (compra, venta) de cada estrategia
+BB_CONDICIONES = {
+    'bounce': ('BB_BOUNCE', _bb_bounce_condiciones),
+    'squeeze': ('BB_SQUEEZE', lambda data, window: _bb_squeeze_condiciones(data)),
+    'breakout': ('BB_BREAKOUT', _bb_breakout_condiciones),
+    'trend': ('BB_TREND', lambda data, window: _bb_trend_condiciones(data)),
+}
 
 
 # Ichimoku Cloud
@@ -375,30 +534,57 @@ def ichimoku_cloud(data, tenkan=9, kijun=26, senkou=52):
     """
     Calcula Ichimoku Cloud y genera señales de compra/venta
     """
-    # Calcular componentes Ichimoku (tu código actual mejorado)
-    data['tenkan'] = (data['high'].rolling(tenkan).max() + data['low'].rolling(tenkan).min()) / 2
-    data['kijun'] = (data['high'].rolling(kijun).max() + data['low'].rolling(kijun).min()) / 2
-    data['senkou_a'] = ((data['tenkan'] + data['kijun']) / 2).shift(kijun)
-    data['senkou_b'] = ((data['high'].rolling(senkou).max() + data['low'].rolling(senkou).min()) / 2).shift(kijun)
-    data['chikou'] = data['close'].shift(-kijun)
-    
-    # Calcular senkou_c (tu lógica actual)
-    data['senkou_c'] = np.nan
-    for current in range(1, len(data.index)):
-        if data['senkou_a'][current] < data['senkou_b'][current]:
-            data['senkou_c'][current] = data['senkou_a'][current]
-        elif data['senkou_a'][current] > data['senkou_b'][current]:
-            data['senkou_c'][current] = data['senkou_b'][current]
-        elif data['senkou_a'][current] == data['senkou_b'][current]:
-            data['senkou_c'][current] = data['senkou_b'][current]
+    # Calcular componentes Ichimoku (tenkan, kijun, senkou_a/b/c y chikou)
+    for columna, valores in puros.ichimoku(data['high'], data['low'], data['close'], tenkan, kijun, senkou).items():
+        data[columna] = valores
     
-    # ✅ AGREGAR ESTA NUEVA FUNCIONALIDAD:
     # Generar señales de compra/venta
     print("Generando señales de ichimoku compra/venta...")
     data = generar_señales_ichimoku(data, kijun)
     
     return data
 
+def _ichimoku_condiciones(data, kijun=26):
+    """
+    Cuenta cuantas condiciones de compra y de venta se cumplen en cada fila
+
+    Returns:
+    - (compra_count, venta_count) como arrays de enteros
+    """
+    tenkan = _valores(data, 'tenkan')
+    kijun_sen = _valores(data, 'kijun')
+    close = _valores(data, 'close')
+    senkou_a = _valores(data, 'senkou_a')
+    senkou_b = _valores(data, 'senkou_b')
+    tenkan_prev = _anterior(tenkan)
+    kijun_prev = _anterior(kijun_sen)
+    # Chikou Span comparado con el cierre de hace `kijun` barras
+    chikou_lag = _anterior(_valores(data, 'chikou'), kijun)
+    close_lag = _anterior(close, kijun)
+    con_chikou = _desde(data, kijun * 2)
+
+    compra_count = (
+        # 1. TK Cross Alcista (Tenkan cruza Kijun hacia arriba)
+        ((tenkan > kijun_sen) & (tenkan_prev <= kijun_prev)).astype(int)
+        # 2. Precio por encima de la nube
+        + ((close > senkou_a) & (close > senkou_b))
+        # 3. Nube alcista (Senkou A > Senkou B)
+        + (senkou_a > senkou_b)
+        # 4. Confirmación Chikou Span (opcional)
+        + (con_chikou & (chikou_lag > close_lag))
+    )
+    venta_count = (
+        # 1. TK Cross Bajista (Tenkan cruza Kijun hacia abajo)
+        ((tenkan < kijun_sen) & (tenkan_prev >= kijun_prev)).astype(int)
+        # 2. Precio por debajo de la nube
+        + ((close < senkou_a) & (close < senkou_b))
+        # 3. Nube bajista (Senkou A < Senkou B)
+        + (senkou_a < senkou_b)
+        # 4. Confirmación Chikou Span (opcional)
+        + (con_chikou & (chikou_lag < close_lag))
+    )
+    return compra_count, venta_count
+
 def generar_señales_ichimoku(data, kijun=26):
     """
     Genera señales de compra/venta basadas en Ichimoku
@@ -412,61 +598,30 @@ def generar_señales_ichimoku(data, kijun=26):
         # Asegurar que los valores existentes sean numéricos
         data['signal_strenght'] = pd.to_numeric(data['signal_strenght'], errors='coerce').fillna(0)
 
-    # Generar señales para cada punto a partir del período kijun
-    for i in range(kijun, len(data)):
-        # Condiciones para SEÑAL DE COMPRA
-        current_strength = data['signal_strenght'].iloc[i] if i < len(data) else 0
-        if not isinstance(current_strength, (int, float)):
-            current_strength = 0
-        condiciones_compra = [
-            # 1. TK Cross Alcista (Tenkan cruza Kijun hacia arriba)
-            (data['tenkan'].iloc[i] > data['kijun'].iloc[i]) and 
-            (data['tenkan'].iloc[i-1] <= data['kijun'].iloc[i-1]),
-            
-            # 2. Precio por encima de la nube
-            (data['close'].iloc[i] > data['senkou_a'].iloc[i]) and 
-            (data['close'].iloc[i] > data['senkou_b'].iloc[i]),
-            
-            # 3. Nube alcista (Senkou A > Senkou B)
-            data['senkou_a'].iloc[i] > data['senkou_b'].iloc[i],
-            
-            # 4. Confirmación Chikou Span (opcional)
-            (i >= kijun*2) and (data['chikou'].iloc[i-kijun] > data['close'].iloc[i-kijun])
-        ]
-        
-        # Condiciones para SEÑAL DE VENTA
-        condiciones_venta = [
-            # 1. TK Cross Bajista (Tenkan cruza Kijun hacia abajo)
-            (data['tenkan'].iloc[i] < data['kijun'].iloc[i]) and 
-            (data['tenkan'].iloc[i-1] >= data['kijun'].iloc[i-1]),
-            
-            # 2. Precio por debajo de la nube
-            (data['close'].iloc[i] < data['senkou_a'].iloc[i]) and 
-            (data['close'].iloc[i] < data['senkou_b'].iloc[i]),
-            
-            # 3. Nube bajista (Senkou A < Senkou B)
-            data['senkou_a'].iloc[i] < data['senkou_b'].iloc[i],
-            
-            # 4. Confirmación Chikou Span (opcional)
-            (i >= kijun*2) and (data['chikou'].iloc[i-kijun] < data['close'].iloc[i-kijun])
-        ]
-        
-        # Contar condiciones cumplidas
-        compra_count = sum(condiciones_compra)
-        venta_count = sum(condiciones_venta)
-        current_strength = data['signal_strenght'].iloc[i]
-        # Asignar señales (mínimo 2 condiciones para señal)
-        if compra_count >= 2:
-            data.at[data.index[i], 'signal_buy_sell'] = 'buy'
-            data.at[data.index[i], 'signal_strenght'] = current_strength + compra_count
-        
-        elif venta_count >= 2:
-            data.at[data.index[i], 'signal_buy_sell'] = 'sell'
-            data.at[data.index[i], 'signal_strenght'] = current_strength + venta_count
-        # Si no se cumple ninguna condición, se mantiene vacío
+    señal = señal_ichimoku(data, kijun)
+    data.loc[señal.direccion == COMPRA, 'signal_buy_sell'] = 'buy'
+    data.loc[señal.direccion == VENTA, 'signal_buy_sell'] = 'sell'
+    # La fuerza acumula la cantidad de condiciones cumplidas
+    data['signal_strenght'] = data['signal_strenght'] + señal.fuerza
     print("señales de compra/venta generadas")
     return data
 
+def señal_ichimoku(data, kijun=26):
+    """Señal Ichimoku: minimo 2 condiciones a partir del período kijun, fuerza = condiciones cumplidas"""
+    compra_count, venta_count = _ichimoku_condiciones(data, kijun)
+    validas = _desde(data, kijun)
+    direccion = desde_condiciones(validas & (compra_count >= 2), validas & (venta_count >= 2))
+    fuerza = np.where(direccion == COMPRA, compra_count, np.where(direccion == VENTA, venta_count, 0))
+    return Señal('ICHIMOKU', direccion, fuerza)
+
+def señal_supertrend(df):
+    """Señal en cada cambio de tendencia del supertrend (in_uptrend), fuerza 1"""
+    in_uptrend = df['in_uptrend'].to_numpy(dtype=bool)
+    anterior = np.zeros(len(in_uptrend), dtype=bool)
+    anterior[1:] = in_uptrend[:-1]
+    cambio = _desde(df, 1) & (anterior != in_uptrend)
+    return Señal('SUPERTREND', desde_condiciones(cambio & in_uptrend, cambio & ~in_uptrend))
+
 def enhanced_bollinger_bands(data, window=20, num_std=2, strategy='all'):
     """
     Función completa de Bollinger Bands mejorada
@@ -476,21 +631,11 @@ def enhanced_bollinger_bands(data, window=20, num_std=2, strategy='all'):
     """
     
     # Calcular bandas básicas
-    data = bollinger_bands(data, window, num_std, generate_signals=True)
+    data = bollinger_bands(data, window, num_std, generate_signals=False)
     print("bandas básicas calculadas")
-    # Aplicar estrategias seleccionadas
-    if strategy in ['bounce', 'all']:
-        data = bb_bounce_strategy(data, window)
-        print("bounce aplicadas")
-    if strategy in ['squeeze', 'all']:
-        data = bb_squeeze_strategy(data)
-    print("squeeze y bounce aplicadas")
-    if strategy in ['breakout', 'all']:
-        data = bb_breakout_strategy(data, window)
-    print("breakout aplicada")
-    if strategy in ['trend', 'all']:
-        data = bb_trend_strategy(data)
-    print("trend aplicada")
+    # Aplicar estrategias seleccionadas (cada una una sola vez)
+    strategies = list(BB_ESTRATEGIAS) if strategy == 'all' else [strategy]
+    data = generate_bb_signals(data, window, strategies)
     print("estrategias aplicadas")
     # Limpiar señales duplicadas (priorizar la primera señal)
     data = clean_duplicate_signals(data)
@@ -499,23 +644,16 @@ def enhanced_bollinger_bands(data, window=20, num_std=2, strategy='all'):
 
 def clean_duplicate_signals(data):
     """
-    Limpia señales duplicadas consecutivas
+    Limpia señales duplicadas consecutivas (se queda con la primera de cada racha)
     """
-    last_signal = ''
-    for i in range(len(data)):
-        current_signal = data['signal_buy_sell'].iloc[i]
-        if current_signal == last_signal and current_signal != '':
-            data.loc[data.index[i], 'signal_buy_sell'] = ''
-        else:
-            last_signal = current_signal
-    
+    data['signal_buy_sell'] = colapsar_duplicados(data['signal_buy_sell'].to_numpy(dtype=object), '')
     return data
 
 # Donchian Channels
 # window 20
 def donchian_channels(data,window):
-    data['upper_channel'] = data['high'].rolling(window=window).max()
-    data['lower_channel'] = data['low'].rolling(window=window).min()
+    for columna, valores in puros.donchian(data['high'], data['low'], window).items():
+        data[columna] = valores
     return data
 
 
@@ -545,112 +683,87 @@ def generate_rsi_signals(df, rsi_period=14, overbought=70, oversold=30):
     if 'signal_strenght' not in df.columns:
         df['signal_strenght'] = 0
     
-    # Generar señales para cada punto
-    for i in range(1, len(df)):
-        current_strength = df['signal_strenght'].iloc[i]
-        current_rsi = df['rsi'].iloc[i]
-        previous_rsi = df['rsi'].iloc[i-1]
-        
-        # SEÑAL DE COMPRA: RSI sale de zona de sobreventa
-        buy_conditions = [
-            # RSI estaba en zona de sobreventa y ahora sale
-            previous_rsi <= oversold and current_rsi > oversold,
-            # Confirmación: RSI en tendencia alcista
-            current_rsi > previous_rsi,
-            # El precio confirma (opcional)
-            df['close'].iloc[i] > df['close'].iloc[i-1]
-        ]
-        
-        # SEÑAL DE VENTA: RSI sale de zona de sobrecompra
-        sell_conditions = [
-            # RSI estaba en zona de sobrecompra y ahora sale
-            previous_rsi >= overbought and current_rsi < overbought,
-            # Confirmación: RSI en tendencia bajista
-            current_rsi < previous_rsi,
-            # El precio confirma (opcional)
-            df['close'].iloc[i] < df['close'].iloc[i-1]
-        ]
-        
-        # SEÑAL FUERTE: Divergencia alcista
-        bullish_divergence = detect_bullish_divergence(df, i, rsi_period)
-        
-        # SEÑAL FUERTE: Divergencia bajista
-        bearish_divergence = detect_bearish_divergence(df, i, rsi_period)
-        
-        # Asignar señales (priorizar divergencias)
-        if bullish_divergence and df['signal_buy_sell'].iloc[i] == '':
-            df.loc[df.index[i], 'signal_buy_sell'] = 'buy'
-            df.loc[df.index[i], 'signal_type'] = 'RSI_DIVERGENCE'
-            df.loc[df.index[i], 'signal_strenght'] = current_strength + 2
-        
-        elif bearish_divergence and df['signal_buy_sell'].iloc[i] == '':
-            df.loc[df.index[i], 'signal_buy_sell'] = 'sell'
-            df.loc[df.index[i], 'signal_type'] = 'RSI_DIVERGENCE'
-            df.loc[df.index[i], 'signal_strenght'] = current_strength + 2
-            
-        elif sum(buy_conditions) >= 2 and df['signal_buy_sell'].iloc[i] == '':
-            df.loc[df.index[i], 'signal_buy_sell'] = 'buy'
-            df.loc[df.index[i], 'signal_type'] = 'RSI_OVERSOLD'
-            df.loc[df.index[i], 'signal_strenght'] = current_strength + 1
-            
-        elif sum(sell_conditions) >= 2 and df['signal_buy_sell'].iloc[i] == '':
-            df.loc[df.index[i], 'signal_buy_sell'] = 'sell'
-            df.loc[df.index[i], 'signal_type'] = 'RSI_OVERBOUGHT'
-            df.loc[df.index[i], 'signal_strenght'] = current_strength + 1
+    # Condiciones de todas las filas a la vez (la fila 0 no tiene anterior);
+    # cada fila libre toma la primera señal que cumple (las divergencias primero)
+    libre = _desde(df, 1) & (df['signal_buy_sell'].to_numpy() == '')
+    direccion, tipo, fuerza = arbitrar(señales_rsi(df, rsi_period, overbought, oversold), libre=libre)
+    hay = direccion != NINGUNA
+
+    df.loc[direccion == COMPRA, 'signal_buy_sell'] = 'buy'
+    df.loc[direccion == VENTA, 'signal_buy_sell'] = 'sell'
+    df.loc[hay, 'signal_type'] = tipo[hay]
+    df['signal_strenght'] = df['signal_strenght'] + fuerza
     
     return df
 
-def detect_bullish_divergence(df, current_index, lookback_period=14):
-    """
-    Detecta divergencia alcista: Precio hace lower low, RSI hace higher low
+def señales_rsi(df, rsi_period=14, overbought=70, oversold=30):
+    """Señales RSI en orden de prioridad: divergencias (fuerza 2), sobreventa y sobrecompra (fuerza 1)"""
+    bullish_divergence, bearish_divergence = _divergencias_rsi(df, rsi_period)
+    buy_conditions, sell_conditions = _rsi_condiciones(df, overbought, oversold)
+    return [
+        Señal('RSI_DIVERGENCE', desde_condiciones(bullish_divergence, bearish_divergence), 2),
+        Señal('RSI_OVERSOLD', desde_condiciones(buy_conditions >= 2, False)),
+        Señal('RSI_OVERBOUGHT', desde_condiciones(False, sell_conditions >= 2)),
+    ]
+
+def _rsi_condiciones(df, overbought=70, oversold=30):
     """
-    if current_index < lookback_period * 2:
-        return False
-    
-    # Buscar mínimo reciente en precio
-    price_lookback = df['close'].iloc[current_index-lookback_period:current_index]
-    if len(price_lookback) < 5:
-        return False
-    
-    current_low = df['low'].iloc[current_index]
-    recent_lows = df['low'].iloc[current_index-5:current_index]
-    
-    # Buscar mínimo reciente en RSI
-    rsi_lookback = df['rsi'].iloc[current_index-lookback_period:current_index]
-    current_rsi = df['rsi'].iloc[current_index]
-    recent_rsi = df['rsi'].iloc[current_index-5:current_index]
-    
-    # Condiciones para divergencia alcista
-    is_price_lower_low = current_low == recent_lows.min()
-    is_rsi_higher_low = current_rsi > recent_rsi.min()
-    
-    return is_price_lower_low and is_rsi_higher_low
+    Cuenta las condiciones de compra/venta del RSI en cada fila
 
-def detect_bearish_divergence(df, current_index, lookback_period=14):
+    Returns:
+    - (buy_conditions, sell_conditions) como arrays de enteros
     """
-    Detecta divergencia bajista: Precio hace higher high, RSI hace lower high
+    current_rsi = _valores(df, 'rsi')
+    previous_rsi = _anterior(current_rsi)
+    close = _valores(df, 'close')
+    previous_close = _anterior(close)
+
+    # SEÑAL DE COMPRA: RSI sale de zona de sobreventa
+    buy_conditions = (
+        # RSI estaba en zona de sobreventa y ahora sale
+        ((previous_rsi <= oversold) & (current_rsi > oversold)).astype(int)
+        # Confirmación: RSI en tendencia alcista
+        + (current_rsi > previous_rsi)
+        # El precio confirma (opcional)
+        + (close > previous_close)
+    )
+
+    # SEÑAL DE VENTA: RSI sale de zona de sobrecompra
+    sell_conditions = (
+        # RSI estaba en zona de sobrecompra y ahora sale
+        ((previous_rsi >= overbought) & (current_rsi < overbought)).astype(int)
+        # Confirmación: RSI en tendencia bajista
+        + (current_rsi < previous_rsi)
+        # El precio confirma (opcional)
+        + (close < previous_close)
+    )
+    return buy_conditions, sell_conditions
+
+def _divergencias_rsi(df, lookback_period=14, recientes=5):
     """
-    if current_index < lookback_period * 2:
-        return False
-    
-    # Buscar máximo reciente en precio
-    price_lookback = df['high'].iloc[current_index-lookback_period:current_index]
-    if len(price_lookback) < 5:
-        return False
-    
-    current_high = df['high'].iloc[current_index]
-    recent_highs = df['high'].iloc[current_index-5:current_index]
-    
-    # Buscar máximo reciente en RSI
-    rsi_lookback = df['rsi'].iloc[current_index-lookback_period:current_index]
-    current_rsi = df['rsi'].iloc[current_index]
-    recent_rsi = df['rsi'].iloc[current_index-5:current_index]
-    
-    # Condiciones para divergencia bajista
-    is_price_higher_high = current_high == recent_highs.max()
-    is_rsi_lower_high = current_rsi < recent_rsi.max()
-    
-    return is_price_higher_high and is_rsi_lower_high
+    Divergencias del RSI en todas las filas a la vez, comparando cada vela con el minimo
+    (alcista) o el maximo (bajista) de las `recientes` velas anteriores.
+
+    Returns:
+    - (bullish, bearish) como arrays booleanos
+    """
+    if lookback_period < recientes:
+        sin_divergencia = np.zeros(len(df), dtype=bool)
+        return sin_divergencia, sin_divergencia
+
+    def anterior_min(columna):
+        return _anterior(puros.minimo_movil(_valores(df, columna), recientes, min_periods=1))
+
+    def anterior_max(columna):
+        return _anterior(puros.maximo_movil(_valores(df, columna), recientes, min_periods=1))
+
+    rsi = _valores(df, 'rsi')
+    validas = _desde(df, lookback_period * 2)
+    # Alcista: precio hace lower low, RSI hace higher low
+    bullish = validas & (_valores(df, 'low') == anterior_min('low')) & (rsi > anterior_min('rsi'))
+    # Bajista: precio hace higher high, RSI hace lower high
+    bearish = validas & (_valores(df, 'high') == anterior_max('high')) & (rsi < anterior_max('rsi'))
+    return bullish, bearish
 
 # Función mejorada de RSI que incluye señales
 def calculate_rsi_with_signals(df, period=14, overbought=70, oversold=30):
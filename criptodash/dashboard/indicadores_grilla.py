@@ -0,0 +1,96 @@
+# Indicadores para grillas de parametros
+# Para optimizar supertrend, bollinger o macd hay que probar muchas combinaciones de
+# parametros sobre el mismo par. Estas funciones reciben arrays de parametros (uno por
+# combinacion) y devuelven arrays 2D (combinaciones x velas) en una sola pasada:
+# el true range, las medias/desviaciones de cada ventana y las emas de cada periodo se
+# calculan una vez y se reutilizan en todas las combinaciones que las usan.
+# Cada fila es identica a la que devuelve la funcion de indicadores_puros con esos
+# parametros.
+
+import numpy as np
+
+from . import indicadores_puros as puros
+
+
+def combinaciones(*valores):
+    """
+    Producto cartesiano de listas de parametros.
+
+    combinaciones([7, 10], [2, 3]) -> (array([7, 7, 10, 10]), array([2, 3, 2, 3]))
+    """
+    mallas = np.meshgrid(*(np.asarray(v) for v in valores), indexing='ij')
+    return tuple(malla.ravel() for malla in mallas)
+
+
+def _por_valor(parametros, calcular):
+    """
+    Calcula `calcular(valor)` una vez por valor distinto de `parametros` y devuelve
+    el array 2D con una fila por parametro.
+    """
+    distintos, filas = np.unique(parametros, return_inverse=True)
+    return np.stack([calcular(valor) for valor in distintos.tolist()])[filas.ravel()]
+
+
+def _parametros(*listas):
+    listas = [np.atleast_1d(lista) for lista in listas]
+    return np.broadcast_arrays(*listas)
+
+
+def supertrend_grilla(high, low, close, periods, atr_multipliers):
+    """
+    Supertrend para cada par (period, atr_multiplier).
+
+    Parameters:
+    - high, low, close: arrays de una sola serie
+    - periods, atr_multipliers: arrays con un valor por combinacion (ver combinaciones())
+
+    Returns:
+    - dict con atr, upperband, lowerband, in_uptrend como arrays combinaciones x velas
+    """
+    periods, atr_multipliers = _parametros(periods, atr_multipliers)
+    high, low = puros._array(high), puros._array(low)
+    true_range = puros.true_range(high, low, close)
+    atr = _por_valor(periods, lambda period: puros.media_movil(true_range, int(period)))
+    hl2 = (high + low) / 2
+    multiplicador = atr_multipliers[:, None]
+    upperband, lowerband, in_uptrend = puros.bandas_supertrend(
+        close, hl2 + (multiplicador * atr), hl2 - (multiplicador * atr))
+    return {'atr': atr, 'upperband': upperband, 'lowerband': lowerband, 'in_uptrend': in_uptrend}
+
+
+def bollinger_grilla(close, windows, num_stds):
+    """
+    Bollinger Bands para cada par (window, num_std).
+
+    Returns:
+    - dict con las mismas columnas que indicadores_puros.bollinger, combinaciones x velas
+    """
+    windows, num_stds = _parametros(windows, num_stds)
+    close = puros._array(close)
+    bb_middle = _por_valor(windows, lambda window: puros.media_movil(close, int(window)))
+    bb_std = _por_valor(windows, lambda window: puros.desviacion_movil(close, int(window)))
+    return puros.bollinger_desde_media(close, bb_middle, bb_std, num_stds[:, None])
+
+
+def macd_grilla(close, short_periods, long_periods, signal_periods):
+    """
+    MACD para cada combinacion (short_period, long_period, signal_period).
+
+    Las emas del cierre se calculan una vez por periodo distinto y la linea de señal
+    una vez por signal_period distinto (todas las filas con ese periodo juntas).
+
+    Returns:
+    - dict con macd, signal_macd y macd_hist, combinaciones x velas
+    """
+    short_periods, long_periods, signal_periods = _parametros(short_periods, long_periods, signal_periods)
+    periodos = np.concatenate((short_periods, long_periods))
+    distintos, filas = np.unique(periodos, return_inverse=True)
+    emas = np.stack([puros.ema(close, int(span)) for span in distintos.tolist()])
+    filas = filas.ravel()
+    linea = emas[filas[:len(short_periods)]] - emas[filas[len(short_periods):]]
+
+    signal_macd = np.empty_like(linea)
+    for span in np.unique(signal_periods).tolist():
+        seleccion = signal_periods == span
+        signal_macd[seleccion] = puros.ema(linea[seleccion], int(span))
+    return {'macd': linea, 'signal_macd': signal_macd, 'macd_hist': linea - signal_macd}
@@ -0,0 +1,101 @@
+# Calculo de indicadores para muchos pares a la vez
+# Los pares se alinean en una grilla de timestamps comun como arrays (pares x velas) y el
+# planificador de indicadores_registro calcula cada indicador para todos los pares en la
+# misma llamada (rolling/ewm de pandas por columnas, sparse table para los extremos y el
+# nucleo 2D del supertrend), en vez de correr un pipeline de pandas por par.
+#
+# Un par que empieza o termina antes o despues que los demas queda con NaN en esos
+# extremos de la grilla y sus valores son los mismos que si se calculara solo. Si le
+# faltan velas en el medio (huecos), esas velas cuentan como faltantes en las ventanas.
+
+import numpy as np
+import pandas as pd
+
+from .indicadores_registro import planificar
+
+COLUMNAS_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+INDICADORES_LOTE = ('supertrend', 'macd', 'bollinger', 'ichimoku', 'rsi')
+
+
+class Lote:
+    """
+    Pares alineados en una grilla de tiempo.
+
+    - simbolos: lista de pares (orden de las filas)
+    - timestamps: DatetimeIndex de la grilla (orden de las columnas)
+    - paneles: {columna: array pares x velas} con NaN donde el par no tiene vela
+    - presentes: array booleano pares x velas
+    """
+
+    def __init__(self, simbolos, timestamps, paneles, presentes):
+        self.simbolos = simbolos
+        self.timestamps = timestamps
+        self.paneles = paneles
+        self.presentes = presentes
+
+    def __len__(self):
+        return len(self.simbolos)
+
+
+def _contiguas(posiciones):
+    """Si las posiciones son consecutivas (lo normal) devuelve un slice, que evita copiar"""
+    if len(posiciones) and (np.diff(posiciones) == 1).all():
+        return slice(posiciones[0], posiciones[-1] + 1)
+    return posiciones
+
+
+def alinear(frames, columnas=COLUMNAS_OHLCV):
+    """
+    Alinea varios DataFrames OHLCV (con columna timestamp) en una grilla comun.
+
+    Parameters:
+    - frames: dict {simbolo: DataFrame}
+
+    Returns:
+    - Lote
+    """
+    simbolos = list(frames)
+    limpios = []
+    for simbolo in simbolos:
+        df = frames[simbolo]
+        duplicados = df['timestamp'].duplicated(keep='last')
+        limpios.append(df[~duplicados] if duplicados.any() else df)
+    timestamps = pd.DatetimeIndex(
+        pd.concat([df['timestamp'] for df in limpios]).unique() if limpios else []).sort_values()
+
+    paneles = {c: np.full((len(simbolos), len(timestamps)), np.nan) for c in columnas}
+    presentes = np.zeros((len(simbolos), len(timestamps)), dtype=bool)
+    for fila, df in enumerate(limpios):
+        posiciones = _contiguas(timestamps.get_indexer(df['timestamp']))
+        presentes[fila, posiciones] = True
+        for columna in columnas:
+            if columna in df.columns:
+                paneles[columna][fila, posiciones] = df[columna].to_numpy(dtype=float)
+    return Lote(simbolos, timestamps, paneles, presentes)
+
+
+def calcular_lote(frames, indicadores=INDICADORES_LOTE, parametros=None):
+    """
+    Calcula los indicadores de todos los pares en una sola pasada.
+
+    Parameters:
+    - frames: dict {simbolo: DataFrame OHLCV con columna timestamp}
+    - indicadores: nombres registrados en indicadores_registro.REGISTRO
+    - parametros: dict opcional {indicador: {parametro: valor}}
+
+    Returns:
+    - dict {simbolo: DataFrame} con timestamp, OHLCV y las columnas de los indicadores,
+      solo con las velas que tenia cada par
+    """
+    lote = alinear(frames)
+    valores = planificar(indicadores, parametros).ejecutar(lote.paneles)
+
+    paneles = list(lote.paneles.items()) + list(valores.items())
+    resultados = {}
+    for fila, simbolo in enumerate(lote.simbolos):
+        posiciones = _contiguas(np.flatnonzero(lote.presentes[fila]))
+        datos = {'timestamp': lote.timestamps[posiciones]}
+        for columna, panel in paneles:
+            datos[columna] = panel[fila, posiciones]
+        resultados[simbolo] = pd.DataFrame(datos)
+    return resultados
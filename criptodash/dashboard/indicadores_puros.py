@@ -0,0 +1,315 @@
+# Capa funcional de indicadores
+# Las funciones reciben arrays (o Series) de OHLCV, devuelven solo las columnas pedidas
+# como dict de arrays de numpy y nunca modifican los datos de entrada.
+# indicadores.py usa estas funciones para llenar el DataFrame sin columnas intermedias
+# (previous_close, high_low, tr, ema_short, ...).
+# Las funciones *_desde_* reciben las primitivas ya calculadas (medias, desviaciones,
+# extremos moviles, emas) para que indicadores_registro pueda compartirlas.
+# Todas aceptan tambien arrays 2D (series x velas), por ejemplo varios pares alineados
+# en la misma grilla de tiempo (ver indicadores_lote): cada fila se calcula por separado
+# pero en la misma llamada.
+
+import numpy as np
+import pandas as pd
+
+# numba es opcional: si esta instalado se compilan los nucleos que recorren fila por fila
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+
+def _array(valores):
+    return np.asarray(valores, dtype=float)
+
+
+def _serie(valores):
+    """Series (1D) o DataFrame con una columna por serie (2D: series x velas)"""
+    valores = _array(valores)
+    return pd.DataFrame(valores.T) if valores.ndim == 2 else pd.Series(valores)
+
+
+def _numpy(resultado):
+    """Vuelve de _serie() a un array con la misma forma que la entrada"""
+    return resultado.to_numpy().T if resultado.ndim == 2 else resultado.to_numpy()
+
+
+def true_range(high, low, close):
+    """Maximo entre high-low, |high-close anterior| y |low-close anterior| (ignora NaN)"""
+    high, low, close = _array(high), _array(low), _array(close)
+    previous_close = np.full(close.shape, np.nan)
+    previous_close[..., 1:] = close[..., :-1]
+    rangos = np.fmax(np.abs(high - low), np.abs(high - previous_close))
+    return np.fmax(rangos, np.abs(low - previous_close))
+
+
+def media_movil(valores, window):
+    return _numpy(_serie(valores).rolling(window).mean())
+
+
+def desviacion_movil(valores, window):
+    return _numpy(_serie(valores).rolling(window).std())
+
+
+def extremos_moviles(valores, windows, maximo=True, min_periods=None):
+    """
+    Maximo (o minimo) movil para varias ventanas con una sola sparse table.
+
+    El nivel k de la tabla guarda el extremo de cada bloque de 2**k valores; el de una
+    ventana de tamaño w sale de dos bloques del nivel floor(log2(w)) que se solapan. Los
+    niveles se construyen una vez para la ventana mayor y sirven a todas las demas.
+    Igual que rolling(w, min_periods).max()/.min(): ignora los NaN y devuelve NaN si en
+    la ventana hay menos de min_periods (por defecto w) valores validos.
+
+    Returns:
+    - dict {window: array} (cada array con la forma de `valores`)
+    """
+    valores = _array(valores)
+    if np.isinf(valores).any():
+        # rolling() de pandas trata los infinitos como faltantes
+        valores = np.where(np.isinf(valores), np.nan, valores)
+    n = valores.shape[-1]
+    extremo = np.fmax if maximo else np.fmin
+    niveles = [valores]
+    while 2 ** len(niveles) <= max(windows) and niveles[-1].shape[-1] > 2 ** (len(niveles) - 1):
+        paso = 2 ** (len(niveles) - 1)
+        niveles.append(extremo(niveles[-1][..., :-paso], niveles[-1][..., paso:]))
+    nulos = np.isnan(valores)
+    validos = None
+    if nulos.any():
+        validos = np.concatenate(
+            (np.zeros(valores.shape[:-1] + (1,), dtype=int), np.cumsum(~nulos, axis=-1)), axis=-1)
+
+    resultado = {}
+    for window in windows:
+        salida = np.full(valores.shape, np.nan)
+        # ventanas incompletas del principio: extremo acumulado desde la primera vela
+        parcial = min(window - 1, n)
+        salida[..., :parcial] = extremo.accumulate(valores[..., :parcial], axis=-1)
+        if n >= window:
+            k = window.bit_length() - 1
+            paso = 2 ** k
+            nivel = niveles[k]
+            salida[..., window - 1:] = extremo(nivel[..., :n - window + 1], nivel[..., window - paso:n - paso + 1])
+        minimo_validos = window if min_periods is None else max(min_periods, 1)
+        if validos is None:
+            # sin NaN: solo faltan observaciones en las primeras velas
+            salida[..., :min(minimo_validos - 1, n)] = np.nan
+        else:
+            fin = np.arange(1, n + 1)
+            observaciones = validos[..., fin] - validos[..., np.maximum(fin - window, 0)]
+            salida[observaciones < minimo_validos] = np.nan
+        resultado[window] = salida
+    return resultado
+
+
+def maximo_movil(valores, window, min_periods=None):
+    return extremos_moviles(valores, (window,), True, min_periods)[window]
+
+
+def minimo_movil(valores, window, min_periods=None):
+    return extremos_moviles(valores, (window,), False, min_periods)[window]
+
+
+def atr(high, low, close, period=14):
+    """Average true range: media movil simple del true range"""
+    return media_movil(true_range(high, low, close), period)
+
+
+def ema(valores, span):
+    """Media movil exponencial (adjust=False)"""
+    return _numpy(_serie(valores).ewm(span=span, adjust=False).mean())
+
+
+def macd(close, short_period=12, long_period=26, signal_period=9):
+    return macd_desde_emas(ema(close, short_period), ema(close, long_period), signal_period)
+
+
+def macd_desde_emas(ema_short, ema_long, signal_period=9):
+    linea = ema_short - ema_long
+    signal_macd = ema(linea, signal_period)
+    return {'macd': linea, 'signal_macd': signal_macd, 'macd_hist': linea - signal_macd}
+
+
+def rsi(close, period=14):
+    """Mismo calculo que indicadores.calculate_rsi"""
+    return rsi_desde_media(media_movil(diferencia_absoluta(close), period))
+
+
+def diferencia_absoluta(valores):
+    """|valor - valor anterior| (NaN en la primera fila)"""
+    return np.abs(_numpy(_serie(valores).diff()))
+
+
+def rsi_desde_media(avg_gain):
+    # avg_loss es la misma media con signo contrario, como en la version original
+    avg_loss = -avg_gain
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 100 - (100 / (1 + (avg_gain / avg_loss)))
+
+
+def bollinger(close, window=20, num_std=2):
+    return bollinger_desde_media(close, media_movil(close, window), desviacion_movil(close, window), num_std)
+
+
+def bollinger_desde_media(close, bb_middle, bb_std, num_std=2):
+    bb_upper = bb_middle + (bb_std * num_std)
+    bb_lower = bb_middle - (bb_std * num_std)
+    close = _array(close)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        bb_width = (bb_upper - bb_lower) / bb_middle
+        bb_position = (close - bb_lower) / (bb_upper - bb_lower)
+    return {
+        'bb_middle': bb_middle,
+        'bb_std': bb_std,
+        'bb_upper': bb_upper,
+        'bb_lower': bb_lower,
+        'bb_upper_1std': bb_middle + bb_std,
+        'bb_lower_1std': bb_middle - bb_std,
+        'bb_width': bb_width,
+        'bb_position': bb_position,
+        'bb_percent_b': bb_position.copy(),
+        'bb_bandwidth': bb_width.copy(),
+    }
+
+
+def _desplazar(valores, periodos):
+    return _numpy(_serie(valores).shift(periodos))
+
+
+def ichimoku(high, low, close, tenkan=9, kijun=26, senkou=52):
+    """Lineas de Ichimoku (tenkan, kijun, senkou_a, senkou_b, senkou_c, chikou)"""
+    maximos = extremos_moviles(high, (tenkan, kijun, senkou), True)
+    minimos = extremos_moviles(low, (tenkan, kijun, senkou), False)
+    return ichimoku_desde_extremos(
+        (maximos[tenkan], minimos[tenkan]),
+        (maximos[kijun], minimos[kijun]),
+        (maximos[senkou], minimos[senkou]),
+        close, kijun)
+
+
+def ichimoku_desde_extremos(extremos_tenkan, extremos_kijun, extremos_senkou, close, kijun=26):
+    """Lineas de Ichimoku a partir de los pares (maximo de high, minimo de low) de cada ventana"""
+    tenkan_sen = (extremos_tenkan[0] + extremos_tenkan[1]) / 2
+    kijun_sen = (extremos_kijun[0] + extremos_kijun[1]) / 2
+    senkou_a = _desplazar((tenkan_sen + kijun_sen) / 2, kijun)
+    senkou_b = _desplazar((extremos_senkou[0] + extremos_senkou[1]) / 2, kijun)
+    # senkou_c: el borde inferior de la nube (NaN si falta alguna de las dos spans)
+    senkou_c = np.minimum(senkou_a, senkou_b)
+    senkou_c[..., :1] = np.nan
+    return {
+        'tenkan': tenkan_sen,
+        'kijun': kijun_sen,
+        'senkou_a': senkou_a,
+        'senkou_b': senkou_b,
+        'chikou': _desplazar(close, -kijun),
+        'senkou_c': senkou_c,
+    }
+
+
+def donchian(high, low, window=20):
+    return {'upper_channel': maximo_movil(high, window), 'lower_channel': minimo_movil(low, window)}
+
+
+def supertrend(high, low, close, period=7, atr_multiplier=3):
+    return supertrend_desde_atr(high, low, close, atr(high, low, close, period), atr_multiplier)
+
+
+def supertrend_desde_atr(high, low, close, atr_valores, atr_multiplier=3):
+    hl2 = (_array(high) + _array(low)) / 2
+    upperband, lowerband, in_uptrend = bandas_supertrend(
+        close, hl2 + (atr_multiplier * atr_valores), hl2 - (atr_multiplier * atr_valores))
+    return {'atr': atr_valores, 'upperband': upperband, 'lowerband': lowerband, 'in_uptrend': in_uptrend}
+
+# Nucleo del supertrend sobre arrays.
+# La recursion de las bandas depende de la fila anterior, asi que no se puede vectorizar
+# del todo: se recorre una sola vez sobre arrays de numpy (compilado con numba si esta
+# instalado) o sobre listas de python, que es mucho mas rapido que indexar el DataFrame.
+
+def _supertrend_kernel(close, upperband, lowerband, in_uptrend):
+    for current in range(1, len(close)):
+        previous = current - 1
+
+        if close[current] > upperband[previous]:
+            in_uptrend[current] = True
+        elif close[current] < lowerband[previous]:
+            in_uptrend[current] = False
+        else:
+            in_uptrend[current] = in_uptrend[previous]
+
+            if in_uptrend[current] and lowerband[current] < lowerband[previous]:
+                lowerband[current] = lowerband[previous]
+
+            if not in_uptrend[current] and upperband[current] > upperband[previous]:
+                upperband[current] = upperband[previous]
+
+
+def _supertrend_kernel_2d(close, upperband, lowerband, in_uptrend):
+    """
+    La misma recursion para muchas series a la vez (arrays velas x series): el bucle
+    recorre las velas y cada paso actualiza todas las series con operaciones de numpy.
+    """
+    for current in range(1, len(close)):
+        previous = current - 1
+        sube = close[current] > upperband[previous]
+        baja = close[current] < lowerband[previous]
+        sigue = ~sube & ~baja
+        tendencia = sube | (sigue & in_uptrend[previous])
+        in_uptrend[current] = tendencia
+
+        ajustar_lower = sigue & tendencia & (lowerband[current] < lowerband[previous])
+        np.copyto(lowerband[current], lowerband[previous], where=ajustar_lower)
+
+        ajustar_upper = sigue & ~tendencia & (upperband[current] > upperband[previous])
+        np.copyto(upperband[current], upperband[previous], where=ajustar_upper)
+
+
+if _njit is not None:
+    _supertrend_kernel_jit = _njit(cache=True)(_supertrend_kernel)
+
+    @_njit(cache=True)
+    def _supertrend_filas_jit(close, upperband, lowerband, in_uptrend):
+        for fila in range(close.shape[0]):
+            _supertrend_kernel_jit(close[fila], upperband[fila], lowerband[fila], in_uptrend[fila])
+else:
+    _supertrend_kernel_jit = None
+    _supertrend_filas_jit = None
+
+
+def bandas_supertrend(close, upperband, lowerband):
+    """
+    Aplica la recursion del supertrend a las bandas basicas.
+
+    Parameters:
+    - close: array de precios de cierre
+    - upperband, lowerband: bandas basicas (hl2 +/- atr_multiplier * atr)
+
+    Con bandas 2D (series x velas) se procesan todas las filas juntas; `close` puede
+    ser 2D o 1D (el mismo cierre para todas las filas).
+
+    Returns:
+    - (upperband, lowerband, in_uptrend) como arrays de numpy
+    """
+    upperband = np.array(upperband, dtype=float)
+    lowerband = np.array(lowerband, dtype=float)
+    close = np.broadcast_to(np.asarray(close, dtype=float), upperband.shape)
+    in_uptrend = np.ones(upperband.shape, dtype=bool)
+
+    if upperband.ndim == 2:
+        if _supertrend_filas_jit is not None:
+            _supertrend_filas_jit(close, upperband, lowerband, in_uptrend)
+            return upperband, lowerband, in_uptrend
+        # velas x series contiguo para que cada paso lea una fila de memoria
+        upper, lower, trend = (np.ascontiguousarray(a.T) for a in (upperband, lowerband, in_uptrend))
+        _supertrend_kernel_2d(np.ascontiguousarray(close.T), upper, lower, trend)
+        return upper.T.copy(), lower.T.copy(), trend.T.copy()
+
+    if _supertrend_kernel_jit is not None:
+        _supertrend_kernel_jit(close, upperband, lowerband, in_uptrend)
+        return upperband, lowerband, in_uptrend
+
+    upper = upperband.tolist()
+    lower = lowerband.tolist()
+    trend = in_uptrend.tolist()
+    _supertrend_kernel(close.tolist(), upper, lower, trend)
+    return np.array(upper), np.array(lower), np.array(trend, dtype=bool)
@@ -0,0 +1,275 @@
+# Registro de indicadores y planificador
+# Cada indicador declara las primitivas que necesita (medias, desviaciones, extremos
+# moviles, emas, true range) y como combinarlas. planificar() junta las primitivas de
+# todos los indicadores pedidos en un grafo (DAG), sin repetir nodos, y ejecutar()
+# calcula cada primitiva una sola vez antes de pasarsela a todos los que la usan.
+# Los maximos/minimos de una misma columna se calculan juntos para todas las ventanas.
+# Ej: ichimoku y donchian(26) comparten el maximo/minimo de 26 velas, atr y supertrend
+# comparten el true range, bollinger y bollinger_simple comparten media y desviacion.
+
+import numpy as np
+import pandas as pd
+
+from . import indicadores_puros as puros
+
+
+# ---- Primitivas ----
+# Una primitiva es una tupla (tipo, *argumentos); los argumentos que son tuplas son
+# otras primitivas de las que depende.
+
+def columna(nombre):
+    return ('columna', nombre)
+
+
+def true_range():
+    return ('true_range', columna('high'), columna('low'), columna('close'))
+
+
+def diferencia_absoluta(origen):
+    return ('diferencia_absoluta', origen)
+
+
+def media(origen, window):
+    return ('media', origen, window)
+
+
+def desviacion(origen, window):
+    return ('desviacion', origen, window)
+
+
+def maximo(origen, window):
+    return ('maximo', origen, window)
+
+
+def minimo(origen, window):
+    return ('minimo', origen, window)
+
+
+def ema(origen, span):
+    return ('ema', origen, span)
+
+
+HIGH, LOW, CLOSE = columna('high'), columna('low'), columna('close')
+
+# tipo -> funcion(*argumentos) con las dependencias ya resueltas
+PRIMITIVAS = {
+    'true_range': puros.true_range,
+    'diferencia_absoluta': puros.diferencia_absoluta,
+    'media': puros.media_movil,
+    'desviacion': puros.desviacion_movil,
+    'maximo': puros.maximo_movil,
+    'minimo': puros.minimo_movil,
+    'ema': puros.ema,
+}
+
+
+# ---- Registro ----
+
+class Indicador:
+    """
+    Indicador registrado.
+
+    - requiere(**parametros) -> dict {alias: primitiva}
+    - combinar(valores, **parametros) -> dict {columna: array}, donde `valores`
+      es {alias: array} con las primitivas ya calculadas
+    """
+
+    def __init__(self, nombre, requiere, combinar, parametros):
+        self.nombre = nombre
+        self.requiere = requiere
+        self.combinar = combinar
+        self.parametros = parametros
+
+    def resolver_parametros(self, parametros=None):
+        resueltos = dict(self.parametros)
+        for clave, valor in (parametros or {}).items():
+            if clave not in resueltos:
+                raise ValueError(f"Parametro desconocido para {self.nombre}: {clave}")
+            resueltos[clave] = valor
+        return resueltos
+
+
+REGISTRO = {}
+
+
+def registrar(nombre, requiere, **parametros):
+    """
+    Decorador para registrar un indicador; los kwargs son los parametros por defecto.
+
+    @registrar('donchian', lambda window: {'max': maximo(HIGH, window), ...}, window=20)
+    def _donchian(valores, window): ...
+    """
+    def decorador(combinar):
+        REGISTRO[nombre] = Indicador(nombre, requiere, combinar, parametros)
+        return combinar
+    return decorador
+
+
+def indicador(nombre):
+    try:
+        return REGISTRO[nombre]
+    except KeyError:
+        raise ValueError(f"Indicador desconocido: {nombre}") from None
+
+
+@registrar('atr', lambda period: {'atr': media(true_range(), period)}, period=14)
+def _atr(valores, period):
+    return {'atr': valores['atr']}
+
+
+@registrar('supertrend',
+           lambda period, atr_multiplier: {'high': HIGH, 'low': LOW, 'close': CLOSE,
+                                           'atr': media(true_range(), period)},
+           period=7, atr_multiplier=3)
+def _supertrend(valores, period, atr_multiplier):
+    return puros.supertrend_desde_atr(valores['high'], valores['low'], valores['close'],
+                                      valores['atr'], atr_multiplier)
+
+
+@registrar('macd',
+           lambda short_period, long_period, signal_period: {'ema_short': ema(CLOSE, short_period),
+                                                             'ema_long': ema(CLOSE, long_period)},
+           short_period=12, long_period=26, signal_period=9)
+def _macd(valores, short_period, long_period, signal_period):
+    return puros.macd_desde_emas(valores['ema_short'], valores['ema_long'], signal_period)
+
+
+@registrar('rsi', lambda period: {'media': media(diferencia_absoluta(CLOSE), period)}, period=14)
+def _rsi(valores, period):
+    return {'rsi': puros.rsi_desde_media(valores['media'])}
+
+
+@registrar('bollinger',
+           lambda window, num_std: {'close': CLOSE, 'media': media(CLOSE, window),
+                                    'desviacion': desviacion(CLOSE, window)},
+           window=20, num_std=2)
+def _bollinger(valores, window, num_std):
+    return puros.bollinger_desde_media(valores['close'], valores['media'], valores['desviacion'], num_std)
+
+
+def _requiere_ichimoku(tenkan, kijun, senkou):
+    requiere = {'close': CLOSE}
+    for linea, window in (('tenkan', tenkan), ('kijun', kijun), ('senkou', senkou)):
+        requiere[f'max_{linea}'] = maximo(HIGH, window)
+        requiere[f'min_{linea}'] = minimo(LOW, window)
+    return requiere
+
+
+@registrar('ichimoku', _requiere_ichimoku, tenkan=9, kijun=26, senkou=52)
+def _ichimoku(valores, tenkan, kijun, senkou):
+    return puros.ichimoku_desde_extremos(
+        (valores['max_tenkan'], valores['min_tenkan']),
+        (valores['max_kijun'], valores['min_kijun']),
+        (valores['max_senkou'], valores['min_senkou']),
+        valores['close'], kijun)
+
+
+@registrar('donchian', lambda window: {'max': maximo(HIGH, window), 'min': minimo(LOW, window)}, window=20)
+def _donchian(valores, window):
+    return {'upper_channel': valores['max'], 'lower_channel': valores['min']}
+
+
+# ---- Planificador ----
+
+def _dependencias(primitiva):
+    return [argumento for argumento in primitiva[1:] if isinstance(argumento, tuple)]
+
+
+class Plan:
+    """
+    Grafo de calculo para un conjunto de indicadores.
+
+    - pedidos: lista de (Indicador, parametros resueltos, {alias: primitiva})
+    - nodos: primitivas distintas en orden topologico (cada una se calcula una vez)
+    """
+
+    def __init__(self, pedidos):
+        self.pedidos = pedidos
+        self.nodos = []
+        vistos = set()
+
+        def visitar(primitiva):
+            if primitiva in vistos:
+                return
+            vistos.add(primitiva)
+            for dependencia in _dependencias(primitiva):
+                visitar(dependencia)
+            self.nodos.append(primitiva)
+
+        for _, _, requiere in pedidos:
+            for primitiva in requiere.values():
+                visitar(primitiva)
+
+        # ventanas de maximo/minimo pedidas por cada columna
+        self._windows = {}
+        for primitiva in self.nodos:
+            if primitiva[0] in ('maximo', 'minimo'):
+                self._windows.setdefault(primitiva[:2], []).append(primitiva[2])
+
+    def ejecutar(self, df):
+        """
+        Calcula los indicadores sobre `df` (sin modificarlo). `df` puede ser un DataFrame
+        o un dict de arrays 2D (series x velas), ver indicadores_lote.
+
+        Returns:
+        - dict {columna: array} con las salidas de los indicadores en el orden pedido
+        """
+        calculadas = {}
+        for primitiva in self.nodos:
+            tipo, argumentos = primitiva[0], primitiva[1:]
+            if primitiva in calculadas:
+                continue
+            if tipo == 'columna':
+                calculadas[primitiva] = np.asarray(df[argumentos[0]], dtype=float)
+            elif tipo in ('maximo', 'minimo'):
+                # todas las ventanas de la misma columna salen de una sola sparse table
+                origen = argumentos[0]
+                windows = self._windows[(tipo, origen)]
+                extremos = puros.extremos_moviles(calculadas[origen], windows, tipo == 'maximo')
+                for window in windows:
+                    calculadas[(tipo, origen, window)] = extremos[window]
+            else:
+                calculadas[primitiva] = PRIMITIVAS[tipo](
+                    *(calculadas[a] if isinstance(a, tuple) else a for a in argumentos))
+
+        resultado = {}
+        for definicion, parametros, requiere in self.pedidos:
+            valores = {alias: calculadas[primitiva] for alias, primitiva in requiere.items()}
+            resultado.update(definicion.combinar(valores, **parametros))
+        return resultado
+
+
+def planificar(indicadores, parametros=None):
+    """
+    Arma el plan de calculo.
+
+    Parameters:
+    - indicadores: lista de nombres registrados en REGISTRO
+    - parametros: dict opcional {nombre: {parametro: valor}}
+    """
+    parametros = parametros or {}
+    pedidos = []
+    for nombre in indicadores:
+        definicion = indicador(nombre)
+        resueltos = definicion.resolver_parametros(parametros.get(nombre))
+        pedidos.append((definicion, resueltos, definicion.requiere(**resueltos)))
+    return Plan(pedidos)
+
+
+def calcular(df, indicadores, parametros=None, columnas=('timestamp', 'open', 'high', 'low', 'close', 'volume')):
+    """
+    Calcula los indicadores pedidos sin modificar `df`.
+
+    Returns:
+    - DataFrame nuevo con `columnas` y solo las salidas de los indicadores pedidos
+    """
+    resultado = {c: df[c].to_numpy() for c in columnas if c in df.columns}
+    resultado.update(planificar(indicadores, parametros).ejecutar(df))
+    return pd.DataFrame(resultado, index=df.index)
+
+
+def aplicar(df, indicadores, parametros=None):
+    """Igual que calcular() pero agrega las columnas al propio `df` (como las funciones de indicadores.py)"""
+    for nombre, valores in planificar(indicadores, parametros).ejecutar(df).items():
+        df[nombre] = valores
+    return df
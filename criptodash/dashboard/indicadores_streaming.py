@@ -0,0 +1,415 @@
+# Indicadores incrementales (streaming)
+# Cada objeto guarda solo el estado minimo (ventanas, medias exponenciales) y al recibir
+# una vela cerrada devuelve los valores nuevos en O(1) (O(ventana) en el peor caso para
+# los extremos).
+#
+# Los calculos reproducen paso a paso los algoritmos de pandas (rolling con suma
+# compensada de Kahan, Welford para la varianza, ewm con adjust=False), asi que despues
+# de hacer warmup() con el historico los valores son identicos bit a bit a los de las
+# funciones por lotes de indicadores.py.
+
+import math
+from bisect import bisect_left
+from collections import deque
+
+import numpy as np
+
+
+def _div(a, b):
+    """Division con la semantica de numpy/pandas (inf o NaN en vez de excepcion)"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class _MediaMovil:
+    """Equivalente incremental de Series.rolling(window).mean()"""
+
+    def __init__(self, window):
+        self.window = window
+        self._valores = deque()
+        self._nobs = 0
+        self._neg_ct = 0
+        self._suma = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._iguales = 0
+        self._ultimo = None
+
+    def update(self, val):
+        if len(self._valores) == self.window:
+            self._quitar(self._valores.popleft())
+        self._valores.append(val)
+        self._agregar(val)
+        return self._valor()
+
+    def _agregar(self, val):
+        if self._ultimo is None:
+            self._ultimo = val
+        if val == val:
+            self._nobs += 1
+            y = val - self._comp_add
+            t = self._suma + y
+            self._comp_add = t - self._suma - y
+            self._suma = t
+            if math.copysign(1.0, val) < 0:
+                self._neg_ct += 1
+            if val == self._ultimo:
+                self._iguales += 1
+            else:
+                self._iguales = 1
+            self._ultimo = val
+
+    def _quitar(self, val):
+        if val == val:
+            self._nobs -= 1
+            y = -val - self._comp_remove
+            t = self._suma + y
+            self._comp_remove = t - self._suma - y
+            self._suma = t
+            if math.copysign(1.0, val) < 0:
+                self._neg_ct -= 1
+
+    def _valor(self):
+        if self._nobs >= self.window and self._nobs > 0:
+            resultado = self._suma / self._nobs
+            if self._iguales >= self._nobs:
+                resultado = self._ultimo
+            elif self._neg_ct == 0 and resultado < 0:
+                resultado = 0.0
+            elif self._neg_ct == self._nobs and resultado > 0:
+                resultado = 0.0
+            return resultado
+        return np.nan
+
+
+class _VarianzaMovil:
+    """Equivalente incremental de Series.rolling(window).var(ddof)"""
+
+    def __init__(self, window, ddof=1):
+        self.window = window
+        self.ddof = ddof
+        self._valores = deque()
+        self._nobs = 0
+        self._media = 0.0
+        self._ssqdm = 0.0
+        self._comp_add = 0.0
+        self._comp_remove = 0.0
+        self._iguales = 0
+        self._ultimo = None
+
+    def update(self, val):
+        if len(self._valores) == self.window:
+            self._quitar(self._valores.popleft())
+        self._valores.append(val)
+        self._agregar(val)
+        return self._valor()
+
+    def _agregar(self, val):
+        if self._ultimo is None:
+            self._ultimo = val
+        if val != val:
+            return
+        self._nobs += 1
+        if val == self._ultimo:
+            self._iguales += 1
+        else:
+            self._iguales = 1
+        self._ultimo = val
+        # Welford con suma compensada (Kahan)
+        media_anterior = self._media - self._comp_add
+        y = val - self._comp_add
+        t = y - self._media
+        self._comp_add = t + self._media - y
+        self._media = self._media + t / self._nobs
+        self._ssqdm = self._ssqdm + (val - media_anterior) * (val - self._media)
+
+    def _quitar(self, val):
+        if val != val:
+            return
+        self._nobs -= 1
+        if self._nobs:
+            media_anterior = self._media - self._comp_remove
+            y = val - self._comp_remove
+            t = y - self._media
+            self._comp_remove = t + self._media - y
+            self._media = self._media - t / self._nobs
+            self._ssqdm = self._ssqdm - (val - media_anterior) * (val - self._media)
+        else:
+            self._media = 0.0
+            self._ssqdm = 0.0
+
+    def _valor(self):
+        if self._nobs >= self.window and self._nobs > self.ddof:
+            if self._nobs == 1 or self._iguales >= self._nobs:
+                return 0.0
+            return self._ssqdm / (self._nobs - self.ddof)
+        return np.nan
+
+
+class _ExtremosMoviles:
+    """
+    Equivalente incremental de rolling(w, min_periods).max() / .min() para varias
+    ventanas a la vez. Hay una sola deque monotona (la de la ventana mayor): sus
+    indices crecen y sus valores son monotonos, asi que el extremo de una ventana
+    menor es el primer candidato cuyo indice cae dentro de ella (busqueda binaria).
+    """
+
+    def __init__(self, windows, maximo=True, min_periods=None):
+        self.windows = tuple(windows)
+        self.maximo = maximo
+        self.min_periods = min_periods
+        self._mayor = max(self.windows)
+        # listas con un indice de cabeza en vez de deque para poder usar bisect
+        self._indices = []
+        self._valores = []
+        self._nulos = []
+        self._cabeza = 0
+        self._cabeza_nulos = 0
+        self._i = 0
+
+    def update(self, val):
+        i = self._i
+        self._i += 1
+        inicio = i - self._mayor + 1
+        while self._cabeza < len(self._indices) and self._indices[self._cabeza] < inicio:
+            self._cabeza += 1
+        while self._cabeza_nulos < len(self._nulos) and self._nulos[self._cabeza_nulos] < inicio:
+            self._cabeza_nulos += 1
+        self._compactar()
+
+        # rolling() de pandas trata los infinitos como faltantes
+        if val != val or math.isinf(val):
+            self._nulos.append(i)
+        else:
+            while len(self._valores) > self._cabeza and (
+                    self._valores[-1] <= val if self.maximo else self._valores[-1] >= val):
+                self._indices.pop()
+                self._valores.pop()
+            self._indices.append(i)
+            self._valores.append(val)
+
+        resultado = {}
+        for window in self.windows:
+            inicio_window = i - window + 1
+            nulos = len(self._nulos) - bisect_left(self._nulos, inicio_window, self._cabeza_nulos)
+            observaciones = min(self._i, window) - nulos
+            posicion = bisect_left(self._indices, inicio_window, self._cabeza)
+            minimo_validos = window if self.min_periods is None else max(self.min_periods, 1)
+            if observaciones < minimo_validos or posicion == len(self._indices):
+                resultado[window] = np.nan
+            else:
+                resultado[window] = self._valores[posicion]
+        return resultado
+
+    def _compactar(self):
+        # descarta de vez en cuando lo que quedo fuera de la ventana mayor
+        if self._cabeza > 1024 and self._cabeza * 2 > len(self._indices):
+            del self._indices[:self._cabeza], self._valores[:self._cabeza]
+            self._cabeza = 0
+        if self._cabeza_nulos > 1024 and self._cabeza_nulos * 2 > len(self._nulos):
+            del self._nulos[:self._cabeza_nulos]
+            self._cabeza_nulos = 0
+
+
+class _Retraso:
+    """Devuelve el valor recibido hace `periodos` llamadas (equivalente a shift)"""
+
+    def __init__(self, periodos):
+        self._cola = deque([np.nan] * periodos)
+
+    def update(self, val):
+        self._cola.append(val)
+        return self._cola.popleft()
+
+
+class StreamingIndicator:
+    """
+    Clase base: cada indicador declara las columnas de la vela que necesita y
+    define _update() con esos valores. update() recibe una vela (dict, fila de
+    DataFrame, ...) y warmup() recorre un historico.
+    """
+    columnas = ('close',)
+
+    def update(self, candle):
+        return self._update(*(float(candle[c]) for c in self.columnas))
+
+    def warmup(self, df):
+        """Procesa un historico (DataFrame OHLCV) y devuelve el ultimo valor"""
+        resultado = None
+        for valores in zip(*(df[c].to_numpy(dtype=float).tolist() for c in self.columnas)):
+            resultado = self._update(*valores)
+        return resultado
+
+    def _update(self, *valores):
+        raise NotImplementedError("Subclasses must implement _update")
+
+
+class StreamingEMA(StreamingIndicator):
+    """Equivalente a df[columna].ewm(span=span, adjust=False).mean()"""
+
+    def __init__(self, span, columna='close'):
+        self.columnas = (columna,)
+        alpha = 1. / (1. + (span - 1) / 2.)
+        self._alpha = alpha
+        self._factor = 1. - alpha
+        # peso del valor anterior: decae tambien en las velas NaN (ignore_na=False)
+        self._peso = 1.
+        self.value = np.nan
+
+    def _update(self, val):
+        # Mismo orden de operaciones que pandas (ewm con adjust=False)
+        if self.value == self.value:
+            self._peso *= self._factor
+            if val == val:
+                if self.value != val:
+                    self.value = (self._peso * self.value + self._alpha * val) / (self._peso + self._alpha)
+                self._peso = 1.
+        elif val == val:
+            self.value = val
+        return self.value
+
+
+class StreamingATR(StreamingIndicator):
+    """Equivalente a indicadores.atr(df, period)"""
+    columnas = ('high', 'low', 'close')
+
+    def __init__(self, period=14):
+        self._media = _MediaMovil(period)
+        self._close_anterior = np.nan
+
+    def _update(self, high, low, close):
+        previous_close = self._close_anterior
+        self._close_anterior = close
+        # max() de pandas ignora los NaN (primera vela: solo high - low)
+        rangos = [r for r in (abs(high - low), abs(high - previous_close), abs(low - previous_close)) if r == r]
+        true_range = max(rangos) if rangos else np.nan
+        return self._media.update(true_range)
+
+
+class StreamingMACD(StreamingIndicator):
+    """Equivalente a indicadores.macd(): devuelve macd, signal_macd y macd_hist"""
+
+    def __init__(self, short_period=12, long_period=26, signal_period=9):
+        self._short = StreamingEMA(short_period)
+        self._long = StreamingEMA(long_period)
+        self._signal = StreamingEMA(signal_period, columna='macd')
+
+    def _update(self, close):
+        macd = self._short._update(close) - self._long._update(close)
+        signal_macd = self._signal._update(macd)
+        return {'macd': macd, 'signal_macd': signal_macd, 'macd_hist': macd - signal_macd}
+
+
+class StreamingRSI(StreamingIndicator):
+    """Equivalente a indicadores.calculate_rsi(df, period)"""
+
+    def __init__(self, period=14):
+        self._media = _MediaMovil(period)
+        self._close_anterior = np.nan
+
+    def _update(self, close):
+        diferencia = abs(close - self._close_anterior)
+        self._close_anterior = close
+        avg_gain = self._media.update(diferencia)
+        avg_loss = -avg_gain
+        return 100 - _div(100, 1 + _div(avg_gain, avg_loss))
+
+
+class StreamingBollinger(StreamingIndicator):
+    """Equivalente a indicadores.bollinger_bands(df, window, num_std, generate_signals=False)"""
+
+    def __init__(self, window=20, num_std=2):
+        self.num_std = num_std
+        self._media = _MediaMovil(window)
+        self._varianza = _VarianzaMovil(window)
+
+    def _update(self, close):
+        bb_middle = self._media.update(close)
+        varianza = self._varianza.update(close)
+        bb_std = math.sqrt(varianza) if varianza >= 0 else (np.nan if varianza != varianza else 0.0)
+        bb_upper = bb_middle + (bb_std * self.num_std)
+        bb_lower = bb_middle - (bb_std * self.num_std)
+        posicion = _div(close - bb_lower, bb_upper - bb_lower)
+        return {
+            'bb_middle': bb_middle,
+            'bb_std': bb_std,
+            'bb_upper': bb_upper,
+            'bb_lower': bb_lower,
+            'bb_upper_1std': bb_middle + bb_std,
+            'bb_lower_1std': bb_middle - bb_std,
+            'bb_width': _div(bb_upper - bb_lower, bb_middle),
+            'bb_position': posicion,
+            'bb_percent_b': posicion,
+            'bb_bandwidth': _div(bb_upper - bb_lower, bb_middle),
+        }
+
+
+class StreamingDonchian(StreamingIndicator):
+    """Equivalente a indicadores.donchian_channels(df, window)"""
+    columnas = ('high', 'low')
+
+    def __init__(self, window=20):
+        self.window = window
+        self._maximo = _ExtremosMoviles((window,), maximo=True)
+        self._minimo = _ExtremosMoviles((window,), maximo=False)
+
+    def _update(self, high, low):
+        return {
+            'upper_channel': self._maximo.update(high)[self.window],
+            'lower_channel': self._minimo.update(low)[self.window],
+        }
+
+
+class StreamingExtremos(StreamingIndicator):
+    """
+    Maximo de `high` y minimo de `low` para varias ventanas en una sola pasada.
+    Devuelve {'max_<w>': ..., 'min_<w>': ...} (igual que indicadores_puros.extremos_moviles).
+    """
+    columnas = ('high', 'low')
+
+    def __init__(self, windows, min_periods=None):
+        self._maximo = _ExtremosMoviles(windows, True, min_periods)
+        self._minimo = _ExtremosMoviles(windows, False, min_periods)
+
+    def _update(self, high, low):
+        resultado = {f'max_{w}': v for w, v in self._maximo.update(high).items()}
+        resultado.update({f'min_{w}': v for w, v in self._minimo.update(low).items()})
+        return resultado
+
+
+class StreamingIchimoku(StreamingIndicator):
+    """
+    Equivalente a las lineas de indicadores.ichimoku_cloud().
+
+    La chikou span es el cierre desplazado `kijun` barras hacia atras, asi que con
+    cada vela nueva se conoce la chikou de la vela de hace `kijun` barras: se
+    devuelve como 'chikou' junto con 'chikou_offset' (= -kijun).
+    """
+    columnas = ('high', 'low', 'close')
+
+    def __init__(self, tenkan=9, kijun=26, senkou=52):
+        self.tenkan_period = tenkan
+        self.kijun_period = kijun
+        self.senkou_period = senkou
+        self._maximos = _ExtremosMoviles((tenkan, kijun, senkou), maximo=True)
+        self._minimos = _ExtremosMoviles((tenkan, kijun, senkou), maximo=False)
+        self._retraso_a = _Retraso(kijun)
+        self._retraso_b = _Retraso(kijun)
+
+    def _update(self, high, low, close):
+        maximos = self._maximos.update(high)
+        minimos = self._minimos.update(low)
+        tenkan = (maximos[self.tenkan_period] + minimos[self.tenkan_period]) / 2
+        kijun = (maximos[self.kijun_period] + minimos[self.kijun_period]) / 2
+        senkou_b_actual = (maximos[self.senkou_period] + minimos[self.senkou_period]) / 2
+        senkou_a = self._retraso_a.update((tenkan + kijun) / 2)
+        senkou_b = self._retraso_b.update(senkou_b_actual)
+        return {
+            'tenkan': tenkan,
+            'kijun': kijun,
+            'senkou_a': senkou_a,
+            'senkou_b': senkou_b,
+            'senkou_c': min(senkou_a, senkou_b) if senkou_a == senkou_a and senkou_b == senkou_b else np.nan,
+            'chikou': close,
+            'chikou_offset': -self.kijun_period,
+        }
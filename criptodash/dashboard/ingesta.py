@@ -0,0 +1,290 @@
+# Ingesta programada de velas (manage.py ingest)
+# Hasta ahora las velas solo se bajaban cuando una vista llamaba a run_bot o get_or_fetch,
+# asi que cada refresco de la web hacia I/O con el exchange. Ingestor corre aparte, como
+# proceso de larga vida:
+# - lee los pares activos (TradingPair.is_active y los Pair canonicos) en cada ronda
+# - cada timeframe se programa al cierre de su vela (alineado a la epoch en UTC, mas un
+#   pequeño retraso para que el exchange ya la tenga) y en esa ronda se sincroniza cada
+#   par con DataManager.sync_ohlcv, que retoma desde la marca de agua (IngestionState)
+# - las sincronizaciones corren en un pool de threads acotado; cada exchange tiene su
+#   presupuesto: cuantas pueden correr a la vez y cuantas pueden arrancar por segundo
+# - stats() devuelve atraso (lag) por (par, timeframe) y velas por segundo; el proceso
+#   las escribe en INGEST['STATS_FILE'] para que la web las lea sin hablar con el exchange
+# - con INGEST['ENABLED'] la web deja de bajar velas: run_bot las lee de OHLCVData
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .descarga_ohlcv import LimiteTasa, timeframe_ms
+
+logger = logging.getLogger(__name__)
+
+TIMEFRAMES = ('1m',)
+WORKERS = 4
+# segundos despues del cierre de la vela antes de pedirla
+RETRASO = 2.0
+# dias hacia atras desde donde arranca un par sin datos
+DIAS_INICIALES = 1
+PRESUPUESTO = {'concurrentes': 2, 'por_segundo': 5}
+
+
+def configuracion_ingesta():
+    """settings.INGEST"""
+    from django.conf import settings
+
+    return getattr(settings, 'INGEST', {})
+
+
+def ingesta_activa():
+    """True si las velas las mantiene manage.py ingest (INGEST['ENABLED'])"""
+    return bool(configuracion_ingesta().get('ENABLED'))
+
+
+def proximo_cierre(ahora_ms, timeframe, retraso=RETRASO):
+    """Momento (ms) en que conviene sincronizar la proxima vela que cierra despues de ahora"""
+    duracion = timeframe_ms(timeframe)
+    return (ahora_ms // duracion + 1) * duracion + int(retraso * 1000)
+
+
+def pares_activos():
+    """[(simbolo, exchange)] de los TradingPair activos y los Pair canonicos, sin repetir"""
+    from .models import Pair, TradingPair
+
+    pares = {}
+    for simbolo, exchange in TradingPair.objects.filter(is_active=True).values_list('symbol', 'exchange__name'):
+        pares.setdefault(simbolo, (exchange or 'binance').lower())
+    for simbolo, exchange in Pair.objects.values_list('symbol', 'exchange'):
+        pares.setdefault(simbolo, (exchange or 'binance').lower())
+    return sorted(pares.items())
+
+
+class Presupuesto:
+    """Limite de un exchange: sincronizaciones a la vez y arranques por segundo"""
+
+    def __init__(self, concurrentes, por_segundo):
+        self._semaforo = threading.BoundedSemaphore(concurrentes)
+        self._tasa = LimiteTasa(1 / por_segundo if por_segundo else 0)
+
+    def __enter__(self):
+        self._semaforo.acquire()
+        self._tasa.esperar()
+        return self
+
+    def __exit__(self, *exc):
+        self._semaforo.release()
+
+
+class Ingestor:
+    """
+    Programa y corre las sincronizaciones de velas.
+
+    Parameters:
+    - timeframes: timeframes a sincronizar
+    - workers: tamaño del pool de threads
+    - presupuestos: {exchange: {'concurrentes': n, 'por_segundo': m}}
+    - pares: funcion que devuelve [(simbolo, exchange)] (por defecto pares_activos)
+    - sincronizar: funcion (simbolo, timeframe, start) -> velas guardadas
+      (por defecto DataManager.sync_ohlcv)
+    """
+
+    def __init__(self, timeframes=TIMEFRAMES, workers=WORKERS, presupuestos=None, retraso=RETRASO,
+                 dias_iniciales=DIAS_INICIALES, pares=None, sincronizar=None):
+        self.timeframes = tuple(timeframes)
+        self.workers = workers
+        self.retraso = retraso
+        self.dias_iniciales = dias_iniciales
+        self._presupuestos_config = presupuestos or {}
+        self._presupuestos = {}
+        self._pares = pares or pares_activos
+        self._sincronizar = sincronizar
+        self._lock = threading.Lock()
+        self._en_curso = set()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ingesta')
+        self._inicio = time.time()
+        self._contadores = {'syncs': 0, 'bars': 0, 'errors': 0, 'skipped': 0}
+        self._ultimas = {}
+        self._detenido = threading.Event()
+
+    @classmethod
+    def desde_settings(cls, **opciones):
+        """Ingestor con los valores de settings.INGEST (las opciones dadas tienen prioridad)"""
+        config = configuracion_ingesta()
+        valores = {
+            'timeframes': config.get('TIMEFRAMES', TIMEFRAMES),
+            'workers': config.get('WORKERS', WORKERS),
+            'presupuestos': config.get('RATE_LIMITS'),
+            'retraso': config.get('DELAY_SECONDS', RETRASO),
+            'dias_iniciales': config.get('BACKFILL_DAYS', DIAS_INICIALES),
+        }
+        valores.update({clave: valor for clave, valor in opciones.items() if valor is not None})
+        return cls(**valores)
+
+    def _presupuesto(self, exchange):
+        with self._lock:
+            presupuesto = self._presupuestos.get(exchange)
+            if presupuesto is None:
+                limites = {**PRESUPUESTO, **self._presupuestos_config.get(exchange, {})}
+                presupuesto = self._presupuestos[exchange] = Presupuesto(**limites)
+        return presupuesto
+
+    def _sincronizar_par(self, simbolo, exchange, timeframe, ahora_ms):
+        from django.db import close_old_connections
+
+        inicio = time.monotonic()
+        guardadas, error = 0, None
+        try:
+            with self._presupuesto(exchange):
+                guardadas = self._llamar_sync(simbolo, timeframe, ahora_ms)
+        except Exception as e:
+            error = str(e)
+            logger.exception("ingesta: fallo %s %s", simbolo, timeframe)
+        finally:
+            # cada thread usa su propia conexion; no dejarla abierta entre rondas
+            close_old_connections()
+        with self._lock:
+            self._en_curso.discard((simbolo, timeframe))
+            self._contadores['syncs'] += 1
+            self._contadores['bars'] += guardadas
+            self._contadores['errors'] += error is not None
+            self._ultimas[(simbolo, timeframe)] = {
+                'ran_at': time.time(),
+                'bars': guardadas,
+                'seconds': time.monotonic() - inicio,
+                'error': error,
+            }
+        return guardadas
+
+    def _llamar_sync(self, simbolo, timeframe, ahora_ms):
+        import pandas as pd
+
+        start = pd.Timestamp(ahora_ms, unit='ms', tz='UTC') - pd.Timedelta(days=self.dias_iniciales)
+        if self._sincronizar is not None:
+            return self._sincronizar(simbolo, timeframe, start)
+        from .data_service import DataManager
+
+        return DataManager.sync_ohlcv(simbolo, timeframe, start=start)
+
+    def ronda(self, timeframe, ahora_ms=None):
+        """
+        Manda al pool la sincronizacion de `timeframe` de cada par activo; un par que
+        todavia esta en curso de la ronda anterior se saltea. Devuelve los futures.
+        """
+        ahora_ms = int(time.time() * 1000) if ahora_ms is None else ahora_ms
+        futuros = []
+        for simbolo, exchange in self._pares():
+            with self._lock:
+                if (simbolo, timeframe) in self._en_curso:
+                    self._contadores['skipped'] += 1
+                    continue
+                self._en_curso.add((simbolo, timeframe))
+            futuros.append(self._pool.submit(self._sincronizar_par, simbolo, exchange, timeframe, ahora_ms))
+        return futuros
+
+    def correr(self, rondas=None, cada_stats=60.0, archivo_stats=None):
+        """
+        Bucle principal: espera al cierre de la proxima vela de cada timeframe y lanza
+        su ronda. Con rondas=N termina despues de N rondas (las de todos los timeframes).
+        """
+        ahora_ms = int(time.time() * 1000)
+        # la primera ronda de cada timeframe es inmediata (pone al dia lo atrasado)
+        agenda = [(ahora_ms, timeframe) for timeframe in self.timeframes]
+        heapq.heapify(agenda)
+        proximas_stats = time.monotonic() + cada_stats
+        hechas = 0
+        while not self._detenido.is_set() and (rondas is None or hechas < rondas):
+            cuando, timeframe = agenda[0]
+            espera = cuando / 1000 - time.time()
+            if espera > 0:
+                self._detenido.wait(max(0.0, min(espera, proximas_stats - time.monotonic())))
+            else:
+                heapq.heapreplace(agenda, (proximo_cierre(cuando, timeframe, self.retraso), timeframe))
+                self.ronda(timeframe)
+                hechas += 1
+            if time.monotonic() >= proximas_stats:
+                self.publicar_stats(archivo_stats)
+                proximas_stats = time.monotonic() + cada_stats
+        self._pool.shutdown(wait=True)
+        self.publicar_stats(archivo_stats)
+
+    def detener(self):
+        self._detenido.set()
+
+    def stats(self, ahora=None):
+        """
+        Contadores, velas por segundo desde el arranque y, por (par, timeframe), la
+        ultima corrida y el atraso respecto de la ultima vela que ya deberia estar cerrada.
+        """
+        ahora = time.time() if ahora is None else ahora
+        with self._lock:
+            contadores = dict(self._contadores)
+            ultimas = {clave: dict(valor) for clave, valor in self._ultimas.items()}
+            en_curso = len(self._en_curso)
+        transcurrido = max(ahora - self._inicio, 1e-9)
+        return {
+            **contadores,
+            'in_flight': en_curso,
+            'uptime_seconds': transcurrido,
+            'bars_per_second': contadores['bars'] / transcurrido,
+            'pairs': [{'pair': simbolo, 'timeframe': timeframe, **valor}
+                      for (simbolo, timeframe), valor in sorted(ultimas.items())],
+            'lag': lag_ingesta(ahora),
+        }
+
+    def publicar_stats(self, archivo=None):
+        stats = self.stats()
+        logger.info("ingesta: %d syncs, %d velas (%.2f/s), %d errores, %d salteadas",
+                    stats['syncs'], stats['bars'], stats['bars_per_second'], stats['errors'], stats['skipped'])
+        archivo = archivo or configuracion_ingesta().get('STATS_FILE')
+        if archivo:
+            os.makedirs(os.path.dirname(archivo) or '.', exist_ok=True)
+            temporal = f'{archivo}.{os.getpid()}.tmp'
+            with open(temporal, 'w') as salida:
+                json.dump({**stats, 'written_at': time.time()}, salida, default=str)
+            os.replace(temporal, archivo)
+        return stats
+
+
+def lag_ingesta(ahora=None):
+    """
+    Atraso de cada (par, timeframe) segun IngestionState: segundos entre la ultima vela
+    que ya cerro y la ultima guardada (0 si esta al dia, None si nunca se guardo nada).
+    """
+    from .models import IngestionState
+
+    ahora_ms = int((time.time() if ahora is None else ahora) * 1000)
+    lag = []
+    estados = IngestionState.objects.select_related('pair').order_by('pair__symbol', 'timeframe')
+    for estado in estados:
+        try:
+            duracion = timeframe_ms(estado.timeframe)
+        except ValueError:
+            continue
+        # inicio de la ultima vela que ya cerro
+        ultima_cerrada = (ahora_ms // duracion - 1) * duracion
+        atraso = None
+        if estado.last_timestamp is not None:
+            atraso = max(0, ultima_cerrada - int(estado.last_timestamp.timestamp() * 1000)) / 1000
+        lag.append({
+            'pair': estado.pair.symbol,
+            'timeframe': estado.timeframe,
+            'last_timestamp': estado.last_timestamp.isoformat() if estado.last_timestamp else None,
+            'lag_seconds': atraso,
+        })
+    return lag
+
+
+def leer_stats(archivo=None):
+    """Ultimas stats publicadas por el proceso de ingesta (None si no hay archivo)"""
+    archivo = archivo or configuracion_ingesta().get('STATS_FILE')
+    if not archivo:
+        return None
+    try:
+        with open(archivo) as entrada:
+            return json.load(entrada)
+    except (OSError, ValueError):
+        return None
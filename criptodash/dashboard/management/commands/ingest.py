@@ -0,0 +1,34 @@
+import signal
+
+from django.core.management.base import BaseCommand
+
+from dashboard.ingesta import Ingestor
+
+
+class Command(BaseCommand):
+    help = ("Sincroniza las velas de los pares activos al cierre de cada vela "
+            "(pool de workers con limite por exchange, ver dashboard/ingesta.py)")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--timeframes', help="timeframes separados por coma (ej: 1m,1h)")
+        parser.add_argument('--workers', type=int, help="tamaño del pool de threads")
+        parser.add_argument('--once', action='store_true',
+                            help="una sola ronda por timeframe y termina (para cron)")
+        parser.add_argument('--stats-interval', type=float, default=60.0,
+                            help="segundos entre publicaciones de stats")
+        parser.add_argument('--stats-file', help="archivo JSON de stats (por defecto INGEST['STATS_FILE'])")
+
+    def handle(self, *args, **options):
+        timeframes = options['timeframes'].split(',') if options['timeframes'] else None
+        ingestor = Ingestor.desde_settings(timeframes=timeframes, workers=options['workers'])
+
+        # Ctrl+C / kill: termina la ronda en curso y sale
+        signal.signal(signal.SIGTERM, lambda *_: ingestor.detener())
+        signal.signal(signal.SIGINT, lambda *_: ingestor.detener())
+
+        self.stdout.write(f"Ingesta de {', '.join(ingestor.timeframes)} con {ingestor.workers} workers")
+        ingestor.correr(rondas=len(ingestor.timeframes) if options['once'] else None,
+                        cada_stats=options['stats_interval'], archivo_stats=options['stats_file'])
+        stats = ingestor.stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"{stats['syncs']} syncs, {stats['bars']} velas, {stats['errors']} errores"))
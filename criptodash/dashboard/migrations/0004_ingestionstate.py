@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    # tambien une las dos ramas 0002_remove_indicators_constraint y 0003
+    dependencies = [
+        ('dashboard', '0002_remove_indicators_constraint'),
+        ('dashboard', '0003_rename_dashboard_t_pairre_3c9a2f_idx_dashboard_t_pair_re_a4c770_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IngestionState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timeframe', models.CharField(max_length=10)),
+                ('last_timestamp', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('pair', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingestion_states', to='dashboard.tradingpair')),
+            ],
+            options={
+                'unique_together': {('pair', 'timeframe')},
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Min
+
+
+def borrar_duplicados(apps, schema_editor):
+    # antes de la restriccion unica se deja una sola señal (la primera guardada) por
+    # (pair, timestamp, signal_type)
+    TradeSignal = apps.get_model('dashboard', 'TradeSignal')
+    duplicados = (TradeSignal.objects.values('pair', 'timestamp', 'signal_type')
+                  .annotate(primera=Min('id'), cantidad=Count('id')).filter(cantidad__gt=1))
+    for grupo in duplicados:
+        TradeSignal.objects.filter(
+            pair=grupo['pair'], timestamp=grupo['timestamp'], signal_type=grupo['signal_type'],
+        ).exclude(id=grupo['primera']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('dashboard', '0004_ingestionstate'),
+    ]
+
+    operations = [
+        migrations.RunPython(borrar_duplicados, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='tradesignal',
+            unique_together={('pair', 'timestamp', 'signal_type')},
+        ),
+    ]
@@ -47,6 +47,20 @@ class OHLCVData(models.Model):
     def __str__(self):
         return f"{self.pair.symbol} - {self.timestamp}"
 
+class IngestionState(models.Model):
+    # Marca de agua de la ingesta: ultima vela cerrada guardada para (par, timeframe).
+    # La sincronizacion retoma desde aca despues de un reinicio o una caida.
+    pair = models.ForeignKey(TradingPair, on_delete=models.CASCADE, related_name='ingestion_states')
+    timeframe = models.CharField(max_length=10)
+    last_timestamp = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ['pair', 'timeframe']
+
+    def __str__(self):
+        return f"{self.pair.symbol} {self.timeframe} - {self.last_timestamp}"
+
 class TradeSignal(models.Model):
     SIGNAL_TYPES = [
         ('BUY', 'Buy'),
@@ -70,6 +84,8 @@ class TradeSignal(models.Model):
             models.Index(fields=['pair', 'timestamp', 'signal_type']),
             models.Index(fields=['pair_ref', 'timestamp', 'signal_type']),
         ]
+        # una señal por vela y tipo: permite guardarlas con upsert
+        unique_together = ['pair', 'timestamp', 'signal_type']
 
 class BacktestResult(models.Model):
 
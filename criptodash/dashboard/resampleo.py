@@ -0,0 +1,162 @@
+# Resampleo de velas de 1m a timeframes mayores
+# En vez de pedirle al exchange las velas de cada timeframe por separado, se leen las
+# velas de 1m una sola vez y se arman 5m, 15m, 1h, 4h y 1d:
+# open = primera, high = maximo, low = minimo, close = ultima, volume = suma.
+# Los buckets se alinean a la epoch en UTC (como Binance: 4h empieza a las 00/04/08.. UTC,
+# 1d a las 00:00 UTC). Cada timeframe se arma desde el anterior que lo divide (1m -> 5m
+# -> 15m -> 1h -> 4h -> 1d), asi cada paso trabaja con cada vez menos filas.
+#
+# Resampleador guarda los resultados y al llegar velas nuevas de 1m solo recalcula desde
+# el inicio del ultimo bucket abierto del timeframe mas grande, no toda la historia.
+
+import numpy as np
+import pandas as pd
+
+MINUTO = 60 * 1000
+TIMEFRAMES_MS = {
+    '1m': MINUTO,
+    '5m': 5 * MINUTO,
+    '15m': 15 * MINUTO,
+    '1h': 60 * MINUTO,
+    '4h': 240 * MINUTO,
+    '1d': 1440 * MINUTO,
+}
+DERIVADOS = ('5m', '15m', '1h', '4h', '1d')
+COLUMNAS_OHLCV = ('open', 'high', 'low', 'close', 'volume')
+
+
+def duracion_ms(timeframe):
+    try:
+        return TIMEFRAMES_MS[timeframe]
+    except KeyError:
+        raise ValueError(f"Timeframe no soportado para resampleo: {timeframe}") from None
+
+
+def _a_arrays(df):
+    """Velas ordenadas y sin timestamps repetidos como (ms desde epoch, {columna: array}, tz)"""
+    timestamps = pd.DatetimeIndex(df['timestamp'])
+    ms = timestamps.as_unit('ns').asi8 // 10**6
+    orden = np.argsort(ms, kind='stable')
+    ms = ms[orden]
+    # si un timestamp viene repetido se queda la ultima version de la vela
+    ultimas = np.ones(len(ms), dtype=bool)
+    ultimas[:-1] = ms[1:] != ms[:-1]
+    posiciones = orden[ultimas]
+    valores = {c: df[c].to_numpy(dtype=float)[posiciones] for c in COLUMNAS_OHLCV}
+    return ms[ultimas], valores, timestamps.tz
+
+
+def _agregar(ms, valores, duracion):
+    """Agrupa velas consecutivas (ordenadas) en buckets de `duracion` ms"""
+    bucket = ms - ms % duracion
+    cortes = np.flatnonzero(bucket[1:] != bucket[:-1]) + 1
+    inicios = np.concatenate(([0], cortes))
+    finales = np.concatenate((cortes, [len(ms)])) - 1
+    return bucket[inicios], {
+        'open': valores['open'][inicios],
+        'high': np.maximum.reduceat(valores['high'], inicios),
+        'low': np.minimum.reduceat(valores['low'], inicios),
+        'close': valores['close'][finales],
+        'volume': np.add.reduceat(valores['volume'], inicios),
+        'velas': np.add.reduceat(valores['velas'], inicios),
+    }
+
+
+def _a_frame(ms, valores, tz):
+    timestamps = pd.to_datetime(ms, unit='ms', utc=tz is not None)
+    if tz is not None:
+        timestamps = timestamps.tz_convert(tz)
+    return pd.DataFrame({'timestamp': timestamps, **valores})
+
+
+def resamplear(df, timeframes=DERIVADOS, origen='1m', solo_completas=False, contar=False):
+    """
+    Arma todos los `timeframes` a partir de las velas `origen` de `df` en una pasada.
+
+    Parameters:
+    - df: DataFrame con timestamp y OHLCV (timestamp naive se toma como UTC)
+    - solo_completas: descarta el ultimo bucket si todavia no cerro
+    - contar: agrega la columna `velas`, cuantas velas `origen` tiene cada bucket (menos
+      de duracion / origen si faltan velas: huecos o bucket anterior al inicio de `df`)
+
+    Returns:
+    - dict {timeframe: DataFrame con timestamp (inicio del bucket) y OHLCV}
+    """
+    base = duracion_ms(origen)
+    pedidos = sorted(timeframes, key=duracion_ms)
+    columnas = ['timestamp', *COLUMNAS_OHLCV] + (['velas'] if contar else [])
+    if df.empty:
+        return {tf: pd.DataFrame(columns=columnas) for tf in timeframes}
+
+    ms, valores, tz = _a_arrays(df)
+    valores['velas'] = np.ones(len(ms), dtype=np.int64)
+    ultima_vela = ms[-1]
+    # niveles ya calculados: (duracion, ms, valores); se arranca desde el origen
+    niveles = [(base, ms, valores)]
+    resultados = {}
+    for timeframe in pedidos:
+        duracion = duracion_ms(timeframe)
+        if duracion % base:
+            raise ValueError(f"{timeframe} no es multiplo de {origen}")
+        # el nivel mas grande que divide a este timeframe
+        _, ms_nivel, valores_nivel = max(
+            (nivel for nivel in niveles if duracion % nivel[0] == 0), key=lambda nivel: nivel[0])
+        ms_tf, valores_tf = _agregar(ms_nivel, valores_nivel, duracion)
+        niveles.append((duracion, ms_tf, valores_tf))
+        if solo_completas and ms_tf[-1] + duracion - base > ultima_vela:
+            ms_tf = ms_tf[:-1]
+            valores_tf = {c: v[:-1] for c, v in valores_tf.items()}
+        resultados[timeframe] = _a_frame(ms_tf, valores_tf, tz)[columnas]
+    return {tf: resultados[tf] for tf in timeframes}
+
+
+class Resampleador:
+    """
+    Timeframes derivados de un par que se actualizan con las velas nuevas de 1m.
+
+    - frames: {timeframe: DataFrame} con el ultimo bucket posiblemente abierto
+    - cola: velas de 1m desde el inicio del ultimo bucket del timeframe mas grande
+    """
+
+    def __init__(self, timeframes=DERIVADOS, origen='1m'):
+        self.timeframes = tuple(timeframes)
+        self.origen = origen
+        self.frames = {}
+        self.cola = None
+        self._mas_grande = max(self.timeframes, key=duracion_ms)
+        self._mayor = duracion_ms(self._mas_grande)
+
+    def cargar(self, df):
+        """Calcula todo desde cero con las velas de `df`"""
+        self.frames = resamplear(df, self.timeframes, self.origen)
+        self._guardar_cola(df)
+        return self.frames
+
+    def agregar(self, nuevas):
+        """
+        Agrega velas de 1m (nuevas o que reemplazan a las ultimas) y actualiza solo
+        los buckets desde el inicio del ultimo bucket abierto.
+        """
+        if self.cola is None:
+            return self.cargar(nuevas)
+        if nuevas.empty:
+            return self.frames
+        velas = pd.concat([self.cola, nuevas], ignore_index=True)
+        recientes = resamplear(velas, self.timeframes, self.origen)
+        # la cola empieza en un bucket del timeframe mas grande, que tambien es el
+        # inicio de un bucket de todos los demas
+        desde = recientes[self._mas_grande]['timestamp'].iloc[0]
+        for timeframe, df in recientes.items():
+            anteriores = self.frames[timeframe]
+            anteriores = anteriores[anteriores['timestamp'] < desde]
+            self.frames[timeframe] = pd.concat([anteriores, df], ignore_index=True)
+        self._guardar_cola(velas)
+        return self.frames
+
+    def _guardar_cola(self, df):
+        if df.empty:
+            self.cola = None
+            return
+        ms = pd.DatetimeIndex(df['timestamp']).as_unit('ns').asi8 // 10**6
+        inicio = ms.max() - ms.max() % self._mayor
+        self.cola = df[ms >= inicio].reset_index(drop=True)
@@ -0,0 +1,37 @@
+"""
+Benchmark de supertrend_grilla: 200 combinaciones (period, atr_multiplier) sobre un
+año de velas de 1h, comparado con una llamada a supertrend() por combinacion.
+Run with:
+    python dashboard/scripts/bench_grilla.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from bench_supertrend import generar_velas
+from dashboard.indicadores import supertrend
+from dashboard.indicadores_grilla import combinaciones, supertrend_grilla
+
+
+def main():
+    df = generar_velas(365 * 24)
+    periods, multipliers = combinaciones(range(5, 25), np.arange(1, 6, 0.5))
+    print(f"{len(periods)} combinaciones x {len(df)} velas")
+
+    inicio = time.perf_counter()
+    supertrend_grilla(df['high'], df['low'], df['close'], periods, multipliers)
+    print(f"{'supertrend_grilla':<28}{time.perf_counter() - inicio:7.2f} s")
+
+    inicio = time.perf_counter()
+    for period, multiplier in zip(periods.tolist(), multipliers.tolist()):
+        supertrend(df.copy(), period, multiplier)
+    print(f"{'supertrend por combinacion':<28}{time.perf_counter() - inicio:7.2f} s")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark de ingesta y del pipeline completo contra el exchange de replay (sin red).
+- descarga: velas/s de descargar_ohlcv con latencia simulada y distinta concurrencia
+- pipeline (--pipeline): descarga -> guardado en OHLCVData -> indicadores y señales ->
+  guardado de señales, con el tiempo de cada etapa; corre dentro de una transaccion que
+  se deshace al final, asi que no deja datos en la base
+Run with:
+    python dashboard/scripts/bench_ingesta.py [--dias 30] [--latencia 0.05] [--pipeline]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from dashboard.descarga_ohlcv import descargar_ohlcv, timeframe_ms
+from dashboard.exchange_replay import ExchangeReplay
+
+PAR = 'ETH/USDT'
+INICIO_MS = 1704067200000  # 2024-01-01 UTC
+
+
+def medir_descarga(dias, latencia, pagina, concurrencias):
+    minuto = timeframe_ms('1m')
+    hasta = INICIO_MS + dias * 24 * 60 * minuto
+    for concurrencia in concurrencias:
+        # reloj fijo: mismo rango y mismas velas en cada corrida
+        exchange = ExchangeReplay(latencia=latencia, pagina=pagina, reloj=hasta)
+        exchange.fetch_ohlcv(PAR, '1m', since=hasta, limit=1)  # genera la serie fuera de la medicion
+        exchange.llamadas = 0
+        inicio = time.perf_counter()
+        velas = descargar_ohlcv(exchange, PAR, '1m', INICIO_MS, hasta, limite=pagina, concurrencia=concurrencia)
+        segundos = time.perf_counter() - inicio
+        print(f"concurrencia {concurrencia:>2}: {len(velas):>8} velas en {segundos:6.2f} s "
+              f"({len(velas) / segundos:>10,.0f} velas/s, {exchange.llamadas} pedidos)")
+
+
+def medir_pipeline(dias, latencia, pagina):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'criptodash.settings')
+    import django
+
+    django.setup()
+    from django.db import transaction
+    from django.test import override_settings
+
+    from dashboard import ccxttest1, cliente_exchange
+    from dashboard.data_service import DataManager
+
+    hasta = INICIO_MS + dias * 24 * 60 * timeframe_ms('1m')
+    config = {'BACKEND': 'replay', 'DOWNLOAD_CONCURRENCY': 4,
+              'REPLAY': {'LATENCY': latencia, 'PAGE_SIZE': pagina, 'CLOCK': hasta}}
+    etapas = []
+
+    def etapa(nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        etapas.append((nombre, time.perf_counter() - inicio))
+        return resultado
+
+    with override_settings(EXCHANGE_CLIENT=config):
+        cliente_exchange.reiniciar()
+        try:
+            with transaction.atomic():
+                bars = etapa('descarga', lambda: ccxttest1.historical_fetch_ohlcv(PAR, INICIO_MS, '1m'))
+                df = etapa('normalizacion', lambda: DataManager._ohlcv_frame(bars))
+                pair = DataManager.get_pair(PAR)
+                etapa('guardado velas', lambda: DataManager.upsert_ohlcv_rows(df, pair, '1m'))
+                sig = etapa('indicadores', lambda: ccxttest1.calcular_indicadores_run_bot(
+                    ccxttest1.velas_cerradas(bars)))
+                etapa('guardado señales', lambda: ccxttest1.save_signals_to_db(sig, PAR))
+                transaction.set_rollback(True)
+        finally:
+            cliente_exchange.reiniciar()
+
+    print(f"pipeline con {len(bars)} velas:")
+    for nombre, segundos in etapas:
+        print(f"  {nombre:<18}{segundos:7.2f} s")
+    print(f"  {'total':<18}{sum(s for _, s in etapas):7.2f} s")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--dias', type=int, default=30)
+    parser.add_argument('--latencia', type=float, default=0.05)
+    parser.add_argument('--pagina', type=int, default=1000)
+    parser.add_argument('--pipeline', action='store_true')
+    opciones = parser.parse_args()
+
+    print(f"{opciones.dias} dias de 1m, {opciones.latencia * 1000:.0f} ms por pedido, {opciones.pagina} velas por pagina")
+    medir_descarga(opciones.dias, opciones.latencia, opciones.pagina, (1, 4, 8))
+    if opciones.pipeline:
+        medir_pipeline(opciones.dias, opciones.latencia, opciones.pagina)
+
+
+if __name__ == '__main__':
+    main()
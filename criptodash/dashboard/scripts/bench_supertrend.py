@@ -0,0 +1,53 @@
+"""
+Benchmark del supertrend con 10k, 100k y 1M velas.
+Run with:
+    python dashboard/scripts/bench_supertrend.py
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from dashboard import indicadores_puros
+from dashboard.indicadores import supertrend
+
+
+def generar_velas(n, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    return pd.DataFrame({
+        'open': close + rng.normal(0, 0.5, n),
+        'high': close + rng.random(n),
+        'low': close - rng.random(n),
+        'close': close,
+        'volume': rng.random(n) * 1000,
+    })
+
+
+def medir(df, repeticiones=3):
+    mejor = float('inf')
+    for _ in range(repeticiones):
+        datos = df.copy()
+        inicio = time.perf_counter()
+        supertrend(datos)
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main():
+    motor = 'numba' if indicadores_puros._supertrend_kernel_jit is not None else 'python'
+    print(f"Nucleo supertrend: {motor}")
+    # primera llamada fuera de la medicion (compilacion de numba)
+    supertrend(generar_velas(100))
+    for n in (10_000, 100_000, 1_000_000):
+        segundos = medir(generar_velas(n))
+        print(f"{n:>9} velas: {segundos * 1000:9.1f} ms  ({n / segundos:,.0f} velas/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,3 +1,1021 @@
-from django.test import TestCase
+import tempfile
+import threading
+import time
+import warnings
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from .arbitraje_señales import Señal, arbitrar, colapsar_duplicados
+from .cache_indicadores import CacheIndicadores, cache_indicadores
+from . import cliente_exchange
+from .cliente_exchange import cargar_mercados
+from .data_service import DataManager
+from .descarga_ohlcv import descargar_ohlcv, ventanas
+from .exchange_replay import ExchangeReplay
+from .formato_compacto import compactar, validar
+from .indicadores import (SqueezeDetector, atr, bb_squeeze_strategy, bollinger_bands, generar_señales_ichimoku,
+                          generate_bb_signals, generate_rsi_signals, ichimoku_cloud, macd, señal_ichimoku,
+                          señales_bb, supertrend)
+from . import indicadores, indicadores_puros
+from .indicadores_grilla import bollinger_grilla, combinaciones, macd_grilla, supertrend_grilla
+from .indicadores_lote import calcular_lote
+from .indicadores_registro import calcular, planificar
+from .resampleo import Resampleador, resamplear
+from .models import IngestionState, OHLCVData, TradeSignal
+from . import ccxttest1
+from .ingesta import Ingestor, proximo_cierre
+from .indicadores_streaming import (StreamingATR, StreamingBollinger, StreamingDonchian, StreamingEMA, StreamingExtremos,
+                                    StreamingIchimoku, StreamingMACD, StreamingRSI)
+
+
+def velas_sinteticas(n, seed=0):
+    """Genera un DataFrame OHLCV aleatorio (random walk) para las pruebas"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    open_ = close + rng.normal(0, 0.5, n)
+    high = np.maximum(open_, close) + rng.random(n)
+    low = np.minimum(open_, close) - rng.random(n)
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2025-01-01', periods=n, freq='min'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': rng.random(n) * 1000,
+    })
+
+
+# Copia congelada de tr / atr / supertrend tal como estaban antes de vectorizar (incluida la
+# asignacion encadenada df[col][i] = ...); sirve de referencia para el supertrend nuevo.
+def _tr_original(data):
+    data['previous_close'] = data['close'].shift(1)
+    data['high_low'] = abs(data['high'] - data['low'])
+    data['high_pc'] = abs(data['high'] - data['previous_close'])
+    data['low_pc'] = abs(data['low'] - data['previous_close'])
+
+    tr = data[['high_low', 'high_pc', 'low_pc']].max(axis=1)
+
+    return tr
+
+
+def _atr_original(data, period):
+    data['tr'] = _tr_original(data)
+    atr = data['tr'].rolling(period).mean()
+
+    return atr
+
+
+def _supertrend_original(df, period=7, atr_multiplier=3):
+    hl2 = (df['high'] + df['low']) / 2
+    df['atr'] = _atr_original(df, period)
+    df['upperband'] = hl2 + (atr_multiplier * df['atr'])
+    df['lowerband'] = hl2 - (atr_multiplier * df['atr'])
+    df['in_uptrend'] = True
+
+    for current in range(1, len(df.index)):
+        previous = current - 1
+
+        if df['close'][current] > df['upperband'][previous]:
+            df['in_uptrend'][current] = True
+        elif df['close'][current] < df['lowerband'][previous]:
+            df['in_uptrend'][current] = False
+        else:
+            df['in_uptrend'][current] = df['in_uptrend'][previous]
+
+            if df['in_uptrend'][current] and df['lowerband'][current] < df['lowerband'][previous]:
+                df['lowerband'][current] = df['lowerband'][previous]
+
+            if not df['in_uptrend'][current] and df['upperband'][current] > df['upperband'][previous]:
+                df['upperband'][current] = df['upperband'][previous]
+        
+    return df
+
+
+def supertrend_referencia(df, period=7, atr_multiplier=3):
+    """Bandas e in_uptrend de la version original (sin tocar `df`)"""
+    with warnings.catch_warnings(), pd.option_context('mode.copy_on_write', False):
+        # la asignacion encadenada del original avisa (y con copy-on-write no escribiria)
+        warnings.simplefilter('ignore')
+        original = _supertrend_original(df.copy(), period, atr_multiplier)
+    return (original['upperband'].to_numpy(), original['lowerband'].to_numpy(),
+            original['in_uptrend'].to_numpy(dtype=bool))
+
+
+class SupertrendTests(SimpleTestCase):
+    def test_equivalente_a_la_version_original(self):
+        for period, multiplier in [(7, 3), (10, 2), (14, 1.5)]:
+            df = velas_sinteticas(2000, seed=period)
+            upper, lower, in_uptrend = supertrend_referencia(df, period, multiplier)
+
+            result = supertrend(df.copy(), period, multiplier)
+
+            np.testing.assert_array_equal(result['upperband'].to_numpy(), upper)
+            np.testing.assert_array_equal(result['lowerband'].to_numpy(), lower)
+            np.testing.assert_array_equal(result['in_uptrend'].to_numpy(), in_uptrend)
+
+    def test_in_uptrend_es_booleano(self):
+        result = supertrend(velas_sinteticas(50))
+        self.assertEqual(result['in_uptrend'].dtype, bool)
+        self.assertTrue(result['in_uptrend'].iloc[0])
+
+
+def velas_oscilantes(n):
+    """Velas fijas (sin azar) que oscilan dentro y fuera de las bandas de Bollinger"""
+    i = np.arange(n)
+    close = 100 + 5 * np.sin(i / 3) + np.sin(i * 1.7)
+    open_ = np.concatenate(([close[0]], close[:-1]))
+    return pd.DataFrame({
+        'open': open_,
+        'high': np.maximum(open_, close) + 0.5,
+        'low': np.minimum(open_, close) - 0.5,
+        'close': close,
+        'volume': 100 + 10 * (i % 3),
+    })
+
+
+class BollingerSeñalesTests(SimpleTestCase):
+    # filas 20..31 (antes de la ventana no hay señales); bounce y breakout disparan juntas
+    # en 20, 22, 23, 29 y 31. Valores iguales a los de los bucles originales.
+    ETIQUETAS = ['buy', '', 'buy', 'buy', '', 'sell', 'buy', 'sell', 'sell', 'sell', 'sell', 'sell']
+    TIPOS = ['BB_BOUNCE', '', 'BB_BOUNCE', 'BB_BOUNCE', '', 'BB_BOUNCE', 'BB_BOUNCE', 'BB_BREAKOUT',
+             'BB_BOUNCE', 'BB_BOUNCE', 'BB_BREAKOUT', 'BB_BOUNCE']
+
+    def setUp(self):
+        self.df = bollinger_bands(velas_oscilantes(32), generate_signals=False)
+        self.df['signal_buy_sell'] = ''
+
+    def test_la_primera_estrategia_gana(self):
+        df = generate_bb_signals(self.df.copy(), 20, ['bounce', 'breakout', 'trend'])
+        self.assertEqual(df['signal_buy_sell'].tolist(), [''] * 20 + self.ETIQUETAS)
+        self.assertEqual(df['signal_type'].fillna('').tolist(), [''] * 20 + self.TIPOS)
+
+        # con el orden invertido las filas compartidas pasan a ser BB_BREAKOUT
+        invertido = generate_bb_signals(self.df.copy(), 20, ['breakout', 'bounce'])
+        self.assertEqual(invertido['signal_type'].fillna('').tolist()[20:], [
+            'BB_BREAKOUT', '', 'BB_BREAKOUT', 'BB_BREAKOUT', '', 'BB_BOUNCE', 'BB_BOUNCE', 'BB_BREAKOUT',
+            'BB_BOUNCE', 'BB_BREAKOUT', 'BB_BREAKOUT', 'BB_BREAKOUT'])
+
+        # una fila ya ocupada no se pisa
+        ocupada = self.df.copy()
+        ocupada.loc[20, 'signal_buy_sell'] = 'sell'
+        self.assertEqual(generate_bb_signals(ocupada, 20, ['bounce'])['signal_buy_sell'].iloc[20], 'sell')
+
+    def test_fuerzas_por_prioridad_y_por_votos(self):
+        señales = señales_bb(self.df, 20, ['bounce', 'breakout', 'trend'])
+        # BB_TREND pide precio sobre la media con %b < 0.2, que no se da nunca (como en el original)
+        self.assertFalse(señales[2].direccion.any())
+
+        direccion, tipo, fuerza = arbitrar(señales, 'prioridad')
+        self.assertEqual(direccion[20:].tolist(), [1, 0, 1, 1, 0, -1, 1, -1, -1, -1, -1, -1])
+        self.assertEqual(tipo[20:].tolist(), self.TIPOS)
+        self.assertEqual(fuerza.tolist(), [0] * 20 + [1, 0, 1, 1, 0, 1, 1, 1, 1, 1, 1, 1])
+
+        direccion, tipo, fuerza = arbitrar(señales, 'votos')
+        self.assertEqual(direccion[20:].tolist(), [1, 0, 1, 1, 0, -1, 1, -1, -1, -1, -1, -1])
+        # donde coinciden bounce y breakout suman fuerza 2
+        self.assertEqual(fuerza.tolist(), [0] * 20 + [2, 0, 2, 2, 0, 1, 1, 1, 1, 2, 1, 2])
+
+
+class IchimokuSeñalesTests(SimpleTestCase):
+    # kijun=2: sin señales antes de la fila 2 y Chikou cuenta desde la fila 4
+    # fila 0-1: condiciones de compra pero antes del período kijun
+    # fila 2: precio sobre la nube y nube alcista -> buy 2
+    # fila 3: cruce bajista y precio bajo la nube (nube alcista suma 1 a compra) -> sell 2
+    # fila 4: una condicion de cada lado -> nada
+    # fila 5: las 4 de compra -> buy 4
+    # fila 6: cruce bajista, bajo la nube y nube bajista -> sell 3
+    # fila 7: bajo la nube y nube bajista -> sell 2
+    # fila 8: 2 de compra (cruce y sobre la nube) y 2 de venta (nube y Chikou) -> gana compra
+    ETIQUETAS = ['', '', 'buy', 'sell', '', 'buy', 'sell', 'sell', 'buy']
+    FUERZAS = [0, 0, 2, 2, 0, 4, 3, 2, 2]
+
+    def setUp(self):
+        self.df = pd.DataFrame({
+            'tenkan': [1, 3, 3, 1, 1, 3, 1, 1, 3],
+            'kijun': [2, 2, 2, 2, 2, 2, 2, 2, 2],
+            'close': [10, 10, 10, 3, 6, 8, 3, 3, 10],
+            'senkou_a': [5, 5, 5, 5, 5, 5, 5, 5, 5],
+            'senkou_b': [4, 4, 4, 4, 6, 4, 6, 6, 6],
+            'chikou': [10, 12, 12, 8, 8, 8, 2, 8, 8],
+        }, dtype=float)
+        self.df['signal_buy_sell'] = ''
+
+    def test_compra_venta_y_nada(self):
+        df = generar_señales_ichimoku(self.df.copy(), kijun=2)
+        self.assertEqual(df['signal_buy_sell'].tolist(), self.ETIQUETAS)
+        self.assertEqual(df['signal_strenght'].tolist(), self.FUERZAS)
+
+        # la fuerza se suma a la que ya tenia la fila
+        previa = self.df.copy()
+        previa['signal_strenght'] = 1
+        df = generar_señales_ichimoku(previa, kijun=2)
+        self.assertEqual(df['signal_strenght'].tolist(), [f + 1 for f in self.FUERZAS])
+
+    def test_señal(self):
+        señal = señal_ichimoku(self.df, kijun=2)
+        self.assertEqual(señal.tipo, 'ICHIMOKU')
+        self.assertEqual(señal.direccion.tolist(), [0, 0, 1, -1, 0, 1, -1, -1, 1])
+        self.assertEqual(señal.fuerza.tolist(), self.FUERZAS)
+
+
+# Copia congelada de generate_rsi_signals y de las divergencias tal como estaban antes
+# de vectorizar; referencia para la version por arrays.
+def _detect_bullish_divergence_original(df, current_index, lookback_period=14):
+    if current_index < lookback_period * 2:
+        return False
+    price_lookback = df['close'].iloc[current_index-lookback_period:current_index]
+    if len(price_lookback) < 5:
+        return False
+    current_low = df['low'].iloc[current_index]
+    recent_lows = df['low'].iloc[current_index-5:current_index]
+    current_rsi = df['rsi'].iloc[current_index]
+    recent_rsi = df['rsi'].iloc[current_index-5:current_index]
+    is_price_lower_low = current_low == recent_lows.min()
+    is_rsi_higher_low = current_rsi > recent_rsi.min()
+    return is_price_lower_low and is_rsi_higher_low
+
+
+def _detect_bearish_divergence_original(df, current_index, lookback_period=14):
+    if current_index < lookback_period * 2:
+        return False
+    price_lookback = df['high'].iloc[current_index-lookback_period:current_index]
+    if len(price_lookback) < 5:
+        return False
+    current_high = df['high'].iloc[current_index]
+    recent_highs = df['high'].iloc[current_index-5:current_index]
+    current_rsi = df['rsi'].iloc[current_index]
+    recent_rsi = df['rsi'].iloc[current_index-5:current_index]
+    is_price_higher_high = current_high == recent_highs.max()
+    is_rsi_lower_high = current_rsi < recent_rsi.max()
+    return is_price_higher_high and is_rsi_lower_high
+
+
+def _generate_rsi_signals_original(df, rsi_period=14, overbought=70, oversold=30):
+    for i in range(1, len(df)):
+        current_strength = df['signal_strenght'].iloc[i]
+        current_rsi = df['rsi'].iloc[i]
+        previous_rsi = df['rsi'].iloc[i-1]
+        buy_conditions = [
+            previous_rsi <= oversold and current_rsi > oversold,
+            current_rsi > previous_rsi,
+            df['close'].iloc[i] > df['close'].iloc[i-1]
+        ]
+        sell_conditions = [
+            previous_rsi >= overbought and current_rsi < overbought,
+            current_rsi < previous_rsi,
+            df['close'].iloc[i] < df['close'].iloc[i-1]
+        ]
+        bullish_divergence = _detect_bullish_divergence_original(df, i, rsi_period)
+        bearish_divergence = _detect_bearish_divergence_original(df, i, rsi_period)
+        if bullish_divergence and df['signal_buy_sell'].iloc[i] == '':
+            df.loc[df.index[i], 'signal_buy_sell'] = 'buy'
+            df.loc[df.index[i], 'signal_type'] = 'RSI_DIVERGENCE'
+            df.loc[df.index[i], 'signal_strenght'] = current_strength + 2
+        elif bearish_divergence and df['signal_buy_sell'].iloc[i] == '':
+            df.loc[df.index[i], 'signal_buy_sell'] = 'sell'
+            df.loc[df.index[i], 'signal_type'] = 'RSI_DIVERGENCE'
+            df.loc[df.index[i], 'signal_strenght'] = current_strength + 2
+        elif sum(buy_conditions) >= 2 and df['signal_buy_sell'].iloc[i] == '':
+            df.loc[df.index[i], 'signal_buy_sell'] = 'buy'
+            df.loc[df.index[i], 'signal_type'] = 'RSI_OVERSOLD'
+            df.loc[df.index[i], 'signal_strenght'] = current_strength + 1
+        elif sum(sell_conditions) >= 2 and df['signal_buy_sell'].iloc[i] == '':
+            df.loc[df.index[i], 'signal_buy_sell'] = 'sell'
+            df.loc[df.index[i], 'signal_type'] = 'RSI_OVERBOUGHT'
+            df.loc[df.index[i], 'signal_strenght'] = current_strength + 1
+    return df
+
+
+class RsiSeñalesTests(SimpleTestCase):
+    def velas_con_rsi(self, n, seed):
+        df = velas_sinteticas(n, seed=seed)
+        # minimos y maximos redondeados: la divergencia pide que la vela iguale el extremo de las 5 anteriores
+        df['low'] = df['low'].round()
+        df['high'] = df['high'].round()
+        rng = np.random.default_rng(seed)
+        # RSI que entra y sale de las zonas de sobrecompra y sobreventa
+        df['rsi'] = 50 + 30 * np.sin(np.arange(n) / 4) + rng.normal(0, 5, n)
+        df['signal_buy_sell'] = ''
+        df['signal_type'] = ''
+        df['signal_strenght'] = 0
+        return df
+
+    def test_igual_al_original_y_divergencia_antes_que_sobreventa(self):
+        for seed in (1, 2, 3):
+            df = self.velas_con_rsi(400, seed)
+            # una fila ya ocupada no se toca
+            df.loc[100, ['signal_buy_sell', 'signal_type']] = ['sell', 'BB_BOUNCE']
+            esperado = _generate_rsi_signals_original(df.copy())
+            resultado = generate_rsi_signals(df.copy())
+            for columna in ('signal_buy_sell', 'signal_type'):
+                self.assertEqual(resultado[columna].tolist(), esperado[columna].tolist())
+            np.testing.assert_array_equal(resultado['signal_strenght'].to_numpy(dtype=float),
+                                          esperado['signal_strenght'].to_numpy(dtype=float))
+
+            # filas donde se cumplen la divergencia y la sobreventa/sobrecompra: gana la divergencia (+2)
+            compra, venta = indicadores._rsi_condiciones(df)
+            divergencia = np.flatnonzero(np.logical_or(*indicadores._divergencias_rsi(df)) & ((compra >= 2) | (venta >= 2)))
+            divergencia = divergencia[divergencia != 100]
+            self.assertTrue(len(divergencia))
+            self.assertTrue((resultado['signal_type'].iloc[divergencia] == 'RSI_DIVERGENCE').all())
+            self.assertTrue((resultado['signal_strenght'].iloc[divergencia] == 2).all())
+            solo_zona = resultado['signal_type'].isin(['RSI_OVERSOLD', 'RSI_OVERBOUGHT'])
+            self.assertTrue(solo_zona.any())
+            self.assertTrue((resultado.loc[solo_zona, 'signal_strenght'] == 1).all())
+            self.assertEqual(resultado.loc[100, ['signal_buy_sell', 'signal_type', 'signal_strenght']].tolist(),
+                             ['sell', 'BB_BOUNCE', 0])
+
+
+class SqueezeTests(SimpleTestCase):
+    def test_detector_incremental_igual_a_version_por_lotes(self):
+        df = bollinger_bands(velas_sinteticas(5000, seed=3), generate_signals=False)
+        df['signal_buy_sell'] = ''
+        lotes = bb_squeeze_strategy(df.copy())['signal_buy_sell'].tolist()
+
+        detector = SqueezeDetector()
+        incremental = [
+            detector.update(bandwidth, close, middle) or ''
+            for bandwidth, close, middle in zip(df['bb_bandwidth'], df['close'], df['bb_middle'])
+        ]
+
+        self.assertEqual(incremental, lotes)
+        self.assertTrue(any(lotes))
+
+
+class StreamingTests(SimpleTestCase):
+    def assertBitIdentico(self, esperado, obtenido):
+        esperado = np.asarray(esperado, dtype=float)
+        obtenido = np.asarray(obtenido, dtype=float)
+        np.testing.assert_array_equal(np.isnan(esperado), np.isnan(obtenido))
+        validos = ~np.isnan(esperado)
+        np.testing.assert_array_equal(esperado[validos].view(np.int64), obtenido[validos].view(np.int64))
+
+    def test_warmup_y_velas_nuevas_identicas_a_version_por_lotes(self):
+        df = velas_sinteticas(3000, seed=5)
+        historico, nuevas = df.iloc[:2500], df.iloc[2500:].to_dict('records')
+
+        lotes_atr = atr(df.copy(), 14)
+        lotes_macd = macd(df.copy())
+        lotes_bb = bollinger_bands(df.copy(), generate_signals=False)
+        lotes_ichi = ichimoku_cloud(df.copy())
+
+        indicadores = [StreamingATR(14), StreamingMACD(), StreamingBollinger(), StreamingIchimoku()]
+        for indicador in indicadores:
+            indicador.warmup(historico)
+        streaming_atr, streaming_macd, streaming_bb, streaming_ichi = (
+            [indicador.update(vela) for vela in nuevas] for indicador in indicadores
+        )
+
+        self.assertBitIdentico(lotes_atr.iloc[2500:], streaming_atr)
+        for columna in ('macd', 'signal_macd', 'macd_hist'):
+            self.assertBitIdentico(lotes_macd[columna].iloc[2500:], [v[columna] for v in streaming_macd])
+        for columna in ('bb_middle', 'bb_upper', 'bb_lower', 'bb_bandwidth', 'bb_percent_b'):
+            self.assertBitIdentico(lotes_bb[columna].iloc[2500:], [v[columna] for v in streaming_bb])
+        for columna in ('tenkan', 'kijun', 'senkou_a', 'senkou_b', 'senkou_c'):
+            self.assertBitIdentico(lotes_ichi[columna].iloc[2500:], [v[columna] for v in streaming_ichi])
+
+    def test_rsi_ema_y_donchian_vela_a_vela_igual_a_indicadores_puros(self):
+        df = velas_sinteticas(1500, seed=6)
+        # un tramo plano (diferencias en 0) y un hueco en los datos
+        df.loc[700:720, 'close'] = df.loc[700, 'close']
+        df.loc[[900, 1200], ['high', 'low', 'close']] = np.nan
+        velas = df.to_dict('records')
+
+        for period in (7, 14):
+            streaming = StreamingRSI(period)
+            self.assertBitIdentico(indicadores_puros.rsi(df['close'], period), [streaming.update(v) for v in velas])
+
+        for span in (12, 26):
+            streaming = StreamingEMA(span)
+            self.assertBitIdentico(indicadores_puros.ema(df['close'], span), [streaming.update(v) for v in velas])
+
+        for window in (20, 55):
+            esperado = indicadores_puros.donchian(df['high'], df['low'], window)
+            streaming = StreamingDonchian(window)
+            obtenido = [streaming.update(v) for v in velas]
+            for columna in ('upper_channel', 'lower_channel'):
+                self.assertBitIdentico(esperado[columna], [v[columna] for v in obtenido])
+
+
+class RegistroTests(SimpleTestCase):
+    def test_plan_comparte_primitivas_y_da_los_mismos_valores(self):
+        df = velas_sinteticas(1000, seed=8)
+        plan = planificar(['ichimoku', 'donchian', 'atr', 'supertrend'], {'donchian': {'window': 26}})
+
+        # donchian(26) reutiliza los extremos del kijun y atr/supertrend el mismo true range
+        self.assertEqual(len(plan.nodos), len(set(plan.nodos)))
+        self.assertEqual(sum(1 for nodo in plan.nodos if nodo[0] in ('maximo', 'minimo')), 6)
+        self.assertEqual(sum(1 for nodo in plan.nodos if nodo[0] == 'true_range'), 1)
+
+        # la columna atr del supertrend (periodo 7) pisa a la del atr (14), como en el DataFrame
+        resultado = plan.ejecutar(df)
+        esperado = {
+            **indicadores_puros.ichimoku(df['high'], df['low'], df['close']),
+            **indicadores_puros.donchian(df['high'], df['low'], 26),
+            **indicadores_puros.supertrend(df['high'], df['low'], df['close']),
+        }
+        self.assertEqual(list(resultado), list(esperado))
+        for columna, valores in esperado.items():
+            np.testing.assert_array_equal(resultado[columna], valores)
+
+
+class ExtremosTests(SimpleTestCase):
+    def test_varias_ventanas_igual_a_rolling_de_pandas(self):
+        df = velas_sinteticas(2000, seed=9)
+        df.loc[[5, 300, 301, 1500], 'high'] = np.nan
+        windows = (3, 9, 26, 52)
+
+        for min_periods in (None, 1):
+            maximos = indicadores_puros.extremos_moviles(df['high'], windows, True, min_periods)
+            minimos = indicadores_puros.extremos_moviles(df['low'], windows, False, min_periods)
+            streaming = StreamingExtremos(windows, min_periods)
+            incremental = [streaming.update(vela) for vela in df.to_dict('records')]
+
+            for window in windows:
+                esperado_max = df['high'].rolling(window, min_periods=min_periods).max().to_numpy()
+                esperado_min = df['low'].rolling(window, min_periods=min_periods).min().to_numpy()
+                np.testing.assert_array_equal(maximos[window], esperado_max)
+                np.testing.assert_array_equal(minimos[window], esperado_min)
+                np.testing.assert_array_equal([v[f'max_{window}'] for v in incremental], esperado_max)
+                np.testing.assert_array_equal([v[f'min_{window}'] for v in incremental], esperado_min)
+
+
+class LoteTests(SimpleTestCase):
+    def test_varios_pares_igual_que_uno_por_uno(self):
+        # pares que empiezan y terminan en distintos momentos de la grilla
+        frames = {
+            f'PAR{k}/USDT': velas_sinteticas(1500, seed=k).iloc[k * 40:1500 - k * 15].reset_index(drop=True)
+            for k in range(5)
+        }
+        indicadores = ('supertrend', 'macd', 'bollinger', 'ichimoku', 'rsi')
+
+        resultados = calcular_lote(frames, indicadores)
+
+        self.assertEqual(list(resultados), list(frames))
+        for simbolo, df in frames.items():
+            esperado = calcular(df, indicadores)
+            pd.testing.assert_frame_equal(resultados[simbolo][esperado.columns], esperado)
+
+
+class GrillaTests(SimpleTestCase):
+    def assertFilasIguales(self, grilla, esperado_por_fila):
+        for fila, esperado in enumerate(esperado_por_fila):
+            for columna, valores in esperado.items():
+                np.testing.assert_array_equal(grilla[columna][fila], valores)
+
+    def test_cada_fila_igual_a_la_funcion_con_esos_parametros(self):
+        df = velas_sinteticas(1000, seed=11)
+        high, low, close = df['high'], df['low'], df['close']
+
+        periods, multipliers = combinaciones([7, 10, 14], [1.5, 3])
+        self.assertFilasIguales(
+            supertrend_grilla(high, low, close, periods, multipliers),
+            [indicadores_puros.supertrend(high, low, close, int(p), m) for p, m in zip(periods, multipliers)])
+
+        windows, num_stds = combinaciones([10, 20], [2, 2.5])
+        self.assertFilasIguales(
+            bollinger_grilla(close, windows, num_stds),
+            [indicadores_puros.bollinger(close, int(w), s) for w, s in zip(windows, num_stds)])
+
+        shorts, longs, signals = combinaciones([8, 12], [26], [5, 9])
+        self.assertFilasIguales(
+            macd_grilla(close, shorts, longs, signals),
+            [indicadores_puros.macd(close, int(a), int(b), int(c)) for a, b, c in zip(shorts, longs, signals)])
+
+
+class CacheTests(SimpleTestCase):
+    def test_acierta_con_las_mismas_velas_y_falla_si_cambia_una(self):
+        cache = CacheIndicadores()
+        df = velas_sinteticas(500, seed=12)
+        calcular_supertrend = lambda datos: calcular(datos, ('supertrend',))
+
+        primero = cache.obtener_o_calcular(df, calcular_supertrend, ('supertrend',), pair='ETH/USDT', timeframe='1m')
+        segundo = cache.obtener_o_calcular(df.copy(), calcular_supertrend, ('supertrend',), pair='ETH/USDT', timeframe='1m')
+        pd.testing.assert_frame_equal(primero, segundo)
+
+        modificado = df.copy()
+        modificado.loc[250, 'close'] += 1
+        cache.obtener_o_calcular(modificado, calcular_supertrend, ('supertrend',), pair='ETH/USDT', timeframe='1m')
+        cache.obtener_o_calcular(df, calcular_supertrend, ('supertrend',), {'supertrend': {'period': 10}}, 'ETH/USDT', '1m')
+
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 3))
+
+    def test_lru_respeta_el_presupuesto_y_usa_el_disco(self):
+        dfs = [velas_sinteticas(200, seed=k) for k in range(4)]
+        tamaño = int(dfs[0].memory_usage(index=True, deep=True).sum())
+        with tempfile.TemporaryDirectory() as directorio:
+            cache = CacheIndicadores(max_bytes=2 * tamaño, directorio=directorio)
+            for k, df in enumerate(dfs):
+                cache.guardar(str(k), df)
+            self.assertLessEqual(cache.stats()['bytes'], 2 * tamaño)
+            self.assertEqual(cache.stats()['evictions'], 2)
+
+            # la entrada 0 salio de memoria pero sigue en disco
+            pd.testing.assert_frame_equal(cache.obtener('0'), dfs[0])
+            self.assertEqual(cache.stats()['disk_hits'], 1)
+            self.assertIsNone(cache.obtener('no-existe'))
+
+    def test_error_del_disco_no_falla_el_calculo(self):
+        df = velas_sinteticas(100, seed=14)
+        with tempfile.TemporaryDirectory() as directorio:
+            cache = CacheIndicadores(directorio=directorio)
+            with mock.patch.object(pd.DataFrame, 'to_pickle', side_effect=OSError('disco lleno')), \
+                    self.assertLogs('dashboard.cache_indicadores', 'ERROR'):
+                resultado = cache.obtener_o_calcular(df, lambda datos: datos.assign(x=1), ('x',))
+            self.assertEqual(resultado['x'].tolist(), [1] * 100)
+            self.assertEqual(cache.stats()['disk_errors'], 1)
+            # queda en memoria
+            cache.obtener_o_calcular(df, lambda datos: datos.assign(x=2), ('x',))
+            self.assertEqual(cache.stats()['hits'], 1)
+
+    def test_un_solo_cache_compartido_entre_threads(self):
+        caches = []
+        def lento(**config):
+            # construccion lenta: sin lock varios threads crearian su propio cache
+            time.sleep(0.02)
+            return object()
+
+        with mock.patch('dashboard.cache_indicadores._cache', None), \
+                mock.patch('dashboard.cache_indicadores.CacheIndicadores', lento):
+            hilos = [threading.Thread(target=lambda: caches.append(cache_indicadores())) for _ in range(8)]
+            for hilo in hilos:
+                hilo.start()
+            for hilo in hilos:
+                hilo.join()
+        self.assertEqual(len({id(cache) for cache in caches}), 1)
+
+
+class CompactoTests(SimpleTestCase):
+    def test_compacto_mas_chico_y_dentro_del_presupuesto(self):
+        df = bollinger_bands(supertrend(velas_sinteticas(2000, seed=13)), generate_signals=False)
+        df['signal_buy_sell'] = ' '
+        df.loc[df.index[::50], 'signal_buy_sell'] = 'buy'
+        df.loc[df.index[25::50], 'signal_buy_sell'] = 'none'
+        df['signal_type'] = np.nan
+        df.loc[df.index[::50], 'signal_type'] = 'BB_BOUNCE'
+
+        compacto = compactar(df)
+
+        self.assertEqual(validar(df, compacto)['distintas'], [])
+        self.assertEqual(compacto['close'].dtype, np.float32)
+        self.assertEqual(compacto['signal_buy_sell'].cat.codes.dtype, np.int8)
+        # ' ', 'none' y NaN quedan como un unico "sin señal"
+        self.assertEqual(set(compacto['signal_buy_sell']), {'', 'buy'})
+        self.assertEqual(set(compacto['signal_type']), {'', 'BB_BOUNCE'})
+        self.assertGreater(df.memory_usage(deep=True).sum() / compacto.memory_usage(deep=True).sum(), 2.5)
+
+
+class ArbitrajeTests(SimpleTestCase):
+    def test_prioridad_votos_y_colapso_de_duplicados(self):
+        bounce = Señal('BB_BOUNCE', [1, 0, -1, 1, 0, 1])
+        rsi = Señal('RSI_DIVERGENCE', [-1, -1, -1, 1, 1, 0], 2)
+        trend = Señal('BB_TREND', [-1, 0, 1, 0, 1, 0])
+
+        direccion, tipo, fuerza = arbitrar([bounce, rsi, trend])
+        self.assertEqual(direccion.tolist(), [1, -1, -1, 1, 1, 1])
+        self.assertEqual(tipo.tolist(), ['BB_BOUNCE', 'RSI_DIVERGENCE', 'BB_BOUNCE', 'BB_BOUNCE', 'RSI_DIVERGENCE', 'BB_BOUNCE'])
+
+        libre = np.array([True, True, False, True, True, True])
+        direccion, tipo, fuerza = arbitrar([bounce, rsi, trend], 'votos', libre)
+        self.assertEqual(direccion.tolist(), [-1, -1, 0, 1, 1, 1])
+        self.assertEqual(tipo.tolist(), ['RSI_DIVERGENCE', 'RSI_DIVERGENCE', '', 'RSI_DIVERGENCE', 'RSI_DIVERGENCE', 'BB_BOUNCE'])
+        self.assertEqual(fuerza.tolist(), [2, 2, 0, 3, 3, 1])
+
+        # igual que el recorrido fila por fila de clean_duplicate_signals
+        señales = np.random.default_rng(0).choice(['', ' ', 'buy', 'sell'], 500).astype(object)
+        esperado, ultima = señales.copy(), ''
+        for i, actual in enumerate(señales):
+            if actual == ultima and actual != '':
+                esperado[i] = ''
+            else:
+                ultima = actual
+        self.assertEqual(colapsar_duplicados(señales, '').tolist(), esperado.tolist())
+
+
+class ResampleoTests(SimpleTestCase):
+    def test_igual_a_resample_de_pandas_e_incremental_igual_a_completo(self):
+        df = velas_sinteticas(6000, seed=15)
+        df['timestamp'] = df['timestamp'].dt.tz_localize('UTC') + pd.Timedelta(minutes=7)
+        # faltan algunas velas de 1m
+        df = df.drop(index=[100, 101, 2500, 4000]).reset_index(drop=True)
+        resultados = resamplear(df)
+
+        agregacion = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+        for timeframe, frecuencia in (('5m', '5min'), ('15m', '15min'), ('1h', '1h'), ('4h', '4h'), ('1d', '1D')):
+            esperado = df.set_index('timestamp').resample(frecuencia).agg(agregacion).dropna(subset=['open']).reset_index()
+            pd.testing.assert_frame_equal(resultados[timeframe], esperado, check_freq=False, rtol=1e-12)
+
+        resampleador = Resampleador()
+        resampleador.cargar(df.iloc[:4000])
+        for inicio in range(4000, len(df), 333):
+            resampleador.agregar(df.iloc[inicio:inicio + 333])
+        for timeframe, esperado in resultados.items():
+            pd.testing.assert_frame_equal(resampleador.frames[timeframe], esperado, rtol=1e-12)
+        # solo se guarda la cola desde el inicio del ultimo dia
+        self.assertLess(len(resampleador.cola), 1440)
+
+
+class ExchangeFalso:
+    """Exchange con la interfaz minima de ccxt que cuenta las llamadas de red"""
+
+    id = 'falso'
+
+    def __init__(self):
+        self.markets = None
+        self.currencies = None
+        self.llamadas = 0
+
+    def load_markets(self):
+        self.llamadas += 1
+        self.set_markets({'ETH/USDT': {'symbol': 'ETH/USDT', 'precision': {'price': 0.01}}}, {'ETH': {'id': 'ETH'}})
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = markets
+        self.currencies = currencies
+        return markets
+
+
+class ClienteExchangeTests(SimpleTestCase):
+    def test_mercados_desde_el_archivo_mientras_no_vence_el_ttl(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            primero = ExchangeFalso()
+            cargar_mercados(primero, directorio, ttl=60)
+            self.assertEqual(primero.llamadas, 1)
+
+            segundo = ExchangeFalso()
+            mercados = cargar_mercados(segundo, directorio, ttl=60)
+            self.assertEqual(segundo.llamadas, 0)
+            self.assertEqual(mercados, primero.markets)
+            self.assertEqual(segundo.currencies, primero.currencies)
+
+            vencido = ExchangeFalso()
+            cargar_mercados(vencido, directorio, ttl=0)
+            self.assertEqual(vencido.llamadas, 1)
+
+
+class ExchangeVelas:
+    """
+    Exchange local con velas de 1m: devuelve paginas de a lo sumo `maximo` velas,
+    falla el primer pedido de cada `since` en `fallan` y registra la concurrencia.
+    """
+
+    rateLimit = 0
+
+    def __init__(self, n, maximo=1000, fallan=()):
+        self.velas = [[1699999980000 + i * 60000, 1.0, 2.0, 0.5, 1.5, float(i)] for i in range(n)]
+        self.maximo = maximo
+        self.fallan = set(fallan)
+        self.pedidos = 0
+        self.activos = 0
+        self.max_activos = 0
+        self._lock = threading.Lock()
+
+    def fetch_ohlcv(self, pair, timeframe, since=None, limit=1000):
+        with self._lock:
+            self.pedidos += 1
+            self.activos += 1
+            self.max_activos = max(self.max_activos, self.activos)
+        try:
+            time.sleep(0.01)
+            if since in self.fallan:
+                self.fallan.discard(since)
+                raise ConnectionError('timeout')
+            return [vela for vela in self.velas if vela[0] >= since][:min(limit, self.maximo)]
+        finally:
+            with self._lock:
+                self.activos -= 1
+
+
+class ReplayTests(SimpleTestCase):
+    def test_sinteticas_reproducibles_y_paginadas(self):
+        minuto = 60000
+        reloj = 1704067200000 + 5000 * minuto
+        exchange = ExchangeReplay(pagina=500, reloj=reloj)
+        velas = descargar_ohlcv(exchange, 'ETH/USDT', '1m', 1704067200000, reloj)
+        self.assertEqual(len(velas), 5001)
+        self.assertTrue(np.all(np.diff([v[0] for v in velas]) == minuto))
+        self.assertEqual(exchange.llamadas, 11)
+        self.assertTrue(all(v[3] <= min(v[1], v[4]) and v[2] >= max(v[1], v[4]) for v in velas))
+
+        # misma semilla: mismas velas aunque se pidan en otro orden
+        otro = ExchangeReplay(reloj=reloj)
+        self.assertEqual(otro.fetch_ohlcv('ETH/USDT', '1m', since=velas[4000][0], limit=3), velas[4000:4003])
+        self.assertNotEqual(ExchangeReplay(semilla=7, reloj=reloj).fetch_ohlcv('ETH/USDT', '1m', limit=1)[0][4], velas[-1][4])
+        self.assertEqual(exchange.parse8601('2024-01-01 00:00:00'), 1704067200000)
+
+    def test_grabadas_y_seleccion_por_settings(self):
+        df = velas_sinteticas(120)
+        with tempfile.TemporaryDirectory() as directorio:
+            df.to_csv(f'{directorio}/ETH_USDT_1m.csv', index=False)
+            config = {'BACKEND': 'replay', 'REPLAY': {'DIR': directorio, 'CLOCK': 1735689600000 + 120 * 60000}}
+            with override_settings(EXCHANGE_CLIENT=config):
+                cliente_exchange.reiniciar()
+                try:
+                    exchange = cliente_exchange.cliente()
+                finally:
+                    cliente_exchange.reiniciar()
+            self.assertIsInstance(exchange, ExchangeReplay)
+            self.assertEqual(list(exchange.markets), ['ETH/USDT'])
+            velas = exchange.fetch_ohlcv('ETH/USDT', '1m', since=1735689600000)
+            self.assertEqual(len(velas), 120)
+            np.testing.assert_allclose([v[4] for v in velas], df['close'])
+            # sin archivo de 1h se arma desde el de 1m
+            horas = exchange.fetch_ohlcv('ETH/USDT', '1h', since=1735689600000)
+            self.assertEqual([v[0] for v in horas], [1735689600000, 1735693200000])
+            self.assertAlmostEqual(horas[0][2], df['high'].iloc[:60].max())
+
+
+class DescargaTests(SimpleTestCase):
+    def test_ventanas_en_paralelo_con_reintentos_y_sin_velas_repetidas(self):
+        exchange = ExchangeVelas(5500, maximo=400)
+        inicio = exchange.velas[0][0]
+        exchange.fallan.add(inicio + 2000 * 60000)
+        hasta = exchange.velas[-1][0]
+
+        velas = descargar_ohlcv(exchange, 'ETH/USDT', '1m', inicio, hasta, concurrencia=4, espera=0)
+
+        self.assertEqual(velas, exchange.velas)
+        self.assertEqual(len(ventanas(inicio, hasta, '1m')), 6)
+        self.assertGreater(exchange.max_activos, 1)
+        # 5 ventanas de 3 paginas, la ultima de 2 y el reintento
+        self.assertEqual(exchange.pedidos, 5 * 3 + 2 + 1)
+
+
+class NormalizacionTests(SimpleTestCase):
+    def test_velas_crudas_a_columnas_utc_descartando_las_invalidas(self):
+        base = 1700000000000
+        raw = [
+            [base + 60000, 2, 3, 1, 2.5, 10],
+            [base, 1, 2, 0.5, 1.5, 5],
+            [base + 120000, None, 3, 1, 2, 1],
+            [base + 180000, 'x', 3, 1, 2, 1],
+            [base + 240000, 2, 3, 1, 2],
+        ]
+        df = DataManager._ohlcv_frame(raw)
+        self.assertEqual(str(df['timestamp'].dtype), 'datetime64[ms, UTC]')
+        self.assertEqual(list(df['timestamp'].astype('int64')), [base, base + 60000, base + 240000])
+        self.assertEqual(list(df['close']), [1.5, 2.5, 2.0])
+        self.assertEqual(list(df['volume']), [5.0, 10.0, 0.0])
+
+        limpio = DataManager._ohlcv_frame([[base, 1, 2, 0.5, 1.5, 5], [base + 60000, 1, 2, 0.5, float('nan'), 5]])
+        self.assertEqual(len(limpio), 1)
+        self.assertTrue(DataManager._ohlcv_frame([]).empty)
+
+
+class IngestaTests(TestCase):
+    def test_retoma_desde_la_marca_de_agua_y_solo_baja_lo_que_falta(self):
+        exchange = ExchangeVelas(300)
+        inicio = pd.Timestamp(exchange.velas[0][0], unit='ms', tz='UTC')
+
+        def historical_fetch_ohlcv(pair, timeframe='1m', since=None, limit=None):
+            return exchange.fetch_ohlcv(pair, timeframe, since=since, limit=len(exchange.velas))
+
+        with mock.patch('dashboard.data_service.historical_fetch_ohlcv', historical_fetch_ohlcv):
+            # la vela de las 200 min todavia esta abierta
+            ahora = inicio + pd.Timedelta(minutes=200, seconds=30)
+            self.assertEqual(DataManager.sync_ohlcv('ETH/USDT', start=inicio, now=ahora), 200)
+            self.assertEqual(IngestionState.objects.get().last_timestamp, inicio + pd.Timedelta(minutes=199))
+
+            # sin velas cerradas nuevas no se llama al exchange
+            pedidos = exchange.pedidos
+            self.assertEqual(DataManager.sync_ohlcv('ETH/USDT', now=ahora), 0)
+            self.assertEqual(exchange.pedidos, pedidos)
+
+            self.assertEqual(DataManager.sync_ohlcv('ETH/USDT', now=inicio + pd.Timedelta(minutes=300)), 100)
+        self.assertEqual(OHLCVData.objects.filter(timeframe='1m').count(), 300)
+
+
+    def test_sin_marca_pisa_la_ultima_vela_guardada_abierta(self):
+        exchange = ExchangeVelas(100)
+        inicio = pd.Timestamp(exchange.velas[0][0], unit='ms', tz='UTC')
+        pair = DataManager.get_pair('ETH/USDT')
+        # la vela de las 49 min quedo guardada todavia abierta (sin marca de agua)
+        df = DataManager._ohlcv_frame(exchange.velas[:50])
+        df.loc[49, ['high', 'close', 'volume']] = [1.8, 1.1, 0.0]
+        DataManager.save_ohlcv_rows(df, pair)
+
+        def historical_fetch_ohlcv(pair, timeframe='1m', since=None, limit=None):
+            return exchange.fetch_ohlcv(pair, timeframe, since=since, limit=len(exchange.velas))
+
+        with mock.patch('dashboard.data_service.historical_fetch_ohlcv', historical_fetch_ohlcv):
+            self.assertEqual(DataManager.sync_ohlcv('ETH/USDT', now=inicio + pd.Timedelta(minutes=100)), 50)
+        vela = OHLCVData.objects.get(timestamp=inicio + pd.Timedelta(minutes=49))
+        self.assertEqual((float(vela.high), float(vela.close), float(vela.volume)), (2.0, 1.5, 49.0))
+        self.assertEqual(OHLCVData.objects.count(), 100)
+
+    def test_resample_solo_guarda_buckets_completos(self):
+        pair = DataManager.get_pair('ETH/USDT')
+        # 1m desde las 00:07 hasta las 02:59, sin la vela de las 01:12
+        df = velas_sinteticas(173, seed=25)
+        df['timestamp'] = df['timestamp'].dt.tz_localize('UTC') + pd.Timedelta(minutes=7)
+        df = df[df['timestamp'] != pd.Timestamp('2025-01-01 01:12', tz='UTC')]
+        DataManager.upsert_ohlcv_rows(df, pair)
+
+        resultados = DataManager.resample_from_1m(pair, timeframes=('5m', '1h'))
+        # se devuelven todos los buckets, incompletos incluidos
+        self.assertEqual(len(resultados['5m']), 35)
+        self.assertEqual(len(resultados['1h']), 3)
+        guardadas = lambda tf: [t.strftime('%H:%M') for t in OHLCVData.objects.filter(timeframe=tf)
+                                .order_by('timestamp').values_list('timestamp', flat=True)]
+        # 00:05 empieza antes que los datos y 01:10 tiene un hueco
+        cincos = [f'{h:02d}:{m:02d}' for h in range(3) for m in range(0, 60, 5)][2:]
+        cincos.remove('01:10')
+        self.assertEqual(guardadas('5m'), cincos)
+        self.assertEqual(guardadas('1h'), ['02:00'])
+
+    def test_get_or_fetch_solo_pide_los_huecos(self):
+        exchange = ExchangeVelas(3000)
+        inicio = pd.Timestamp(exchange.velas[0][0], unit='ms', tz='UTC')
+        fin = inicio + pd.Timedelta(minutes=2999)
+        pedidos = []
+
+        def historical_fetch_ohlcv(pair, timeframe='1m', since=None, limit=None):
+            pedidos.append((since, limit))
+            return descargar_ohlcv(exchange, pair, timeframe, since, since + (limit - 1) * 60000)
+
+        pair = DataManager.get_pair('ETH/USDT')
+        guardadas = pd.DataFrame(exchange.velas, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+        guardadas['timestamp'] = pd.to_datetime(guardadas['timestamp'], unit='ms', utc=True)
+        # faltan: 10 velas al principio, dos huecos chicos, uno grande y el final
+        faltan = np.r_[0:10, 500:505, 700:702, 1000:2500, 2990:3000]
+        DataManager.save_ohlcv_rows(guardadas.drop(index=faltan), pair)
+
+        with mock.patch('dashboard.data_service.historical_fetch_ohlcv', historical_fetch_ohlcv):
+            df = DataManager.get_or_fetch('ETH/USDT', '1m', start=inicio, end=fin)
+
+        self.assertEqual(len(df), 3000)
+        self.assertTrue((df['timestamp'].diff().iloc[1:] == pd.Timedelta(minutes=1)).all())
+        np.testing.assert_allclose(df['volume'], guardadas['volume'])
+        # los huecos a menos de 1000 velas del primero van en el mismo pedido
+        minuto = 60000
+        base = exchange.velas[0][0]
+        self.assertEqual(pedidos, [(base, 702), (base + 1000 * minuto, 1500), (base + 2990 * minuto, 10)])
+        self.assertEqual(OHLCVData.objects.count(), 3000)
+
+    def test_upsert_cuenta_insertadas_y_actualizadas(self):
+        pair = DataManager.get_pair('ETH/USDT')
+        df = velas_sinteticas(3000, seed=21)
+        df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
+
+        self.assertEqual(DataManager.upsert_ohlcv_rows(df.iloc[:2000], pair), {'inserted': 2000, 'updated': 0})
+        cambiadas = df.iloc[1500:].copy()
+        cambiadas['close'] += 1
+        # una fila invalida se descarta
+        cambiadas.loc[cambiadas.index[-1], 'open'] = np.nan
+        self.assertEqual(DataManager.upsert_ohlcv_rows(cambiadas, pair, batch_size=700),
+                         {'inserted': 999, 'updated': 500})
+
+        guardadas = DataManager.get_ohlcv_from_db(pair, '1m')
+        self.assertEqual(len(guardadas), 2999)
+        np.testing.assert_allclose(guardadas['close'].astype(float).iloc[1500:], cambiadas['close'].iloc[:-1], atol=1e-8)
+        np.testing.assert_allclose(guardadas['close'].astype(float).iloc[:1500], df['close'].iloc[:1500], atol=1e-8)
+
+
+class SeñalesBDTests(TestCase):
+    def setUp(self):
+        ccxttest1._pares_señales.clear()
+
+    def test_guarda_con_upsert_sin_repetir_señales(self):
+        df = velas_sinteticas(3000, seed=23)
+        df['signal_buy_sell'] = np.where(np.arange(3000) % 3 == 0, 'buy', np.where(np.arange(3000) % 3 == 1, 'sell', 'none'))
+        df['signal_strenght'] = np.where(np.arange(3000) % 2 == 0, 0.5, np.nan)
+        df['rsi'] = np.where(np.arange(3000) % 5 == 0, np.nan, 40.0)
+        df.loc[3, 'rsi'] = -np.inf
+
+        with mock.patch('builtins.print'):
+            self.assertEqual(ccxttest1.save_signals_to_db(df, 'BTC/USDT'), {'inserted': 2000, 'updated': 0})
+            df['signal_strenght'] = 0.25
+            self.assertEqual(ccxttest1.save_signals_to_db(df.iloc[1000:], 'BTC/USDT'), {'inserted': 0, 'updated': 1333})
+
+        self.assertEqual(TradeSignal.objects.count(), 2000)
+        self.assertEqual(TradeSignal.objects.filter(signal_type='BUY').count(), 1000)
+        primera = TradeSignal.objects.get(timestamp=df['timestamp'].iloc[0].tz_localize('UTC'))
+        self.assertEqual((primera.signal_type, primera.strength, primera.indicators, primera.indicator),
+                         ('BUY', 0.5, None, None))
+        # inf no es JSON valido: se descarta como los NaN
+        self.assertIsNone(TradeSignal.objects.get(timestamp=df['timestamp'].iloc[3].tz_localize('UTC')).indicators)
+        ultima = TradeSignal.objects.get(timestamp=df['timestamp'].iloc[2998].tz_localize('UTC'))
+        self.assertEqual((ultima.signal_type, ultima.strength, ultima.indicators, ultima.indicator),
+                         ('SELL', 0.25, {'rsi': 40.0}, 'rsi'))
+        self.assertAlmostEqual(float(ultima.price), df['close'].iloc[2998], places=6)
+        self.assertEqual(ultima.pair_ref.symbol, 'BTC/USDT')
+
+
+class RunBotIncrementalTests(SimpleTestCase):
+    def setUp(self):
+        df = velas_sinteticas(1300, seed=31)
+        ms = df['timestamp'].astype('int64') // 10**6
+        # la ultima vela de cada pedido queda abierta (velas_cerradas la descarta)
+        self.bars = [[int(t), o, h, l, c, v] for t, o, h, l, c, v in
+                     zip(ms, df['open'], df['high'], df['low'], df['close'], df['volume'])]
+        self.disponibles = 1000
+        self.pedidos = []
+
+    def historical_fetch_ohlcv(self, pair, date_from, timeframe):
+        self.pedidos.append(date_from)
+        return [vela for vela in self.bars[:self.disponibles] if vela[0] >= date_from]
+
+    def test_devuelve_solo_las_velas_posteriores_a_since(self):
+        with mock.patch.object(ccxttest1, 'historical_fetch_ohlcv', self.historical_fetch_ohlcv), \
+                mock.patch.object(ccxttest1, 'save_signals_to_db') as guardar, mock.patch('builtins.print'):
+            # dos clientes con cursores distintos no se pisan: cada uno recibe lo suyo
+            for ultima in (898, 950, 898):
+                since = self.bars[ultima][0]
+                nuevas = ccxttest1.run_bot(pair='ETH/USDT', date_from=None, timeframe='1m', since=since, warmup=300)
+                self.assertEqual(self.pedidos[-1], since - 300 * 60000)
+                # velas cerradas (sin la ultima, abierta) posteriores a since
+                esperadas = pd.to_datetime([vela[0] for vela in self.bars[ultima + 1:999]], unit='ms')
+                self.assertEqual(nuevas['timestamp'].tolist(), esperadas.tolist())
+                pd.testing.assert_frame_equal(guardar.call_args.args[0], nuevas)
+
+                # mismas filas que calcular sobre el warm-up mas las nuevas
+                ventana = ccxttest1.velas_cerradas(self.bars[ultima - 300:1000])
+                referencia = ccxttest1.calcular_indicadores_run_bot(ventana).iloc[-len(nuevas):]
+                for columna in ('signal_buy_sell', 'signal_type', 'signal_strenght'):
+                    self.assertEqual(nuevas[columna].tolist(), referencia[columna].tolist(), columna)
+
+            # since como fecha, y sin velas nuevas: vacio
+            since = pd.Timestamp(self.bars[998][0], unit='ms').isoformat()
+            self.assertTrue(ccxttest1.run_bot_incremental('ETH/USDT', since, '1m', warmup=300).empty)
+
+
+class IngestorTests(TestCase):
+    def test_rondas_alineadas_con_presupuesto_por_exchange_y_stats(self):
+        minuto = 60000
+        self.assertEqual(proximo_cierre(1700000000000, '1m', retraso=2), 1700000040000 + 2000)
+        self.assertEqual(proximo_cierre(1700000040000, '1h', retraso=0), 1700002800000)
+
+        lock = threading.Lock()
+        activos, maximos = {}, {}
+        liberar = threading.Event()
+
+        def sincronizar(simbolo, timeframe, start):
+            exchange = 'kraken' if simbolo.startswith('K') else 'binance'
+            with lock:
+                activos[exchange] = activos.get(exchange, 0) + 1
+                maximos[exchange] = max(maximos.get(exchange, 0), activos[exchange])
+            liberar.wait(1)
+            time.sleep(0.01)
+            with lock:
+                activos[exchange] -= 1
+            if simbolo == 'MAL/USDT':
+                raise RuntimeError("sin red")
+            return 10
+
+        pares = [(f'P{i}/USDT', 'binance') for i in range(6)] + [('K1/USD', 'kraken'), ('K2/USD', 'kraken'), ('MAL/USDT', 'binance')]
+        ingestor = Ingestor(workers=6, pares=lambda: pares, sincronizar=sincronizar,
+                            presupuestos={'binance': {'concurrentes': 2, 'por_segundo': 0}, 'kraken': {'concurrentes': 1}})
+        with self.assertLogs('dashboard.ingesta', 'ERROR'):
+            futuros = ingestor.ronda('1m', ahora_ms=1700000000000)
+            # lo que sigue en curso no se vuelve a mandar
+            self.assertEqual(len(ingestor.ronda('1m')), 0)
+            liberar.set()
+            for futuro in futuros:
+                futuro.result()
+
+        self.assertEqual(len(futuros), 9)
+        self.assertEqual(maximos, {'binance': 2, 'kraken': 1})
+        pair = DataManager.get_pair('P0/USDT')
+        IngestionState.objects.create(pair=pair, timeframe='1m',
+                                      last_timestamp=pd.Timestamp(1699999980000 - 5 * minuto, unit='ms', tz='UTC'))
+        stats = ingestor.stats(ahora=1699999980)
+        self.assertEqual((stats['syncs'], stats['bars'], stats['errors'], stats['skipped']), (9, 80, 1, 9))
+        self.assertEqual(stats['lag'][0]['lag_seconds'], 4 * 60)
+        self.assertEqual([p['error'] for p in stats['pairs'] if p['error']], ['sin red'])
+
+
+class IngestaWebTests(TestCase):
+    def test_run_bot_lee_de_la_base_con_la_ingesta_activa(self):
+        pair = DataManager.get_pair('ETH/USDT')
+        df = velas_sinteticas(400, seed=41)
+        df['timestamp'] = df['timestamp'].dt.tz_localize('UTC')
+        DataManager.upsert_ohlcv_rows(df, pair)
+
+        def sin_exchange(*args, **kwargs):
+            raise AssertionError("no deberia pedir velas al exchange")
+
+        with override_settings(INGEST={'ENABLED': True}), \
+                mock.patch.object(ccxttest1, 'historical_fetch_ohlcv', sin_exchange), \
+                mock.patch.object(ccxttest1, 'save_signals_to_db') as guardar, mock.patch('builtins.print'):
+            sig = ccxttest1.run_bot('ETH/USDT', '2025-01-01 01:40:00', '1m')
+            lote = ccxttest1.run_bot_lote(['ETH/USDT', 'BTC/USDT'], '2025-01-01 01:40:00', '1m')
+            # desde la vela 100 (01:40), con los 8 decimales que guarda la base
+            velas = df.iloc[100:].round(8).reset_index(drop=True)
+            velas['timestamp'] = velas['timestamp'].dt.tz_localize(None)
+            esperado = ccxttest1.calcular_indicadores_run_bot(velas)
+        self.assertEqual(guardar.call_count, 2)
+        self.assertEqual(sig['timestamp'].tolist(), esperado['timestamp'].tolist())
+        # el lote tambien lee de la base; BTC/USDT no tiene velas guardadas
+        self.assertEqual(list(lote), ['ETH/USDT'])
+        self.assertEqual(lote['ETH/USDT']['timestamp'].tolist(), esperado['timestamp'].tolist())
+        np.testing.assert_allclose(sig['close'], esperado['close'], atol=1e-8)
+        self.assertEqual(sig['signal_buy_sell'].tolist(), esperado['signal_buy_sell'].tolist())
+
+    def test_ingest_stats_pide_login(self):
+        respuesta = self.client.get('/api/ingest-stats/')
+        self.assertEqual(respuesta.status_code, 302)
@@ -14,5 +14,7 @@ urlpatterns = [
     path('ejecutar-analisis/', views.ejecutar_analisis_trading, name='ejecutar_analisis'),
     path('nuevo/', views.dashboard_mejorado, name='dashboard_nuevo'),
     path('api/run-bot/', views.run_bot_api, name='run_bot_api'),
+    path('api/indicator-cache/', views.indicator_cache_stats_api, name='indicator_cache_stats'),
+    path('api/ingest-stats/', views.ingest_stats_api, name='ingest_stats'),
     path('backtest/', views.backtest_view, name='backtest'),
 ]
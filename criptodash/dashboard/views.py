@@ -10,13 +10,14 @@ from django.contrib import messages
 from django.utils.safestring import mark_safe
 from . import ccxttest1  # module with the bot function
 from .backtester import SupertrendStrategy, Backtester  # Import backtesting classes
+from .ingesta import ingesta_activa
 
 from plotly.offline import plot
 
 from django.utils import timezone
 from datetime import datetime, timedelta
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 
 app = DjangoDash('TechnicalAnalysisDashboard')
 
@@ -525,7 +526,8 @@ def dashboard_mejorado(request):
                 if fecha_fin_dt:
                     señales = señales.filter(timestamp__lt=fecha_fin_dt)
                 
-                fuente_datos = 'Binance API (recién obtenido)'
+                # con la ingesta programada activa run_bot lee las velas de la base
+                fuente_datos = 'Base de datos (ingesta)' if ingesta_activa() else 'Binance API (recién obtenido)'
                 print(f"Señales después de ejecutar bot: {señales.count()}")
                     
             except Exception as e:
@@ -938,17 +940,33 @@ def run_bot_api(request):
     pair = request.GET.get('pair', 'ETH/USDT')
     date_from = request.GET.get('date_from')  # optional
     timeframe = request.GET.get('timeframe', '1m')
+    # opcional: solo las velas posteriores a since (o after), el timestamp de la ultima vela
+    # que ya tiene el cliente (ms o fecha); el cursor lo lleva el cliente, no el servidor
+    since = request.GET.get('since') or request.GET.get('after') or None
+    if since and since.isdigit():
+        since = int(since)
+    # opcional: tipos compactos y JSON por columnas (compact=1), ver formato_compacto
+    compact = request.GET.get('compact', '').lower() in ('1', 'true')
+    # opcional: columnas a devolver separadas por coma (ej: timestamp,close,signal_buy_sell)
+    columns = [c for c in request.GET.get('columns', '').split(',') if c]
 
     try:
         # Intentar varias firmas comunes
         try:
-            result = ccxttest1.run_bot(pair=pair, date_from=date_from, timeframe=timeframe)
+            result = ccxttest1.run_bot(pair=pair, date_from=date_from, timeframe=timeframe, since=since)
         except TypeError:
             try:
                 result = ccxttest1.run_bot(pair, date_from, timeframe)
             except Exception:
                 result = ccxttest1.run_bot()
 
+        if columns and hasattr(result, "columns"):
+            result = result[[c for c in columns if c in result.columns]]
+
+        if compact and hasattr(result, "columns"):
+            from .formato_compacto import a_json, compactar
+            return HttpResponse(a_json(compactar(result)), content_type='application/json')
+
         # Normalizar salida a una lista de dicts
         if hasattr(result, "to_dict"):
             data = result.to_dict('records')
@@ -966,6 +984,18 @@ def run_bot_api(request):
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
+# Contadores del cache de indicadores (hits/misses/bytes) para dimensionarlo
+@login_required
+def indicator_cache_stats_api(request):
+    from .cache_indicadores import cache_indicadores
+    return JsonResponse(cache_indicadores().stats())
+
+@login_required
+def ingest_stats_api(request):
+    # lag desde IngestionState y throughput publicado por manage.py ingest (sin ir al exchange)
+    from .ingesta import lag_ingesta, leer_stats
+    return JsonResponse({'lag': lag_ingesta(), 'daemon': leer_stats()})
+
 @login_required
 def backtest_view(request):
     """Vista para ejecutar backtests usando señales existentes"""